@@ -7,6 +7,7 @@ from app.models.codebook import Codebook
 from app.models.document import Document
 from app.models.annotation import Annotation
 from app.models.code_assignments import CodeAssignment
+from app.models.ai_coded_chunk import AICodedChunk
 from logging.config import fileConfig
 import os
 from dotenv import load_dotenv
@@ -0,0 +1,47 @@
+"""Add document search indexes
+
+Revision ID: 3a7c1e9f5b20
+Revises: 9cd91bbc6ac8
+Create Date: 2026-10-19 09:12:31.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a7c1e9f5b20'
+down_revision: Union[str, None] = '9cd91bbc6ac8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Full-text and trigram indexes only exist on Postgres; other databases
+    # use the in-process index of DocumentSearchService
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Expression must match DocumentSearchService._rank_postgres exactly
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_documents_content_fts ON documents "
+        "USING gin (to_tsvector('english', coalesce(content, '')))"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_documents_content_trgm ON documents "
+        "USING gin (content gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_documents_content_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_documents_content_fts")
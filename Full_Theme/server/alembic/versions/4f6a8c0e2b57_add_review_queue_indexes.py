@@ -0,0 +1,33 @@
+"""Add review queue indexes
+
+Revision ID: 4f6a8c0e2b57
+Revises: e7b9f2a1c834
+Create Date: 2026-10-19 14:05:12.771920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f6a8c0e2b57'
+down_revision: Union[str, None] = 'e7b9f2a1c834'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_codes_codebook_id'),
+                    'codes', ['codebook_id'], unique=False)
+    op.create_index(op.f('ix_code_assignments_code_id'),
+                    'code_assignments', ['code_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_code_assignments_code_id'),
+                  table_name='code_assignments')
+    op.drop_index(op.f('ix_codes_codebook_id'), table_name='codes')
@@ -0,0 +1,55 @@
+"""Add project search indexes
+
+Revision ID: 8d41b2c6e7fa
+Revises: 3a7c1e9f5b20
+Create Date: 2026-10-19 10:41:07.552981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41b2c6e7fa'
+down_revision: Union[str, None] = '3a7c1e9f5b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Project-scoped lookups of assignments go through their document
+    op.create_index(op.f('ix_code_assignments_document_id'),
+                    'code_assignments', ['document_id'], unique=False)
+
+    # Full-text indexes only exist on Postgres; other databases use the
+    # in-process index of ProjectSearchService
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Expressions must match ProjectSearchService._rank_postgres exactly
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_codes_search_fts ON codes USING gin "
+        "(to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, '')))"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_annotations_content_fts ON annotations "
+        "USING gin (to_tsvector('english', coalesce(content, '')))"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_code_assignments_text_snapshot_fts ON code_assignments "
+        "USING gin (to_tsvector('english', coalesce(text_snapshot, '')))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_code_assignments_text_snapshot_fts")
+        op.execute("DROP INDEX IF EXISTS ix_annotations_content_fts")
+        op.execute("DROP INDEX IF EXISTS ix_codes_search_fts")
+
+    op.drop_index(op.f('ix_code_assignments_document_id'),
+                  table_name='code_assignments')
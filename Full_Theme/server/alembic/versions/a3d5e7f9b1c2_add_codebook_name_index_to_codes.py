@@ -0,0 +1,29 @@
+"""Add codebook name index to codes
+
+Revision ID: a3d5e7f9b1c2
+Revises: 4f6a8c0e2b57
+Create Date: 2026-10-19 15:22:48.304117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d5e7f9b1c2'
+down_revision: Union[str, None] = '4f6a8c0e2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_codes_codebook_id_name', 'codes',
+                    ['codebook_id', 'name'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_codes_codebook_id_name', table_name='codes')
@@ -0,0 +1,28 @@
+"""Add last_write_at to users for read-your-writes routing
+
+Revision ID: a8c0e2f4b6d9
+Revises: f2a4c6e8b0d1
+Create Date: 2026-10-19 22:14:52.603187
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c0e2f4b6d9'
+down_revision: Union[str, None] = 'f2a4c6e8b0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('last_write_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'last_write_at')
@@ -0,0 +1,72 @@
+"""Add codebook sequences and unique AI session names
+
+Revision ID: b7c9d1e3f5a4
+Revises: a3d5e7f9b1c2
+Create Date: 2026-10-19 16:10:37.518264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c9d1e3f5a4'
+down_revision: Union[str, None] = 'a3d5e7f9b1c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    sequences = op.create_table(
+        'codebook_sequences',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('session_type', sa.String(), nullable=False),
+        sa.Column('last_value', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'project_id', 'session_type')
+    )
+
+    bind = op.get_bind()
+    codebooks = bind.execute(sa.text(
+        "SELECT id, user_id, project_id, name FROM codebooks "
+        "WHERE is_ai_generated ORDER BY id"
+    )).fetchall()
+
+    # Continue numbering after the highest existing "<session_type>_<n>" name
+    last_values = {}
+    seen_names = set()
+    for codebook_id, user_id, project_id, name in codebooks:
+        if (user_id, project_id, name) in seen_names:
+            # Concurrent runs could pick the same name; keep the oldest as is
+            bind.execute(sa.text("UPDATE codebooks SET name = :name WHERE id = :id"),
+                         {"name": f"{name} ({codebook_id})", "id": codebook_id})
+            continue
+        seen_names.add((user_id, project_id, name))
+
+        session_type, _, number = name.rpartition('_')
+        if session_type and number.isdigit():
+            key = (user_id, project_id, session_type)
+            last_values[key] = max(last_values.get(key, 0), int(number))
+
+    if last_values:
+        op.bulk_insert(sequences, [
+            {"user_id": user_id, "project_id": project_id,
+             "session_type": session_type, "last_value": last_value}
+            for (user_id, project_id, session_type), last_value in last_values.items()
+        ])
+
+    op.create_index('uq_codebooks_ai_session_name', 'codebooks',
+                    ['user_id', 'project_id', 'name'], unique=True,
+                    postgresql_where=sa.text('is_ai_generated'),
+                    sqlite_where=sa.text('is_ai_generated'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_codebooks_ai_session_name', table_name='codebooks')
+    op.drop_table('codebook_sequences')
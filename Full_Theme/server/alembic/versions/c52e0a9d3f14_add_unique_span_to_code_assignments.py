@@ -0,0 +1,39 @@
+"""Add unique span constraint to code assignments
+
+Revision ID: c52e0a9d3f14
+Revises: 8d41b2c6e7fa
+Create Date: 2026-10-19 11:58:22.093410
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52e0a9d3f14'
+down_revision: Union[str, None] = '8d41b2c6e7fa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Remove duplicate assignments, keeping the oldest row of each span
+    op.execute(
+        "DELETE FROM code_assignments WHERE id NOT IN ("
+        "SELECT MIN(id) FROM code_assignments "
+        "GROUP BY document_id, code_id, start_char, end_char, created_by_id)"
+    )
+
+    with op.batch_alter_table('code_assignments') as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_code_assignments_span',
+            ['document_id', 'code_id', 'start_char', 'end_char', 'created_by_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('code_assignments') as batch_op:
+        batch_op.drop_constraint('uq_code_assignments_span', type_='unique')
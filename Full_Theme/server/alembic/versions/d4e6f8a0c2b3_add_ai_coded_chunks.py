@@ -0,0 +1,52 @@
+"""Add AI coded chunks ledger for incremental coding
+
+Revision ID: d4e6f8a0c2b3
+Revises: b7c9d1e3f5a4
+Create Date: 2026-10-19 18:42:11.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e6f8a0c2b3'
+down_revision: Union[str, None] = 'b7c9d1e3f5a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'ai_coded_chunks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('codebook_id', sa.Integer(), nullable=False),
+        sa.Column('document_hash', sa.String(), nullable=False),
+        sa.Column('chunk_hash', sa.String(), nullable=False),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('prompt_version', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['codebook_id'], ['codebooks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'document_id', 'document_hash', 'chunk_hash', 'model',
+                            'prompt_version', name='uq_ai_coded_chunks_work')
+    )
+    op.create_index(op.f('ix_ai_coded_chunks_id'), 'ai_coded_chunks', ['id'], unique=False)
+    op.create_index(op.f('ix_ai_coded_chunks_project_id'), 'ai_coded_chunks',
+                    ['project_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ai_coded_chunks_project_id'), table_name='ai_coded_chunks')
+    op.drop_index(op.f('ix_ai_coded_chunks_id'), table_name='ai_coded_chunks')
+    op.drop_table('ai_coded_chunks')
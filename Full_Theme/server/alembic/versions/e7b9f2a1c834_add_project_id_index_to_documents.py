@@ -0,0 +1,29 @@
+"""Add project_id index to documents
+
+Revision ID: e7b9f2a1c834
+Revises: c52e0a9d3f14
+Create Date: 2026-10-19 13:20:45.618302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b9f2a1c834'
+down_revision: Union[str, None] = 'c52e0a9d3f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_documents_project_id'),
+                    'documents', ['project_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_documents_project_id'), table_name='documents')
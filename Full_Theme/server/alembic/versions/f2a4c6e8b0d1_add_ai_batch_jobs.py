@@ -0,0 +1,54 @@
+"""Add AI batch jobs for submitted batch coding runs
+
+Revision ID: f2a4c6e8b0d1
+Revises: d4e6f8a0c2b3
+Create Date: 2026-10-19 21:05:37.218440
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a4c6e8b0d1'
+down_revision: Union[str, None] = 'd4e6f8a0c2b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'ai_batch_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('codebook_id', sa.Integer(), nullable=True),
+        sa.Column('service_type', sa.String(), nullable=False),
+        sa.Column('document_ids', sa.JSON(), nullable=False),
+        sa.Column('incremental', sa.Boolean(), nullable=False),
+        sa.Column('model_name', sa.String(), nullable=True),
+        sa.Column('provider', sa.String(), nullable=False),
+        sa.Column('batch_provider', sa.String(), nullable=False),
+        sa.Column('provider_job_id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['codebook_id'], ['codebooks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_ai_batch_jobs_id'), 'ai_batch_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_ai_batch_jobs_project_id'), 'ai_batch_jobs',
+                    ['project_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ai_batch_jobs_project_id'), table_name='ai_batch_jobs')
+    op.drop_index(op.f('ix_ai_batch_jobs_id'), table_name='ai_batch_jobs')
+    op.drop_table('ai_batch_jobs')
@@ -18,7 +18,11 @@ def ai_initial_coding(
         return AICodingService.generate_code(
             document_ids=request.document_ids,
             db=db,
-            user_id=current_user.id
+            user_id=current_user.id,
+            model_name=request.model_name,
+            provider=request.provider,
+            incremental=request.incremental,
+            batch=request.batch
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -39,7 +43,10 @@ def ai_deductive_coding(
             document_ids=request.document_ids,
             codebook_id=request.codebook_id,
             db=db,
-            user_id=current_user.id
+            user_id=current_user.id,
+            model_name=request.model_name,
+            provider=request.provider,
+            batch=request.batch
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -59,10 +66,28 @@ def ai_generate_themes(
         return AICodingService.generate_themes(
             codebook_id=request.codebook_id,
             db=db,
-            user_id=current_user.id
+            user_id=current_user.id,
+            model_name=request.model_name,
+            provider=request.provider
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/batches/{job_id}/ingest", response_model=Dict[str, Any])
+def ai_ingest_batch(
+    job_id: int,
+    db=Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Apply the results of a submitted batch job once its provider has finished"""
+    try:
+        return AICodingService.ingest_batch(job_id=job_id, db=db, user_id=current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Internal server error: {str(e)}")
@@ -2,8 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.async_session import get_async_db, run_read
 from app.db.session import get_db
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_user_async
 from app.models.user import User
 from app.schemas.annotation import AnnotationOut, AnnotationCreate, AnnotationUpdate, AnnotationWithDetails, AnnotationFilter
 from app.services.annotation_service import AnnotationService
@@ -29,7 +32,8 @@ def create_annotation(
             project_id=annotation.project_id,
             start_char=annotation.start_char,
             end_char=annotation.end_char,
-            text_snapshot=annotation.text_snapshot
+            text_snapshot=annotation.text_snapshot,
+            parent_id=annotation.parent_id
         )
         return db_annotation
     except ValueError as e:
@@ -40,18 +44,50 @@ def create_annotation(
 
 
 @router.get("/project/{project_id}", response_model=List[AnnotationWithDetails])
-def get_project_annotations(
+async def get_project_annotations(
     project_id: int,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Get annotations for a project; pass the last id seen as after_id for the next page"""
+    try:
+        annotations = await run_read(
+            db,
+            AnnotationService.get_project_annotations,
+            project_id=project_id,
+            user_id=getattr(current_user, 'id'),
+            after_id=after_id,
+            limit=limit,
+            response_model=List[AnnotationWithDetails]
+        )
+        return annotations
+    except ValueError as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        else:
+            raise HTTPException(status_code=403, detail=str(e))
+
+
+@router.get("/{annotation_id}/thread", response_model=List[AnnotationWithDetails])
+def get_annotation_thread(
+    annotation_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all annotations for a project"""
-    annotations = AnnotationService.get_project_annotations(
-        db=db,
-        project_id=project_id,
-        user_id=getattr(current_user, 'id')
-    )
-    return annotations
+    """Get an annotation together with all nested replies"""
+    try:
+        return AnnotationService.get_annotation_thread(
+            db=db,
+            annotation_id=annotation_id,
+            user_id=getattr(current_user, 'id')
+        )
+    except ValueError as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        else:
+            raise HTTPException(status_code=403, detail=str(e))
 
 
 @router.get("/{annotation_id}", response_model=AnnotationWithDetails)
@@ -83,10 +119,12 @@ def filter_annotations(
     created_by_id: Optional[int] = None,
     annotation_type: Optional[str] = None,
     search_text: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Filter annotations based on various criteria"""
+    """Filter annotations based on various criteria, paginated by annotation id"""
     try:
         annotations = AnnotationService.filter_annotations(
             db=db,
@@ -96,7 +134,9 @@ def filter_annotations(
             code_id=code_id,
             created_by_id=created_by_id,
             annotation_type=annotation_type,
-            search_text=search_text
+            search_text=search_text,
+            after_id=after_id,
+            limit=limit
         )
         return annotations
     except ValueError as e:
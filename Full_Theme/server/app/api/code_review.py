@@ -3,8 +3,11 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.async_session import get_async_db, run_read
 from app.db.session import get_db
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_user_async
 from app.models.user import User
 from app.services.code_review_service import CodeReviewService
 
@@ -22,19 +25,36 @@ class BulkCodeAssignmentReview(BaseModel):
 
 
 @router.get("/codebooks/{codebook_id}/assignments")
-def get_ai_codebook_assignments(
+async def get_ai_codebook_assignments(
     codebook_id: int,
     status: Optional[str] = Query(
         None, description="Filter by status: pending, accepted, rejected"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    document_id: Optional[int] = None,
+    code_id: Optional[int] = None,
+    min_confidence: Optional[int] = Query(None, ge=0, le=100),
+    max_confidence: Optional[int] = Query(None, ge=0, le=100),
+    sort: str = Query(
+        "id", description="Order: id, confidence_desc or confidence_asc"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     try:
-        result = CodeReviewService.get_ai_codebook_assignments(
-            db=db,
+        result = await run_read(
+            db,
+            CodeReviewService.get_ai_codebook_assignments,
             codebook_id=codebook_id,
             user_id=getattr(current_user, 'id'),
-            status_filter=status
+            status_filter=status,
+            document_id=document_id,
+            code_id=code_id,
+            min_confidence=min_confidence,
+            max_confidence=max_confidence,
+            sort=sort,
+            cursor=cursor,
+            limit=limit
         )
         return result
     except ValueError as e:
@@ -89,43 +109,21 @@ async def bulk_update_assignment_status(
 
 
 @router.get("/projects/{project_id}/ai-codebooks")
-def get_project_ai_codebooks(
+async def get_project_ai_codebooks(
     project_id: int,
     unfinalized_only: bool = Query(
         False, description="Only show unfinalized codebooks needing review"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     try:
-        from app.services.codebook_service import CodebookService
-
-        codebooks = CodebookService.get_project_codebooks(
-            db=db,
+        result = await run_read(
+            db,
+            CodeReviewService.get_project_ai_codebook_summaries,
             project_id=project_id,
-            user_id=getattr(current_user, 'id')
+            user_id=getattr(current_user, 'id'),
+            unfinalized_only=unfinalized_only
         )
-        ai_codebooks = [cb for cb in codebooks if cb.is_ai_generated] # type: ignore
-
-        if unfinalized_only:
-            ai_codebooks = [cb for cb in ai_codebooks if not cb.finalized] # type: ignore
-
-        result = []
-        for codebook in ai_codebooks:
-            assignment_summary = CodeReviewService.get_ai_codebook_assignments(
-                db=db,
-                codebook_id=codebook.id,  # type: ignore
-                user_id=getattr(current_user, 'id')
-            )
-
-            result.append({
-                "id": codebook.id,  # type: ignore
-                "name": codebook.name,  # type: ignore
-                "description": codebook.description,  # type: ignore
-                "is_ai_generated": codebook.is_ai_generated,  # type: ignore
-                "finalized": codebook.finalized,  # type: ignore
-                "created_at": codebook.created_at,  # type: ignore
-                "assignment_summary": assignment_summary["summary"]
-            })
 
         return {
             "ai_codebooks": result,
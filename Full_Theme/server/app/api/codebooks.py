@@ -2,8 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.async_session import get_async_db, run_read
 from app.db.session import get_db
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_user_async
 from app.models.user import User
 from app.schemas.codebook import CodebookOut, CodebookCreate, CodebookUpdate, CodebookWithCodes, MergeCodesToDefaultRequest
 from app.services.codebook_service import CodebookService
@@ -35,19 +38,21 @@ def create_codebook(
 
 
 @router.get("/project/{project_id}", response_model=List[CodebookOut])
-def get_project_codebooks(
+async def get_project_codebooks(
     project_id: int,
     include_collaborator_finalized: bool = False,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get all codebooks for a project. If include_collaborator_finalized=True and user is owner, includes finalized codebooks from collaborators"""
     try:
-        codebooks = CodebookService.get_project_codebooks(
-            db=db,
+        codebooks = await run_read(
+            db,
+            CodebookService.get_project_codebooks,
             project_id=project_id,
             user_id=getattr(current_user, 'id'),
-            include_collaborator_finalized=include_collaborator_finalized
+            include_collaborator_finalized=include_collaborator_finalized,
+            response_model=List[CodebookOut]
         )
         return codebooks
     except ValueError as e:
@@ -140,6 +145,7 @@ def get_user_default_codebook(
             user_id=user_id,
             project_id=project_id
         )
+        db.commit()
         return codebook
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
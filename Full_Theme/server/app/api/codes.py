@@ -2,8 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.async_session import get_async_db, run_read
 from app.db.session import get_db
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user, get_current_user_async
 from app.models.user import User
 from app.schemas.code import CodeOut, CodeCreate, CodeUpdate, CodeGroupAssignment
 from app.services.code_service import CodeService
@@ -39,17 +42,19 @@ def create_code(
 
 
 @router.get("/project/{project_id}", response_model=List[CodeOut])
-def get_project_codes(
+async def get_project_codes(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get all codes for a project"""
     try:
-        codes = CodeService.get_project_codes(
-            db=db,
+        codes = await run_read(
+            db,
+            CodeService.get_project_codes,
             project_id=project_id,
-            user_id=getattr(current_user, 'id')
+            user_id=getattr(current_user, 'id'),
+            response_model=List[CodeOut]
         )
         return codes
     except ValueError as e:
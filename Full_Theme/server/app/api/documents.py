@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 import os
 import pathlib
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
 import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.async_session import get_async_db, run_read
 from app.db.session import get_db, SessionLocal
-from app.core.auth import get_current_user
+from app.core.config import settings
+from app.core.auth import get_current_user, get_current_user_async
 from app.core.permissions import PermissionChecker
 from app.models.user import User
 from app.models.document import DocumentType
-from app.schemas.document import DocumentOut, DocumentUpdate, BulkUploadResult, DocumentUpload
+from app.schemas.document import DocumentOut, DocumentUpdate, BulkUploadResult, DocumentUpload, DocumentSearchResponse
 from app.services.document_service import DocumentService
 
 router = APIRouter()
@@ -101,12 +104,15 @@ async def bulk_upload_documents(
 
     uploaded = []
     failed = []
+    # Each upload opens its own session; bound them so one request cannot drain the pool
+    session_slots = asyncio.Semaphore(settings.DB_BULK_UPLOAD_CONCURRENCY)
 
     async def _wrap(file: UploadFile):
         try:
-            doc = await _do_single_upload(
-                project_id, file, None, None, db, current_user
-            )
+            async with session_slots:
+                doc = await _do_single_upload(
+                    project_id, file, None, None, db, current_user
+                )
             uploaded.append(doc)
         except HTTPException as e:
             failed.append({"filename": file.filename, "error": e.detail})
@@ -126,20 +132,39 @@ async def bulk_upload_documents(
 
 
 @router.get("/project/{project_id}", response_model=List[DocumentOut])
-def get_project_documents(
+async def get_project_documents(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get all documents for a project"""
-    documents = DocumentService.get_documents_by_project(
-        db, project_id, getattr(current_user, 'id')
+    documents = await run_read(
+        db, DocumentService.get_documents_by_project, project_id, getattr(current_user, 'id'),
+        response_model=List[DocumentOut]
     )
     return documents
 
 # Maybe not needed
 
 
+@router.get("/project/{project_id}/search", response_model=DocumentSearchResponse)
+def search_project_documents(
+    project_id: int,
+    q: str = Query(..., min_length=1),
+    mode: Literal["words", "substring"] = "words",
+    document_type: Optional[DocumentType] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Search document content of a project, ranked by relevance with hit offsets"""
+    return DocumentService.search_documents(
+        db, project_id, getattr(current_user, 'id'), q, document_type,
+        mode=mode, skip=skip, limit=limit
+    )
+
+
 @router.get("/{document_id}", response_model=DocumentOut)
 def get_document(
     document_id: int,
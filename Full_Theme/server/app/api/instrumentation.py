@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
+from typing import Any, Dict, Optional
+
+from app.core.auth import security
+from app.core.security import verify_token
+from app.db.session import get_pool_stats
+
+router = APIRouter()
+
+
+def require_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+) -> str:
+    """
+    Validate the bearer token without a database lookup, so the pool can be
+    inspected even while every connection is checked out
+    """
+    email = verify_token(credentials.credentials) if credentials else None
+    if email is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return email
+
+
+@router.get("/db-pool", response_model=Dict[str, Any])
+def get_db_pool_metrics(_: str = Depends(require_token)):
+    """Connection pool occupancy, overflow and checkout wait/hold times"""
+    return get_pool_stats()
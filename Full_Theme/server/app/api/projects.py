@@ -9,7 +9,10 @@ from app.services.project_service import ProjectService
 # from app.services.quote_service import QuoteService
 # from app.services.annotation_service import AnnotationService
 
-from app.core.auth import get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import get_current_user, get_current_user_async
+from app.db.async_session import get_async_db, run_read
 from app.db.session import get_db
 
 router = APIRouter()
@@ -29,14 +32,15 @@ def create_new_project(
 
 
 @router.get("/", response_model=List[ProjectSummary])
-def list_projects(
+async def list_projects(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: UserOut = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserOut = Depends(get_current_user_async)
 ):
     """Get all projects for the current user"""
-    return ProjectService.get_project_summary_list(db, getattr(current_user, 'id'), skip, limit)
+    return await run_read(db, ProjectService.get_project_summary_list, getattr(current_user, 'id'),
+                          skip, limit, response_model=List[ProjectSummary])
 
 
 @router.get("/{project_id}", response_model=ProjectComprehensive)
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.db.session import get_db
+from app.core.auth import get_current_user
+from app.models.user import User
+from app.schemas.search import ProjectSearchResponse, SearchEntityType
+from app.services.search_service import ProjectSearchService
+
+router = APIRouter()
+
+
+@router.get("/project/{project_id}", response_model=ProjectSearchResponse)
+def search_project(
+    project_id: int,
+    q: str = Query(..., min_length=1),
+    types: Optional[List[SearchEntityType]] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Search codes, annotations and coded segments of a project"""
+    try:
+        return ProjectSearchService.search(
+            db=db,
+            project_id=project_id,
+            user_id=getattr(current_user, 'id'),
+            search_text=q,
+            entity_types=types,  # type: ignore
+            skip=skip,
+            limit=limit
+        )
+    except ValueError as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        else:
+            raise HTTPException(status_code=403, detail=str(e))
@@ -1,6 +1,10 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.db.async_session import get_async_db
+from app.db.routing import track_user
 from app.db.session import SessionLocal, get_db
 from app.core.security import verify_token
 from app.services.user_service import get_user_by_email
@@ -25,10 +29,7 @@ class OptionalHTTPBearer(HTTPBearer):
 security = OptionalHTTPBearer()
 
 
-def get_current_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+def _token_email(credentials: Optional[HTTPAuthorizationCredentials]) -> str:
     if credentials is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -44,7 +45,10 @@ def get_current_user(
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = get_user_by_email(db, email=email)
+    return email
+
+
+def _active_user(user: Optional[User]) -> User:
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,5 +63,26 @@ def get_current_user(
     return user
 
 
+def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    email = _token_email(credentials)
+    user = _active_user(get_user_by_email(db, email=email))
+    # Lets the routing session keep this user's reads on the primary after a write
+    track_user(db, user)
+    return user
+
+
+async def get_current_user_async(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """get_current_user for async endpoints, so they never wait on the threadpool"""
+    email = _token_email(credentials)
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    return _active_user(user)
+
+
 def get_current_active_user(current_user=Depends(get_current_user)):
     return current_user
@@ -1,9 +1,27 @@
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
 
+    # Connection pool; pool_size + max_overflow bounds open connections per process
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 0
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 3600
+    DB_CONNECT_TIMEOUT: int = 10
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0 disables the server-side limit (Postgres only)
+    # Extra sessions a single bulk upload request may hold at once
+    DB_BULK_UPLOAD_CONCURRENCY: int = 4
+    # Async engine for read endpoints; derived from DATABASE_URL when unset
+    ASYNC_DATABASE_URL: Optional[str] = None
+    ASYNC_DB_POOL_SIZE: int = 20
+    # Optional read replica for read_only service calls, pooled like the primary
+    REPLICA_DATABASE_URL: Optional[str] = None
+    # How long a user's reads stay on the primary after they commit a write
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0
+
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
@@ -24,6 +42,39 @@ class Settings(BaseSettings):
 
     GOOGLE_API_KEY: str
 
+    # Model per AI service type; unlisted types use AI_DEFAULT_MODEL
+    AI_DEFAULT_MODEL: str = "gemini-2.0-flash"
+    AI_SERVICE_MODELS: Dict[str, str] = {
+        "code_refinement": "gemini-2.0-flash-lite",
+        "code_grouping": "gemini-2.0-flash-lite",
+    }
+    # Coding chunks answered below this confidence (0-1) are re-run on the
+    # escalation model; unset disables escalation
+    AI_ESCALATION_MODEL: Optional[str] = None
+    AI_ESCALATION_CONFIDENCE: float = 0.6
+    # USD per million input, cached input and output tokens, for the
+    # per-phase cost estimate; cached input defaults to the input price
+    AI_MODEL_PRICES: Dict[str, Dict[str, float]] = {
+        "gemini-2.0-flash": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+        "gemini-2.0-flash-lite": {"input": 0.075, "cached_input": 0.01875, "output": 0.30},
+        "gemini-2.5-pro": {"input": 1.25, "cached_input": 0.31, "output": 10.00},
+    }
+    # Batch mode for large coding jobs: adapter name, working directory for
+    # batch files, and how long a submitted batch may wait for ingest before
+    # it expires and its files are deleted
+    AI_BATCH_PROVIDER: str = "local"
+    AI_BATCH_DIR: str = "ai_batches"
+    AI_BATCH_RETENTION_SECONDS: float = 7 * 24 * 3600
+    # Local "fake" provider for load tests and benchmarks: per-call latency,
+    # uniform extra jitter, injected 429 and failure rates, and response seed.
+    # API requests may only select it when ENABLE_FAKE_LLM is on
+    ENABLE_FAKE_LLM: bool = False
+    FAKE_LLM_LATENCY_SECONDS: float = 0.0
+    FAKE_LLM_JITTER_SECONDS: float = 0.0
+    FAKE_LLM_RATE_LIMIT_RATE: float = 0.0
+    FAKE_LLM_FAILURE_RATE: float = 0.0
+    FAKE_LLM_SEED: int = 0
+
     model_config = SettingsConfigDict(env_file=".env")
 
     def __init__(self) -> None:
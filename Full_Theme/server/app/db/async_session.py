@@ -0,0 +1,75 @@
+from typing import Any, AsyncGenerator, Callable, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+
+# Async drivers used in place of the configured sync ones
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+_async_engine: Optional[AsyncEngine] = None
+
+
+def async_database_url(url: str) -> str:
+    """Point a sync database URL at the matching async driver"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    """Create the async engine on first use so sync-only processes never load the drivers"""
+    global _async_engine
+    if _async_engine is None:
+        url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+        options: dict = {"pool_pre_ping": True, "pool_recycle": settings.DB_POOL_RECYCLE}
+        if make_url(url).get_backend_name() == "postgresql":
+            server_settings = {"application_name": "thematic_analysis_app"}
+            if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+                server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+            options.update(
+                pool_size=settings.ASYNC_DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+                connect_args={"timeout": settings.DB_CONNECT_TIMEOUT,
+                              "server_settings": server_settings}
+            )
+        _async_engine = create_async_engine(url, **options)
+    return _async_engine
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal(bind=get_async_engine()) as db:
+        yield db
+
+
+async def run_read(
+    db: AsyncSession,
+    fn: Callable[..., Any],
+    *args: Any,
+    response_model: Any = None,
+    **kwargs: Any
+) -> Any:
+    """
+    Run a synchronous service function on the async session.
+
+    The service receives a regular Session whose I/O goes through the async
+    driver. With response_model the result is serialized before returning, as
+    lazy loads are not possible once back on the event loop.
+    """
+    def call(session):
+        result = fn(session, *args, **kwargs)
+        if response_model is not None:
+            result = TypeAdapter(response_model).validate_python(result, from_attributes=True)
+        return result
+
+    return await db.run_sync(call)
@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """Thread-safe counters describing connection checkout behaviour"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.total_hold_seconds = 0.0
+            self.max_hold_seconds = 0.0
+            self.released = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_hold(self, seconds: float) -> None:
+        with self._lock:
+            self.released += 1
+            self.total_hold_seconds += seconds
+            self.max_hold_seconds = max(self.max_hold_seconds, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "avg_wait_ms": round(1000 * self.total_wait_seconds / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait_seconds, 3),
+                "avg_hold_ms": round(1000 * self.total_hold_seconds / self.released, 3) if self.released else 0.0,
+                "max_hold_ms": round(1000 * self.max_hold_seconds, 3),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait(
+                time.perf_counter() - started, timed_out=True)
+            raise
+        now = time.perf_counter()
+        self.metrics.record_wait(now - started)
+        record.info["checked_out_at"] = now
+        return record
+
+    def _do_return_conn(self, record):
+        checked_out_at = record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            self.metrics.record_hold(time.perf_counter() - checked_out_at)
+        super()._do_return_conn(record)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics  # type: ignore
+        return pool
+
+    def stats(self) -> Dict[str, Any]:
+        """Current pool occupancy plus cumulative checkout metrics"""
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "timeout_seconds": self.timeout(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            # Negative while the pool has not yet opened pool_size connections
+            "overflow": max(self.overflow(), 0),
+            **self.metrics.snapshot(),
+        }
+
@@ -0,0 +1,103 @@
+import datetime
+import functools
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+# Session.info keys
+READ_ONLY_KEY = "read_only_depth"
+USER_ID_KEY = "user_id"
+LAST_WRITE_KEY = "last_write_at"
+WROTE_KEY = "wrote"
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def track_user(db: Session, user) -> None:
+    """Route db for the user acting in it, whose row was just read from the primary"""
+    db.info[USER_ID_KEY] = user.id
+    db.info[LAST_WRITE_KEY] = user.last_write_at
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads made inside read_only service calls to a replica.
+
+    Everything else, including flushes, goes to the primary. The primary is also
+    used while the session holds uncommitted writes, and for a user who has
+    committed a write within DB_READ_YOUR_WRITES_SECONDS, so replica lag never
+    hides their own changes. The time of a user's last write is kept on their
+    users row in the primary, so every worker process sees it.
+    """
+
+    def __init__(self, *args: Any, replica_bind: Optional[Engine] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replica_bind = replica_bind
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.replica_bind is not None and self._use_replica():
+            return self.replica_bind
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def _use_replica(self) -> bool:
+        if not self.info.get(READ_ONLY_KEY) or self._flushing or self.info.get(WROTE_KEY):
+            return False
+        last_write = self.info.get(LAST_WRITE_KEY)
+        return last_write is None or (_utcnow() - last_write).total_seconds() >= settings.DB_READ_YOUR_WRITES_SECONDS
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session: Session, flush_context) -> None:
+    session.info[WROTE_KEY] = True
+
+
+@event.listens_for(RoutingSession, "before_commit")
+def _record_write(session: Session) -> None:
+    user_id = session.info.get(USER_ID_KEY)
+    # Without a replica every read sees the user's writes already
+    if user_id is None or getattr(session, "replica_bind", None) is None:
+        return
+    # Commit flushes after this hook, so pending writes are flushed here to be seen
+    session.flush()
+    if session.info.get(WROTE_KEY):
+        now = _utcnow()
+        session.execute(text("UPDATE users SET last_write_at = :now WHERE id = :user_id"),
+                        {"now": now, "user_id": user_id})
+        session.info[LAST_WRITE_KEY] = now
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _forget_committed(session: Session) -> None:
+    session.info.pop(WROTE_KEY, None)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_writes(session: Session) -> None:
+    session.info.pop(WROTE_KEY, None)
+
+
+@contextmanager
+def replica_reads(db: Session) -> Iterator[Session]:
+    """Allow reads on db to be served by the replica for the duration of the block"""
+    db.info[READ_ONLY_KEY] = db.info.get(READ_ONLY_KEY, 0) + 1
+    try:
+        yield db
+    finally:
+        db.info[READ_ONLY_KEY] -= 1
+
+
+def read_only(fn: Callable) -> Callable:
+    """Mark a service function taking db as first argument as replica-safe"""
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        db = kwargs["db"] if "db" in kwargs else args[0]
+        with replica_reads(db):
+            return fn(*args, **kwargs)
+    return wrapper
@@ -1,24 +1,50 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.db.pool_metrics import InstrumentedQueuePool
+from app.db.routing import RoutingSession
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_size=20,
-    max_overflow=0,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    connect_args={
-        "connect_timeout": 10,
-        "application_name": "thematic_analysis_app"
-    }
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+connect_args = {
+    "connect_timeout": settings.DB_CONNECT_TIMEOUT,
+    "application_name": "thematic_analysis_app"
+}
+if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+    # Server-side cap so a runaway query cannot hold a pooled connection indefinitely
+    connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+
+
+
+def _create_engine(url: str):
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args=connect_args
+    )
+
+
+engine = _create_engine(settings.DATABASE_URL)
+replica_engine = _create_engine(settings.REPLICA_DATABASE_URL) if settings.REPLICA_DATABASE_URL else None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine,
+                            class_=RoutingSession, replica_bind=replica_engine)
 Base = declarative_base()
 
+
+def get_pool_stats() -> dict:
+    """Occupancy and checkout wait/hold metrics of the application pool"""
+    stats = engine.pool.stats()  # type: ignore
+    if replica_engine is not None:
+        stats["replica"] = replica_engine.pool.stats()  # type: ignore
+    return stats
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
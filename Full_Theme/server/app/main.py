@@ -7,7 +7,7 @@ from app.models import (
     Document, Annotation, CodeAssignment
 )
 
-from app.api import auth, users, projects, documents, codes, annotations, code_assignments, ai_services, codebooks, themes, code_review
+from app.api import auth, users, projects, documents, codes, annotations, code_assignments, ai_services, codebooks, themes, code_review, search, instrumentation
 
 app = FastAPI(title="Thematic Analysis AI Tool", version="1.0.0")
 
@@ -40,6 +40,9 @@ app.include_router(code_review.router,
                    prefix="/api/v1/code-review", tags=["Code Review"])
 app.include_router(ai_services.router, prefix="/api/v1/ai",
                    tags=["AI Services"])
+app.include_router(search.router, prefix="/api/v1/search", tags=["Search"])
+app.include_router(instrumentation.router,
+                   prefix="/api/v1/instrumentation", tags=["Instrumentation"])
 
 
 @app.get("/")
@@ -2,14 +2,16 @@
 from .user import User
 from .project import Project, project_collaborators
 from .theme import Theme
-from .codebook import Codebook
+from .codebook import Codebook, CodebookSequence
 from .code import Code
 from .document import Document, DocumentType
 from .annotation import Annotation, AnnotationType
 from .code_assignments import CodeAssignment
+from .ai_coded_chunk import AICodedChunk
+from .ai_batch_job import AIBatchJob
 
 __all__ = [
-    'User', 'Project', 'Theme', 'Codebook', 'Code',
-    'Document', 'Annotation', 'CodeAssignment',
+    'User', 'Project', 'Theme', 'Codebook', 'CodebookSequence', 'Code',
+    'Document', 'Annotation', 'CodeAssignment', 'AICodedChunk', 'AIBatchJob',
     'project_collaborators', 'DocumentType', 'AnnotationType'
 ]
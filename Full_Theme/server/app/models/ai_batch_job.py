@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Boolean
+import datetime
+from app.db.session import Base
+
+
+class AIBatchJob(Base):
+    """An AI coding batch submitted to a batch provider and not yet ingested"""
+    __tablename__ = "ai_batch_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    # Source codebook of a deductive coding job
+    codebook_id = Column(Integer, ForeignKey("codebooks.id", ondelete="CASCADE"), nullable=True)
+
+    service_type = Column(String, nullable=False)
+    document_ids = Column(JSON, nullable=False)
+    incremental = Column(Boolean, default=False, nullable=False)
+    model_name = Column(String, nullable=True)
+    provider = Column(String, nullable=False)
+
+    batch_provider = Column(String, nullable=False)
+    provider_job_id = Column(String, nullable=False)
+    # pending -> ingesting -> completed or failed
+    status = Column(String, default="pending", nullable=False)
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(
+        datetime.timezone.utc), nullable=False)
+    completed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+import datetime
+from app.db.session import Base
+
+
+class AICodedChunk(Base):
+    """A document chunk already coded by an AI initial coding session"""
+    __tablename__ = "ai_coded_chunks"
+    __table_args__ = (
+        # Incremental coding skips chunks coded with the same model and prompt
+        UniqueConstraint("user_id", "document_id", "document_hash", "chunk_hash", "model",
+                         "prompt_version", name="uq_ai_coded_chunks_work"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    # Codes of the chunk live in this codebook; deleting it makes the chunk due again
+    codebook_id = Column(Integer, ForeignKey("codebooks.id", ondelete="CASCADE"), nullable=False)
+
+    document_hash = Column(String, nullable=False)
+    chunk_hash = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(
+        datetime.timezone.utc), nullable=False)
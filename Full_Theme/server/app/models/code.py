@@ -1,6 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON, Index, event, tuple_
 from sqlalchemy.orm import relationship, Session
-from sqlalchemy.event import listen
 import datetime
 from app.db.session import Base
 from app.models.codebook import Codebook
@@ -8,6 +7,10 @@ from app.models.codebook import Codebook
 
 class Code(Base):
     __tablename__ = "codes"
+    __table_args__ = (
+        # Name lookups inside one codebook (merging, moving accepted codes)
+        Index("ix_codes_codebook_id_name", "codebook_id", "name"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -19,7 +22,8 @@ class Code(Base):
     is_active = Column(Boolean, default=True)
     is_auto_generated = Column(Boolean, default=False)
     properties = Column(JSON, nullable=True)
-    codebook_id = Column(Integer, ForeignKey("codebooks.id"), nullable=False)
+    codebook_id = Column(Integer, ForeignKey(
+        "codebooks.id"), nullable=False, index=True)
     group_name = Column(String, nullable=True)
     theme_id = Column(Integer, ForeignKey("themes.id"), nullable=True)
 
@@ -44,34 +48,55 @@ class Code(Base):
     def __repr__(self):
         return f"<Code(id={self.id}, name='{self.name}', project_id={self.project_id})>"
 
-    @staticmethod
-    def get_default_codebook(user_id: int, project_id: int, db: Session):
-        """Fetch or create the default codebook for a user in a project."""
-        default_codebook = db.query(Codebook).filter_by(
-            user_id=user_id, project_id=project_id, is_ai_generated=False
-        ).first()
-        if not default_codebook:
-            default_codebook = Codebook(
+
+DEFAULT_CODEBOOK_CACHE = "default_codebooks"
+
+
+def resolve_default_codebooks(session: Session, flush_context, instances) -> None:
+    """
+    Put new codes without a codebook into their creator's default codebook.
+
+    Runs once per flush for all pending codes: the default codebooks of every
+    (user, project) pair are looked up in one query, missing ones are created
+    in the same flush, and the result is cached on the session until the
+    transaction ends.
+    """
+    pending = [obj for obj in session.new
+               if isinstance(obj, Code) and obj.codebook_id is None and obj.codebook is None]
+    if not pending:
+        return
+
+    cache = session.info.setdefault(DEFAULT_CODEBOOK_CACHE, {})
+    missing = {(code.created_by_id, code.project_id) for code in pending} - set(cache)
+    if missing:
+        with session.no_autoflush:
+            for codebook in session.query(Codebook).filter(
+                tuple_(Codebook.user_id, Codebook.project_id).in_(missing),
+                Codebook.is_ai_generated == False
+            ).order_by(Codebook.id.desc()):
+                # Descending ids leave the oldest default codebook in the cache
+                cache[(codebook.user_id, codebook.project_id)] = codebook
+
+        for user_id, project_id in missing - set(cache):
+            codebook = Codebook(
                 name="Default Codebook",
                 user_id=user_id,
                 project_id=project_id,
                 is_ai_generated=False,
-                description="Default codebook for user.",
-            )
-            db.add(default_codebook)
-            db.commit()
-            db.refresh(default_codebook)
-        return default_codebook
-
-    @staticmethod
-    def set_default_codebook_id(mapper, connection, target):
-        """Set the default codebook_id before inserting a new Code."""
-        if not target.codebook_id:
-            db = Session(bind=connection)
-            default_codebook = Code.get_default_codebook(
-                user_id=target.created_by_id, project_id=target.project_id, db=db
+                description="Default codebook for user-created codes."
             )
-            target.codebook_id = default_codebook.id
+            session.add(codebook)
+            cache[(user_id, project_id)] = codebook
+
+    for code in pending:
+        code.codebook = cache[(code.created_by_id, code.project_id)]
+
+
+def clear_default_codebook_cache(session: Session, *args) -> None:
+    """Cached codebooks may be rolled back or expire with the transaction"""
+    session.info.pop(DEFAULT_CODEBOOK_CACHE, None)
 
 
-listen(Code, 'before_insert', Code.set_default_codebook_id)
+event.listen(Session, "before_flush", resolve_default_codebooks)
+event.listen(Session, "after_commit", clear_default_codebook_cache)
+event.listen(Session, "after_rollback", clear_default_codebook_cache)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, String
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, String, UniqueConstraint
 from sqlalchemy.orm import relationship
 import datetime
 from app.db.session import Base
@@ -6,10 +6,18 @@ from app.db.session import Base
 
 class CodeAssignment(Base):
     __tablename__ = "code_assignments"
+    __table_args__ = (
+        # A user assigns a code to a given span at most once; bulk inserts
+        # rely on this key for ON CONFLICT DO NOTHING
+        UniqueConstraint("document_id", "code_id", "start_char", "end_char",
+                         "created_by_id", name="uq_code_assignments_span"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
-    code_id = Column(Integer, ForeignKey("codes.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey(
+        "documents.id"), nullable=False, index=True)
+    code_id = Column(Integer, ForeignKey(
+        "codes.id"), nullable=False, index=True)
 
     start_char = Column(Integer, nullable=False)
     end_char = Column(Integer, nullable=False)
@@ -1,11 +1,16 @@
 from typing import Optional, Dict, Any
 import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
 class Codebook(Base):
     __tablename__ = "codebooks"
+    __table_args__ = (
+        # AI session names are numbered per user and project and must not repeat
+        Index("uq_codebooks_ai_session_name", "user_id", "project_id", "name", unique=True,
+              postgresql_where=text("is_ai_generated"), sqlite_where=text("is_ai_generated")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -23,4 +28,14 @@ class Codebook(Base):
     # Relationships
     user = relationship("User", back_populates="codebooks")
     project = relationship("Project", back_populates="codebooks")
-    codes = relationship("Code", back_populates="codebook", cascade="all, delete-orphan")
\ No newline at end of file
+    codes = relationship("Code", back_populates="codebook", cascade="all, delete-orphan")
+
+
+class CodebookSequence(Base):
+    """Last AI session number handed out per user, project and session type"""
+    __tablename__ = "codebook_sequences"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    session_type = Column(String, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
@@ -30,7 +30,8 @@ class Document(Base):
 
     document_type = Column(Enum(DocumentType), nullable=False)
 
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey(
+        "projects.id"), nullable=False, index=True)
     uploaded_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.now(
         datetime.timezone.utc), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, DateTime
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -12,6 +12,9 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     oauth_provider = Column(String, nullable=True)
     oauth_id = Column(String, nullable=True)
+    # Last commit with writes on the primary (naive UTC); keeps the user's
+    # reads off the replica for DB_READ_YOUR_WRITES_SECONDS in every worker
+    last_write_at = Column(DateTime, nullable=True)
 
     owned_projects = relationship(
         "Project", back_populates="owner", foreign_keys="Project.owner_id")
@@ -1,20 +1,45 @@
-from typing import List
-from pydantic import BaseModel, Field
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from app.core.config import settings
 
 # Endpoint schemas for AI services
 
 
-class InitialCodingRequest(BaseModel):
+class AIModelSelection(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    # Runs every phase on this model; unset uses the per-phase model configuration
+    model_name: Optional[str] = None
+    provider: str = "google_genai"
+
+    @field_validator("provider")
+    @classmethod
+    def fake_provider_enabled(cls, provider: str) -> str:
+        # The fake provider writes synthetic codes, so clients only get it on test deployments
+        from app.services.ai.fake_llm import FAKE_PROVIDER
+        if provider == FAKE_PROVIDER and not settings.ENABLE_FAKE_LLM:
+            raise ValueError("The fake LLM provider is not enabled")
+        return provider
+
+
+class InitialCodingRequest(AIModelSelection):
     document_ids: List[int]
+    # Only code chunks not coded before and add the codes to the latest session codebook
+    incremental: bool = False
+    # Submit all chunks through the batch provider and return the batch job;
+    # POST /ai/batches/{job_id}/ingest finishes the run
+    batch: bool = False
 
 
-class ThemeGenerationRequest(BaseModel):
+class ThemeGenerationRequest(AIModelSelection):
     codebook_id: int
 
 
-class DeductiveCodingRequest(BaseModel):
+class DeductiveCodingRequest(AIModelSelection):
     document_ids: List[int]
     codebook_id: int
+    batch: bool = False
 
 
 # LLM output schemas
@@ -62,6 +87,27 @@ class ThemeOutput(BaseModel):
         description="List of code names that relate to this theme.")
 
 
+class MergedTheme(BaseModel):
+    """
+    A final theme built from one or more candidate themes.
+    """
+    theme_name: str = Field(description="The name of the final theme.")
+    theme_description: str = Field(
+        description="Detailed description of the final theme.")
+    source_themes: List[str] = Field(
+        description="Exact names of the candidate themes merged into this theme.")
+
+
+class ThemeMergingOutput(BaseModel):
+    """
+    Represents the output of consolidating candidate themes.
+    """
+    reasoning: str = Field(
+        description="The reasoning behind merging and keeping themes.")
+    themes: List[MergedTheme] = Field(
+        description="The final themes.")
+
+
 class DeductiveCodingOutput(BaseModel):
     """
     Represents the output of deductive coding using existing codes.
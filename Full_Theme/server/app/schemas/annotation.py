@@ -15,6 +15,7 @@ class AnnotationCreate(AnnotationBase):
     start_char: Optional[int] = None
     end_char: Optional[int] = None
     text_snapshot: Optional[str] = None
+    parent_id: Optional[int] = None  # Set when replying to another annotation
 
 
 class AnnotationUpdate(BaseModel):
@@ -29,6 +30,7 @@ class AnnotationOut(AnnotationBase):
     document_id: Optional[int] = None
     code_id: Optional[int] = None
     project_id: int
+    parent_id: Optional[int] = None
     start_char: Optional[int] = None
     end_char: Optional[int] = None
     text_snapshot: Optional[str] = None
@@ -70,4 +70,30 @@ class BulkUploadResult(BaseModel):
     failed_uploads: List[Dict[str, Any]]
     total_files: int
     total_uploaded: int
-    total_errors: int
\ No newline at end of file
+    total_errors: int
+
+class DocumentSearchHit(BaseModel):
+    """A single match inside a document, with offsets into Document.content"""
+    start_char: int
+    end_char: int
+    snippet: str
+
+
+class DocumentSearchResult(BaseModel):
+    """A ranked document matching a search query"""
+    document_id: int
+    name: str
+    document_type: DocumentType
+    score: float
+    hit_count: int
+    hits: List[DocumentSearchHit] = []
+
+
+class DocumentSearchResponse(BaseModel):
+    """Paginated response schema for document search"""
+    query: str
+    mode: Literal["words", "substring"] = "words"
+    total: int
+    skip: int
+    limit: int
+    results: List[DocumentSearchResult] = []
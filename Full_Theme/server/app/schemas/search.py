@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Literal
+
+
+SearchEntityType = Literal["code", "annotation", "code_assignment"]
+
+
+class SearchHit(BaseModel):
+    """A matched term inside one field of a search result"""
+    field: str  # name, description, content, text_snapshot
+    start_char: int
+    end_char: int
+    snippet: str
+
+
+class SearchResult(BaseModel):
+    entity_type: SearchEntityType
+    entity_id: int
+    score: float
+    title: str
+    document_id: Optional[int] = None
+    code_id: Optional[int] = None
+    # Position of a code assignment inside its document
+    start_char: Optional[int] = None
+    end_char: Optional[int] = None
+    hit_count: int = 0
+    hits: List[SearchHit] = []
+
+
+class ProjectSearchResponse(BaseModel):
+    query: str
+    total: int
+    skip: int
+    limit: int
+    counts: Dict[str, int] = {}
+    results: List[SearchResult] = []
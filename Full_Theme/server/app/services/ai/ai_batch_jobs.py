@@ -0,0 +1,102 @@
+import datetime
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.ai_batch_job import AIBatchJob
+
+JOB_PENDING = "pending"
+JOB_INGESTING = "ingesting"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_EXPIRED = "expired"
+
+
+class AIBatchJobs:
+    """Submitted AI coding batches, kept until their results are ingested"""
+
+    @staticmethod
+    def create(
+        db: Session,
+        user_id: int,
+        project_id: int,
+        service_type: str,
+        document_ids: List[int],
+        provider: str,
+        batch_provider: str,
+        provider_job_id: str,
+        model_name: Optional[str] = None,
+        codebook_id: Optional[int] = None,
+        incremental: bool = False
+    ) -> AIBatchJob:
+        job = AIBatchJob(
+            user_id=user_id,
+            project_id=project_id,
+            codebook_id=codebook_id,
+            service_type=service_type,
+            document_ids=list(document_ids),
+            incremental=incremental,
+            model_name=model_name,
+            provider=provider,
+            batch_provider=batch_provider,
+            provider_job_id=provider_job_id,
+            status=JOB_PENDING
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def get(db: Session, job_id: int, user_id: int) -> AIBatchJob:
+        job = db.query(AIBatchJob).filter(
+            AIBatchJob.id == job_id, AIBatchJob.user_id == user_id).first()
+        if not job:
+            raise ValueError("Batch job not found")
+        return job
+
+    @staticmethod
+    def claim(db: Session, job: AIBatchJob) -> bool:
+        """Move a pending job to ingesting; False if another request got there first"""
+        claimed = db.query(AIBatchJob).filter(
+            AIBatchJob.id == job.id, AIBatchJob.status == JOB_PENDING
+        ).update({"status": JOB_INGESTING}, synchronize_session=False)
+        db.commit()
+        db.refresh(job)
+        return claimed == 1
+
+    @staticmethod
+    def release(db: Session, job: AIBatchJob, error: str) -> None:
+        """Put a job whose ingest failed back to pending so it can be ingested again"""
+        job.status = JOB_PENDING
+        job.error = error
+        db.commit()
+
+    @staticmethod
+    def stale(db: Session, retention_seconds: float) -> List[AIBatchJob]:
+        """Jobs not ingested within retention_seconds of being submitted
+
+        Jobs stuck in ingesting, e.g. after the process died mid-ingest, count too.
+        """
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=retention_seconds)
+        return db.query(AIBatchJob).filter(
+            AIBatchJob.status.in_([JOB_PENDING, JOB_INGESTING]), AIBatchJob.created_at < cutoff).all()
+
+    @staticmethod
+    def finish(db: Session, job: AIBatchJob, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.completed_at = datetime.datetime.now(datetime.timezone.utc)
+        db.commit()
+
+    @staticmethod
+    def describe(job: AIBatchJob) -> dict:
+        return {
+            "id": job.id,
+            "service_type": job.service_type,
+            "status": job.status,
+            "document_ids": job.document_ids,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "completed_at": job.completed_at.isoformat() if job.completed_at else None
+        }
@@ -1,10 +1,17 @@
 from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
 from app.schemas.ai_services import MultipleCodesOutput, DeductiveCodingOutput
 from app.services.ai.llm_service import LLMService
 from app.services.codebook_service import CodebookService
 from app.services.ai.ai_coding_validators import AICodingValidators
 from app.services.ai.ai_coding_utils import AICodingUtils
-from app.utils.chunks import create_chunks
+from app.prompts.initial_coding import PROMPT_VERSION
+from app.services.ai.ai_coding_ledger import AICodingLedger
+from app.services.ai.chunk_dedup import ChunkOccurrence, UniqueChunk, plan_unique_chunks, quote_span
+from app.services.ai.chunk_recovery import ChunkDispatcher
+from app.services.ai.batch_coding import BatchChunkRunner, BatchProvider
+from app.core.config import settings
+from app.services.ai.code_relevance import CodeRelevanceIndex
 
 
 class AICodeGenerationService:
@@ -15,16 +22,32 @@ class AICodeGenerationService:
         document_ids: list[int],
         db: Session,
         user_id: int,
-        model_name: str = "gemini-2.0-flash",
-        provider: str = "google_genai"
+        model_name: Optional[str] = None,
+        provider: str = "google_genai",
+        incremental: bool = False,
+        llm_service: Optional[LLMService] = None,
+        batch_provider: Optional[BatchProvider] = None,
+        batch_job_id: Optional[str] = None
     ) -> dict:
-        """Generate initial codes and assignments, keeping everything in memory"""
+        """Generate initial codes and assignments, keeping everything in memory
+
+        With incremental, chunks coded by earlier sessions with the same model
+        and prompt version are skipped and the latest unfinalized session
+        codebook is reused. Coded chunks are returned as "coded_chunks".
+        Pass llm_service to share its model routing and metrics with later phases.
+        With batch_provider, all chunk prompts are submitted as one batch and
+        only the provider's job id is returned as "batch_job_id"; calling again
+        with that batch_job_id codes the chunks from the batch results. New
+        codes then only reach the prompts of later sessions.
+        """
         print(
             f"🚀 Starting AI code generation for {len(document_ids)} documents (in-memory)")
 
-        llm_service = LLMService(model_name=model_name, provider=provider)
+        llm_service = llm_service or LLMService(
+            model_name=model_name, provider=provider)
 
         # Validation (still need to read from DB)
+        ai_session_codebook = None
         try:
             documents = AICodingValidators.get_and_validate_documents(
                 db, document_ids, user_id)
@@ -38,90 +61,111 @@ class AICodeGenerationService:
             if not project:
                 return AICodeGenerationService._create_empty_response(None)
 
-            # Create AI session codebook (this needs to be in DB)
-            ai_session_codebook = CodebookService.get_or_create_ai_session_codebook(
-                db=db,
-                user_id=user_id,
-                project_id=documents[0].project_id,  # type: ignore
-                session_type="AI_initial_coding"
-            )
-
-            # Get existing codes context
+            # Index existing codes so each chunk only gets the relevant ones
             existing_codes = AICodingValidators.get_existing_codes(
                 db, documents[0].project_id, user_id)  # type: ignore
-            existing_codes_text = AICodingUtils.format_codes_for_llm(
-                existing_codes)
+            code_index = CodeRelevanceIndex(existing_codes)
 
             # Process documents and generate code requests (in-memory)
             codes_dict = {}  # code_name -> code_data
             assignments = []  # list of assignment_data
 
-            for document in documents:
-                print(f"Processing document ID: {document.id}")
+            # Repeated chunks across the documents are coded once
+            unique_chunks, total_chunks, skipped_chunks = plan_unique_chunks(
+                documents, chunk_size=4000)
+            print(
+                f"Created {total_chunks} chunks: {len(unique_chunks)} unique, {skipped_chunks} without content")
+            if incremental:
+                unique_chunks = AICodingLedger.filter_uncoded(
+                    db, unique_chunks, user_id,
+                    f"{provider}/{llm_service.router.model_for('initial_coding')}", PROMPT_VERSION)
+                print(f"{len(unique_chunks)} chunks not coded by earlier sessions")
+
+            # The cached prompt prefix lists the codebook as it was when the run
+            # started; codes created during the run only reach existing_codes
+            codebook_listing = code_index.format_codebook()
+
+            def build_input(text: str) -> dict:
+                return {
+                    "text": text,
+                    "research_context": research_context,
+                    "codebook": codebook_listing,
+                    "existing_codes": code_index.format_relevant(text)
+                }
 
-                chunks = create_chunks(str(document.content), chunk_size=4000)
+            def code_chunk(text: str) -> MultipleCodesOutput:
+                return AICodingUtils.make_escalating_llm_call(
+                    llm_service=llm_service,
+                    service_type="initial_coding",
+                    input_data=build_input(text),
+                    provider=provider,
+                    confidence=lambda response: min(
+                        (code.confidence for code in response.codes), default=100) / 100
+                )
+
+            def handle_codes(unique_chunk: UniqueChunk, coding_response: MultipleCodesOutput):
                 print(
-                    f"Created {len(chunks)} chunks for document {document.id}")
-
-                for chunk_idx, chunk in enumerate(chunks):
-                    chunk_num = chunk_idx + 1
-                    print(
-                        f"Processing chunk {chunk_num}/{len(chunks)} for document {document.id}")
-
-                    try:
-                        coding_response: MultipleCodesOutput = AICodingUtils.make_rate_limited_llm_call(
-                            llm_service=llm_service,
-                            service_type="initial_coding",
-                            input_data={
-                                "text": chunk,
-                                "research_context": research_context,
-                                "existing_codes": existing_codes_text
-                            },
-                            provider=provider
-                        )
-
-                        print(f"✅ Chunk {chunk_num} succeeded")
-                        print(
-                            f"LLM Response - Found {len(coding_response.codes)} codes in chunk")
-
-                        # Process each code (in-memory)
-                        for code_output in coding_response.codes:
-                            code_name = code_output.code
-
-                            # Add code to in-memory dict
-                            if code_name not in codes_dict:
-                                codes_dict[code_name] = {
-                                    "name": code_name,
-                                    "description": code_output.code_description or f"Auto-created code: {code_name}",
-                                    "color": "#3B82F6",
-                                    "project_id": document.project_id,
-                                    "is_auto_generated": True,
-                                    "status": "created"
-                                }
-                                print(f"Code: {code_name}, Is new: True")
-                            else:
-                                print(f"Code: {code_name}, Is new: False")
-
-                            # Add assignment to in-memory list
-                            quote = code_output.quote
-                            start_char = chunk.find(quote) if quote else 0
-                            end_char = start_char + \
-                                len(quote) if quote else len(chunk)
-
-                            assignments.append({
-                                "document_id": document.id,
-                                "code_name": code_name,
-                                "start_char": start_char,
-                                "end_char": end_char,
-                                "text": quote or chunk[:100] + "...",
-                                "confidence": code_output.confidence,
-                                "status": "created"
-                            })
-
-                    except Exception as e:
-                        print(
-                            f"❌ Error processing chunk {chunk_num}: {str(e)}")
-                        continue
+                    f"LLM Response - Found {len(coding_response.codes)} codes in chunk")
+
+                # Process each code (in-memory)
+                for code_output in coding_response.codes:
+                    code_name = code_output.code
+
+                    # Add code to in-memory dict
+                    if code_name not in codes_dict:
+                        codes_dict[code_name] = {
+                            "name": code_name,
+                            "description": code_output.code_description or f"Auto-created code: {code_name}",
+                            "color": "#3B82F6",
+                            "project_id": unique_chunk.occurrences[0].project_id,
+                            "is_auto_generated": True,
+                            "status": "created"
+                        }
+                        if code_name not in code_index:
+                            code_index.update(
+                                code_name, codes_dict[code_name]["description"])
+                        print(f"Code: {code_name}, Is new: True")
+                    else:
+                        print(f"Code: {code_name}, Is new: False")
+
+                    # Add an assignment for every occurrence of the chunk
+                    for occurrence, start_char, end_char in AICodeGenerationService._fan_out(
+                            unique_chunk, code_output.quote):
+                        assignments.append({
+                            "document_id": occurrence.document_id,
+                            "code_name": code_name,
+                            "start_char": start_char,
+                            "end_char": end_char,
+                            "text": code_output.quote or occurrence.chunk[:100] + "...",
+                            "confidence": code_output.confidence,
+                            "status": "created"
+                        })
+
+            batch_runner = AICodeGenerationService._batch_runner(
+                batch_provider, "initial_coding", MultipleCodesOutput, llm_service) if batch_provider else None
+            if batch_runner is not None and batch_job_id is None:
+                return AICodeGenerationService._create_submitted_response(
+                    batch_runner.submit(unique_chunks, build_input), documents[0].project_id, unique_chunks)
+
+            # Create AI session codebook (this needs to be in DB)
+            ai_session_codebook = CodebookService.get_or_create_ai_session_codebook(
+                db=db,
+                user_id=user_id,
+                project_id=documents[0].project_id,  # type: ignore
+                session_type="AI_initial_coding",
+                reuse_latest=incremental
+            )
+
+            # Failed chunks are split or retried; only what stays uncoded is reported
+            if batch_runner is not None:
+                fully_coded, unrecoverable_spans = batch_runner.collect(
+                    batch_job_id, unique_chunks, handle_codes, fallback=code_chunk)
+            else:
+                fully_coded, unrecoverable_spans = ChunkDispatcher(
+                    code_chunk, handle_codes).run(unique_chunks)
+            # Partly coded chunks are left out so an incremental run codes them again
+            coded_chunks = [
+                occurrence for unique_chunk in fully_coded for occurrence in unique_chunk.occurrences]
 
             print(
                 f"Generated {len(assignments)} assignments for {len(codes_dict)} unique codes (in-memory)")
@@ -130,18 +174,24 @@ class AICodeGenerationService:
                 "results": assignments,  # For compatibility with main service
                 "codes_dict": codes_dict,
                 "assignments": assignments,
+                "coded_chunks": coded_chunks,
                 "ai_session_codebook": ai_session_codebook,
                 "summary": {
                     "total_requests": len(assignments),
                     "total_codes": len(codes_dict),
                     "successful_assignments": len(assignments),
                     "codes_created": len(codes_dict),
+                    "chunks_coded": len(fully_coded),
+                    "unrecoverable_spans": unrecoverable_spans,
                     "errors": []
                 }
             }
 
         except Exception as e:
             print(f"Error in in-memory code generation: {str(e)}")
+            if batch_job_id is not None:
+                # The caller keeps the paid-for batch results to retry with
+                raise
             return AICodeGenerationService._create_empty_response(ai_session_codebook)
 
     @staticmethod
@@ -150,14 +200,21 @@ class AICodeGenerationService:
         codebook_id: int,
         db: Session,
         user_id: int,
-        model_name: str = "gemini-2.0-flash",
-        provider: str = "google_genai"
+        model_name: Optional[str] = None,
+        provider: str = "google_genai",
+        llm_service: Optional[LLMService] = None,
+        batch_provider: Optional[BatchProvider] = None,
+        batch_job_id: Optional[str] = None
     ) -> dict:
-        """Generate deductive codes and assignments, keeping everything in memory"""
+        """Generate deductive codes and assignments, keeping everything in memory
+
+        batch_provider and batch_job_id work as for generate_initial_codes_in_memory.
+        """
         print(
             f"🚀 Starting deductive coding for {len(document_ids)} documents (in-memory)")
 
-        llm_service = LLMService(model_name=model_name, provider=provider)
+        llm_service = llm_service or LLMService(
+            model_name=model_name, provider=provider)
 
         # Validation
         documents = AICodingValidators.get_and_validate_documents(
@@ -177,13 +234,8 @@ class AICodeGenerationService:
         if not project:
             return AICodeGenerationService._create_empty_response(None)
 
-        # Create AI session codebook (this needs to be in DB)
-        ai_session_codebook = CodebookService.get_or_create_ai_session_codebook(
-            db=db,
-            user_id=user_id,
-            project_id=documents[0].project_id,  # type: ignore
-            session_type="AI_deductive_coding"
-        )
+        # Every code stays assignable, so the listing is not capped
+        code_index = CodeRelevanceIndex(codebook.codes, names_limit=None)
 
         # Process documents for deductive coding (in-memory)
         codes_dict = {}  # code_name -> code_data
@@ -200,69 +252,84 @@ class AICodeGenerationService:
                 "status": "existing"
             }
 
-        for document in documents:
-            print(f"Processing document ID: {document.id}")
+        # Repeated chunks across the documents are coded once
+        unique_chunks, total_chunks, skipped_chunks = plan_unique_chunks(
+            documents, chunk_size=4000)
+        print(
+            f"Created {total_chunks} chunks: {len(unique_chunks)} unique, {skipped_chunks} without content")
 
-            chunks = create_chunks(str(document.content), chunk_size=4000)
-            print(f"Created {len(chunks)} chunks for document {document.id}")
+        codebook_listing = code_index.format_codebook()
 
-            for chunk_idx, chunk in enumerate(chunks):
-                chunk_num = chunk_idx + 1
-                print(
-                    f"Processing chunk {chunk_num}/{len(chunks)} for document {document.id}")
-
-                try:
-                    # Format codes for LLM
-                    codes_text = "\n".join(
-                        [f"- {code.name}: {code.description}" for code in codebook.codes])
-
-                    deductive_response: DeductiveCodingOutput = AICodingUtils.make_rate_limited_llm_call(
-                        llm_service=llm_service,
-                        service_type="deductive_coding",
-                        input_data={
-                            "text": chunk,
-                            "research_context": research_context,
-                            "available_codes": codes_text
-                        },
-                        provider=provider
-                    )
-
-                    print(f"✅ Chunk {chunk_num} succeeded")
-                    print(
-                        f"LLM Response - Found {len(deductive_response.assigned_codes)} code assignments in chunk")
-
-                    # Process each assigned code (in-memory)
-                    for i, code_name in enumerate(deductive_response.assigned_codes):
-                        if code_name in codes_dict:
-                            # Calculate character positions
-                            quote = deductive_response.quote
-                            start_char = chunk.find(quote) if quote else 0
-                            end_char = start_char + \
-                                len(quote) if quote else len(chunk)
-
-                            # Get confidence score if available
-                            confidence = 75  # default
-                            if (hasattr(deductive_response, 'confidence_scores') and
-                                deductive_response.confidence_scores and
-                                    i < len(deductive_response.confidence_scores)):
-                                confidence = int(
-                                    deductive_response.confidence_scores[i] * 100)
-
-                            assignments.append({
-                                "document_id": document.id,
-                                "code_name": code_name,
-                                "start_char": start_char,
-                                "end_char": end_char,
-                                "text": quote or chunk[:100] + "...",
-                                "confidence": confidence,
-                                "status": "created"
-                            })
-
-                            print(f"Added assignment for code: {code_name}")
-
-                except Exception as e:
-                    print(f"❌ Error processing chunk {chunk_num}: {str(e)}")
-                    continue
+        def build_input(text: str) -> dict:
+            return {
+                "text": text,
+                "research_context": research_context,
+                "codebook": codebook_listing,
+                "available_codes": code_index.format_relevant(text)
+            }
+
+        def code_chunk(text: str) -> DeductiveCodingOutput:
+            return AICodingUtils.make_escalating_llm_call(
+                llm_service=llm_service,
+                service_type="deductive_coding",
+                input_data=build_input(text),
+                provider=provider,
+                confidence=lambda response: min(response.confidence_scores, default=None)
+            )
+
+        def handle_assignments(unique_chunk: UniqueChunk, deductive_response: DeductiveCodingOutput):
+            print(
+                f"LLM Response - Found {len(deductive_response.assigned_codes)} code assignments in chunk")
+
+            # Calculate character positions in every occurrence of the chunk
+            quote = deductive_response.quote
+            spans = AICodeGenerationService._fan_out(unique_chunk, quote)
+
+            # Process each assigned code (in-memory)
+            for i, code_name in enumerate(deductive_response.assigned_codes):
+                if code_name in codes_dict:
+                    # Get confidence score if available
+                    confidence = 75  # default
+                    if (hasattr(deductive_response, 'confidence_scores') and
+                        deductive_response.confidence_scores and
+                            i < len(deductive_response.confidence_scores)):
+                        confidence = int(
+                            deductive_response.confidence_scores[i] * 100)
+
+                    for occurrence, start_char, end_char in spans:
+                        assignments.append({
+                            "document_id": occurrence.document_id,
+                            "code_name": code_name,
+                            "start_char": start_char,
+                            "end_char": end_char,
+                            "text": quote or occurrence.chunk[:100] + "...",
+                            "confidence": confidence,
+                            "status": "created"
+                        })
+
+                    print(f"Added assignment for code: {code_name}")
+
+        batch_runner = AICodeGenerationService._batch_runner(
+            batch_provider, "deductive_coding", DeductiveCodingOutput, llm_service) if batch_provider else None
+        if batch_runner is not None and batch_job_id is None:
+            return AICodeGenerationService._create_submitted_response(
+                batch_runner.submit(unique_chunks, build_input), documents[0].project_id, unique_chunks)
+
+        # Create AI session codebook (this needs to be in DB)
+        ai_session_codebook = CodebookService.get_or_create_ai_session_codebook(
+            db=db,
+            user_id=user_id,
+            project_id=documents[0].project_id,  # type: ignore
+            session_type="AI_deductive_coding"
+        )
+
+        # Failed chunks are split or retried; only what stays uncoded is reported
+        if batch_runner is not None:
+            _, unrecoverable_spans = batch_runner.collect(
+                batch_job_id, unique_chunks, handle_assignments, fallback=code_chunk)
+        else:
+            _, unrecoverable_spans = ChunkDispatcher(
+                code_chunk, handle_assignments).run(unique_chunks)
 
         print(
             f"Generated {len(assignments)} assignments for {len(codes_dict)} codes (in-memory)")
@@ -277,11 +344,40 @@ class AICodeGenerationService:
                 "total_codes": len(codes_dict),
                 "successful_assignments": len(assignments),
                 "codes_created": 0,  # No new codes created in deductive coding
+                "unrecoverable_spans": unrecoverable_spans,
                 "errors": []
             }
         }
 
     # Helper methods
+    @staticmethod
+    def _batch_runner(
+        batch_provider: BatchProvider, service_type: str, output_schema, llm_service: LLMService
+    ) -> BatchChunkRunner:
+        return BatchChunkRunner(batch_provider, service_type, output_schema,
+                                work_dir=settings.AI_BATCH_DIR, metrics=llm_service.metrics)
+
+    @staticmethod
+    def _create_submitted_response(batch_job_id: str, project_id: int, unique_chunks: List[UniqueChunk]) -> dict:
+        return {
+            "ai_session_codebook": None,
+            "batch_job_id": batch_job_id,
+            "project_id": project_id,
+            "results": [],
+            "summary": {"chunks_submitted": len(unique_chunks)}
+        }
+
+    @staticmethod
+    def _fan_out(unique_chunk: UniqueChunk, quote: Optional[str]) -> List[Tuple[ChunkOccurrence, int, int]]:
+        """Document spans of a quote in every occurrence of a dispatched chunk"""
+        spans = []
+        for occurrence in unique_chunk.occurrences:
+            span = quote_span(occurrence, quote,
+                              exact=occurrence.chunk == unique_chunk.text)
+            if span is not None:
+                spans.append((occurrence, *span))
+        return spans
+
     @staticmethod
     def _create_empty_response(ai_session_codebook) -> dict:
         if ai_session_codebook is None:
@@ -1,8 +1,16 @@
 from sqlalchemy.orm import Session
 from collections import defaultdict
+from typing import List, Optional
 from app.schemas.ai_services import CodeGroupingOutput
 from app.services.ai.llm_service import LLMService
 from app.services.ai.ai_coding_utils import AICodingUtils
+from app.services.ai.code_clustering import cluster_codes
+from app.utils.search_index import query_terms
+
+# Codes per grouping call; keeps prompt and output size bounded
+GROUPING_PARTITION_SIZE = 30
+# Grouping calls in flight at once
+GROUPING_CONCURRENCY = 4
 
 
 class AICodeGroupingService:
@@ -42,33 +50,36 @@ class AICodeGroupingService:
                     "description": code_data.get("description", ""),
                 }
 
-        codes_summary, assignments_sample = AICodeGroupingService._prepare_llm_input(
-            codes_info, code_assignments
+        # Related codes are grouped together in bounded, concurrent calls
+        partitions = AICodeGroupingService._partition_codes(codes_info, assignments)
+        print(f"Partitioned {len(codes_info)} codes into {len(partitions)} grouping calls")
+        responses = AICodingUtils.run_parallel(
+            lambda partition: AICodeGroupingService._group_partition(
+                partition, codes_info, code_assignments, llm_service, provider),
+            partitions,
+            max_workers=GROUPING_CONCURRENCY
         )
 
-        try:
-            grouping_response: CodeGroupingOutput = AICodingUtils.make_rate_limited_llm_call(
-                llm_service=llm_service,
-                service_type="code_grouping",
-                input_data={
-                    "codes_summary": codes_summary,
-                    "assignments_sample": assignments_sample
-                },
-                provider=provider
-            )
-
-            # Apply grouping to in-memory codes
-            groups_applied = 0
+        # Apply grouping to in-memory codes; equally named groups of
+        # different partitions share one name
+        group_names = {}
+        groups_applied = 0
+        for partition, grouping_response in zip(partitions, responses):
+            if grouping_response is None:
+                continue
+            partition_codes = set(partition)
             for group in grouping_response.groups:
+                group_name = AICodeGroupingService._reconcile_group_name(
+                    group_names, group.group_name)
                 print(
-                    f"📋 Applying group '{group.group_name}' to codes: {group.code_names}")
+                    f"📋 Applying group '{group_name}' to codes: {group.code_names}")
 
                 for code_name in group.code_names:
-                    if code_name in codes_dict:
-                        codes_dict[code_name]["group_name"] = group.group_name
+                    if code_name in codes_dict and code_name in partition_codes:
+                        codes_dict[code_name]["group_name"] = group_name
                         groups_applied += 1
                         print(
-                            f"✅ Applied group '{group.group_name}' to code '{code_name}'")
+                            f"✅ Applied group '{group_name}' to code '{code_name}'")
                     else:
                         print(f"⚠️ Code '{code_name}' not found in codes_dict")
 
@@ -76,14 +87,57 @@ class AICodeGroupingService:
                 print(
                     f"📝 Ungrouped codes: {grouping_response.ungrouped_codes}")
 
-            print(
-                f"✅ In-memory grouping complete: {groups_applied} codes grouped")
+        print(
+            f"✅ In-memory grouping complete: {groups_applied} codes grouped")
+
+        return codes_dict
+
+    @staticmethod
+    def _partition_codes(codes_info: dict, assignments: list) -> List[List[str]]:
+        """Split codes into clusters of related codes, GROUPING_PARTITION_SIZE at most"""
+        spans = [
+            (assignment["code_name"], assignment["document_id"],
+             assignment["start_char"], assignment["end_char"])
+            for assignment in assignments
+            if assignment.get("status") != "deleted" and assignment.get("code_name") in codes_info
+        ]
+        return cluster_codes(
+            {name: f"{name}\n{info['description'] or ''}" for name, info in codes_info.items()},
+            spans=spans,
+            max_cluster_size=GROUPING_PARTITION_SIZE
+        )
 
+    @staticmethod
+    def _group_partition(
+        partition: List[str],
+        codes_info: dict,
+        code_assignments: dict,
+        llm_service: LLMService,
+        provider: str
+    ) -> Optional[CodeGroupingOutput]:
+        """One grouping call; a failure leaves only this partition ungrouped"""
+        codes_summary, assignments_sample = AICodeGroupingService._prepare_llm_input(
+            {name: codes_info[name] for name in partition}, code_assignments
+        )
+        try:
+            return AICodingUtils.make_rate_limited_llm_call(
+                llm_service=llm_service,
+                service_type="code_grouping",
+                input_data={
+                    "codes_summary": codes_summary,
+                    "assignments_sample": assignments_sample
+                },
+                provider=provider
+            )
         except Exception as e:
-            print(f"❌ Error in code grouping: {str(e)}")
-            # Continue without grouping
+            print(f"❌ Error grouping {len(partition)} codes: {str(e)}")
+            return None
 
-        return codes_dict
+    @staticmethod
+    def _reconcile_group_name(group_names: dict, group_name: str) -> str:
+        """First spelling of a group name wins for names with the same stemmed words"""
+        key = " ".join(sorted(query_terms(group_name))) or group_name
+        return group_names.setdefault(key, group_name)
 
     @staticmethod
     def _prepare_llm_input(codes_info: dict, code_assignments: dict) -> tuple[str, str]:
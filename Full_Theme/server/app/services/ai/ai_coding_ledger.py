@@ -0,0 +1,82 @@
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.models.ai_coded_chunk import AICodedChunk
+from app.models.codebook import Codebook
+from app.services.ai.chunk_dedup import ChunkOccurrence, UniqueChunk
+
+
+class AICodingLedger:
+    """Which (document, chunk, model, prompt version) work earlier AI sessions already did"""
+
+    @staticmethod
+    def filter_uncoded(
+        db: Session,
+        unique_chunks: List[UniqueChunk],
+        user_id: int,
+        model: str,
+        prompt_version: str
+    ) -> List[UniqueChunk]:
+        """Drop occurrences coded before; chunks left without occurrences are dropped too"""
+        occurrences = [o for chunk in unique_chunks for o in chunk.occurrences]
+        if not occurrences:
+            return []
+
+        keys = {(o.document_id, o.document_hash, o.chunk_hash) for o in occurrences}
+        # Rows whose codebook was deleted no longer count as coded
+        coded = set(db.query(
+            AICodedChunk.document_id, AICodedChunk.document_hash, AICodedChunk.chunk_hash
+        ).join(
+            Codebook, Codebook.id == AICodedChunk.codebook_id
+        ).filter(
+            AICodedChunk.user_id == user_id,
+            AICodedChunk.model == model,
+            AICodedChunk.prompt_version == prompt_version,
+            tuple_(AICodedChunk.document_id, AICodedChunk.document_hash,
+                   AICodedChunk.chunk_hash).in_(keys)
+        ).all())
+
+        remaining = []
+        for chunk in unique_chunks:
+            uncoded = [o for o in chunk.occurrences
+                       if (o.document_id, o.document_hash, o.chunk_hash) not in coded]
+            if uncoded:
+                remaining.append(UniqueChunk(text=chunk.text, occurrences=uncoded))
+        return remaining
+
+    @staticmethod
+    def record(
+        db: Session,
+        occurrences: List[ChunkOccurrence],
+        user_id: int,
+        codebook_id: int,
+        model: str,
+        prompt_version: str
+    ) -> None:
+        """Stage ledger rows for coded occurrences; committed together with the codes"""
+        if not occurrences:
+            return
+        keys = {(o.document_id, o.document_hash, o.chunk_hash) for o in occurrences}
+        # Replace rows left behind by deleted session codebooks
+        db.query(AICodedChunk).filter(
+            AICodedChunk.user_id == user_id,
+            AICodedChunk.model == model,
+            AICodedChunk.prompt_version == prompt_version,
+            tuple_(AICodedChunk.document_id, AICodedChunk.document_hash,
+                   AICodedChunk.chunk_hash).in_(keys)
+        ).delete(synchronize_session=False)
+
+        rows = {}
+        for o in occurrences:
+            rows[(o.document_id, o.document_hash, o.chunk_hash)] = AICodedChunk(
+                user_id=user_id,
+                project_id=o.project_id,
+                document_id=o.document_id,
+                codebook_id=codebook_id,
+                document_hash=o.document_hash,
+                chunk_hash=o.chunk_hash,
+                model=model,
+                prompt_version=prompt_version
+            )
+        db.add_all(rows.values())
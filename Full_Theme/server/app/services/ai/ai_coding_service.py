@@ -1,10 +1,17 @@
+from typing import Optional
+
 from sqlalchemy.orm import Session
 from app.services.ai.ai_code_generation import AICodeGenerationService
 from app.services.ai.ai_theme_generation import AIThemeGenerationService
 from app.services.ai.ai_code_grouping import AICodeGroupingService
 from app.services.ai.ai_coding_refinement import AICodingRefinement
 from app.services.ai.ai_coding_utils import AICodingUtils
+from app.services.ai.ai_coding_ledger import AICodingLedger
+from app.prompts.initial_coding import PROMPT_VERSION
 from app.services.ai.llm_service import LLMService
+from app.services.ai.batch_coding import BATCH_FAILED, BATCH_PENDING, BatchProvider, get_batch_provider
+from app.services.ai.ai_batch_jobs import AIBatchJobs, JOB_COMPLETED, JOB_EXPIRED, JOB_FAILED, JOB_PENDING
+from app.core.config import settings
 from app.models.code import Code
 
 
@@ -16,25 +23,59 @@ class AICodingService:
         document_ids: list[int],
         db: Session,
         user_id: int,
-        model_name: str = "gemini-2.0-flash",
-        provider: str = "google_genai"
+        model_name: Optional[str] = None,
+        provider: str = "google_genai",
+        incremental: bool = False,
+        batch: bool = False,
+        batch_job_id: Optional[str] = None
     ) -> dict:
+        """Run the AI coding pipeline
+
+        With batch, the chunk prompts are only submitted and the new batch job
+        is returned as "batch_job"; ingest_batch runs the rest of the pipeline
+        once the provider has finished.
+        """
         print(
             f"🚀 Starting AI code generation for {len(document_ids)} documents")
 
+        # One service for every phase, so routing and metrics cover the whole run
+        llm_service = LLMService(model_name=model_name, provider=provider)
+
         # Step 1: Generate initial codes and assignments (in-memory only)
         response = AICodeGenerationService.generate_initial_codes_in_memory(
             document_ids=document_ids,
             db=db,
             user_id=user_id,
-            model_name=model_name,
-            provider=provider
+            provider=provider,
+            incremental=incremental,
+            llm_service=llm_service,
+            batch_provider=AICodingService._batch_provider(llm_service) if batch or batch_job_id else None,
+            batch_job_id=batch_job_id
         )
+        if response.get("batch_job_id"):
+            return AICodingService._record_batch_job(
+                db, response, llm_service, user_id, "initial_coding", document_ids, provider,
+                model_name=model_name, incremental=incremental)
+
+        # Remember coded chunks on every run so a later incremental run can skip
+        # them; the rows are committed along with the codes
+        if response.get("coded_chunks"):
+            AICodingLedger.record(
+                db,
+                response["coded_chunks"],
+                user_id=user_id,
+                codebook_id=response["ai_session_codebook"].id,
+                model=f"{provider}/{llm_service.router.model_for('initial_coding')}",
+                prompt_version=PROMPT_VERSION
+            )
 
         # Check if initial generation failed
         if not response.get("results") or response.get("summary", {}).get("quota_exhausted"):
             print("❌ Initial code generation failed or quota exhausted")
-            return response
+            if response.get("coded_chunks"):
+                # Chunks without codes are still done
+                db.commit()
+            return AICodingService._without_ledger_data(response)
 
         # In-memory structures
         codes_dict = response["codes_dict"]  # code_name -> code_data
@@ -49,7 +90,6 @@ class AICodingService:
 
         quota_status = AICodingUtils.get_rate_limit_status(provider)
         if not quota_status.get("quota_exhausted", False):
-            llm_service = LLMService(model_name=model_name, provider=provider)
             codes_dict, assignments = AICodingRefinement.refine_codes_in_memory(
                 codes_dict=codes_dict,
                 assignments=assignments,
@@ -66,7 +106,6 @@ class AICodingService:
         if len(codes_dict) > 2:
             print(
                 f"🔄 Starting code grouping phase for {len(codes_dict)} codes...")
-            llm_service = LLMService(model_name=model_name, provider=provider)
 
             codes_dict = AICodeGroupingService.perform_code_grouping_in_memory(
                 codes_dict=codes_dict,
@@ -108,7 +147,10 @@ class AICodingService:
                 "total_assignments": len(final_assignments),
                 "codes_created": len([c for c in final_codes if c.get("was_created", False)]),
                 "codes_modified": len([c for c in final_codes if c.get("was_modified", False)]),
-                "codes_grouped": len([c for c in final_codes if c.get("group_name")])
+                "codes_grouped": len([c for c in final_codes if c.get("group_name")]),
+                "chunks_coded": response["summary"].get("chunks_coded", 0),
+                "unrecoverable_spans": response["summary"].get("unrecoverable_spans", []),
+                "phase_metrics": llm_service.metrics.summary()
             }
         }
 
@@ -122,20 +164,30 @@ class AICodingService:
         codebook_id: int,
         db: Session,
         user_id: int,
-        model_name: str = "gemini-2.0-flash",
-        provider: str = "google_genai"
+        model_name: Optional[str] = None,
+        provider: str = "google_genai",
+        batch: bool = False,
+        batch_job_id: Optional[str] = None
     ) -> dict:
+        """Run deductive coding; batch works as for generate_code"""
         print(f"🚀 Starting deductive coding for {len(document_ids)} documents")
 
         # Step 1: Generate deductive codes and assignments (in-memory only)
+        llm_service = LLMService(model_name=model_name, provider=provider)
         response = AICodeGenerationService.generate_deductive_codes_in_memory(
             document_ids=document_ids,
             codebook_id=codebook_id,
             db=db,
             user_id=user_id,
-            model_name=model_name,
-            provider=provider
+            provider=provider,
+            llm_service=llm_service,
+            batch_provider=AICodingService._batch_provider(llm_service) if batch or batch_job_id else None,
+            batch_job_id=batch_job_id
         )
+        if response.get("batch_job_id"):
+            return AICodingService._record_batch_job(
+                db, response, llm_service, user_id, "deductive_coding", document_ids, provider,
+                model_name=model_name, codebook_id=codebook_id)
 
         # Check if initial generation failed
         if not response.get("assignments") or response.get("summary", {}).get("quota_exhausted"):
@@ -179,7 +231,9 @@ class AICodingService:
                 "total_assignments": len(final_assignments),
                 "codes_created": len([c for c in final_codes if c.get("was_created", False)]),
                 "codes_modified": len([c for c in final_codes if c.get("was_modified", False)]),
-                "codes_grouped": len([c for c in final_codes if c.get("group_name")])
+                "codes_grouped": len([c for c in final_codes if c.get("group_name")]),
+                "unrecoverable_spans": response["summary"].get("unrecoverable_spans", []),
+                "phase_metrics": llm_service.metrics.summary()
             }
         }
 
@@ -192,7 +246,7 @@ class AICodingService:
         codebook_id: int,
         db: Session,
         user_id: int,
-        model_name: str = "gemini-2.0-flash",
+        model_name: Optional[str] = None,
         provider: str = "google_genai"
     ) -> list[dict]:
         print(f"🚀 Starting theme generation for codebook {codebook_id}")
@@ -212,10 +266,121 @@ class AICodingService:
 
         return themes
 
+    @staticmethod
+    def ingest_batch(job_id: int, db: Session, user_id: int) -> dict:
+        """Finish a submitted batch job once its provider has the results
+
+        Returns only the job while the batch is still running; afterwards the
+        pipeline response of the job's coding run, including "batch_job".
+        The provider's copy of the batch is deleted once the job is ingested;
+        if ingesting fails the job goes back to pending and the error is raised.
+        """
+        job = AIBatchJobs.get(db, job_id, user_id)
+        if job.status != JOB_PENDING:
+            return {"batch_job": AIBatchJobs.describe(job)}
+
+        llm_service = LLMService(model_name=job.model_name, provider=job.provider)
+        batch_provider = AICodingService._batch_provider(llm_service)
+        AICodingService._expire_stale_batches(db, batch_provider)
+        if job.status != JOB_PENDING:
+            return {"batch_job": AIBatchJobs.describe(job)}
+
+        status = batch_provider.status(job.provider_job_id)
+        if status == BATCH_PENDING:
+            return {"batch_job": AIBatchJobs.describe(job)}
+        if status == BATCH_FAILED:
+            AIBatchJobs.finish(db, job, JOB_FAILED, error="Batch provider reported the batch as failed")
+            batch_provider.delete(job.provider_job_id)
+            return {"batch_job": AIBatchJobs.describe(job)}
+        if not AIBatchJobs.claim(db, job):
+            return {"batch_job": AIBatchJobs.describe(job)}
+
+        print(f"📥 Ingesting batch job {job.id}")
+        try:
+            if job.service_type == "initial_coding":
+                response = AICodingService.generate_code(
+                    document_ids=job.document_ids,
+                    db=db,
+                    user_id=user_id,
+                    model_name=job.model_name,
+                    provider=job.provider,
+                    incremental=job.incremental,
+                    batch_job_id=job.provider_job_id
+                )
+            else:
+                response = AICodingService.deductive_coding(
+                    document_ids=job.document_ids,
+                    codebook_id=job.codebook_id,
+                    db=db,
+                    user_id=user_id,
+                    model_name=job.model_name,
+                    provider=job.provider,
+                    batch_job_id=job.provider_job_id
+                )
+            if response.get("ai_session_codebook") is None:
+                raise ValueError("Batch results could not be applied to the project")
+        except Exception as e:
+            # The results stay with the provider so the job can be ingested again
+            db.rollback()
+            AIBatchJobs.release(db, job, error=str(e)[:500])
+            raise
+
+        AIBatchJobs.finish(db, job, JOB_COMPLETED)
+        batch_provider.delete(job.provider_job_id)
+        return {**response, "batch_job": AIBatchJobs.describe(job)}
+
     @staticmethod
     def get_rate_limit_status(provider: str) -> dict:
         return AICodingUtils.get_rate_limit_status(provider)
 
+    @staticmethod
+    def _without_ledger_data(response: dict) -> dict:
+        """Drop in-memory chunk bookkeeping that must not reach the API response"""
+        return {key: value for key, value in response.items() if key != "coded_chunks"}
+
+    @staticmethod
+    def _batch_provider(llm_service: LLMService) -> BatchProvider:
+        return get_batch_provider(settings.AI_BATCH_PROVIDER, llm_service, settings.AI_BATCH_DIR)
+
+    @staticmethod
+    def _expire_stale_batches(db: Session, batch_provider: BatchProvider) -> None:
+        """Expire batches never ingested within the retention period and delete their files"""
+        for stale_job in AIBatchJobs.stale(db, settings.AI_BATCH_RETENTION_SECONDS):
+            print(f"🗑️ Batch job {stale_job.id} was not ingested in time; deleting its files")
+            batch_provider.delete(stale_job.provider_job_id)
+            AIBatchJobs.finish(db, stale_job, JOB_EXPIRED,
+                               error="Expired before its results were ingested")
+
+    @staticmethod
+    def _record_batch_job(
+        db: Session,
+        response: dict,
+        llm_service: LLMService,
+        user_id: int,
+        service_type: str,
+        document_ids: list[int],
+        provider: str,
+        model_name: Optional[str] = None,
+        codebook_id: Optional[int] = None,
+        incremental: bool = False
+    ) -> dict:
+        AICodingService._expire_stale_batches(db, AICodingService._batch_provider(llm_service))
+        job = AIBatchJobs.create(
+            db,
+            user_id=user_id,
+            project_id=response["project_id"],
+            service_type=service_type,
+            document_ids=document_ids,
+            provider=provider,
+            batch_provider=settings.AI_BATCH_PROVIDER,
+            provider_job_id=response["batch_job_id"],
+            model_name=model_name,
+            codebook_id=codebook_id,
+            incremental=incremental
+        )
+        print(f"📦 Batch job {job.id} submitted; ingest it once the provider has finished")
+        return {"batch_job": AIBatchJobs.describe(job), "summary": response["summary"]}
+
     @staticmethod
     def _apply_changes_to_database(
         db: Session,
@@ -226,60 +391,34 @@ class AICodingService:
     ) -> tuple[list, list]:
         """Apply all in-memory changes to the database in a single transaction"""
         from app.services.code_service import CodeService
-        from app.models.code import Code
-        import datetime
-
-        # Create all codes first (only for new codes)
-        created_codes = {}  # code_name -> database_code
 
+        # Create all codes first (only for new codes); names already used in
+        # the project resolve to the existing code
+        codes_by_project = {}
         for code_name, code_data in codes_dict.items():
             if code_data.get("status") == "deleted":
                 continue
+            codes_by_project.setdefault(code_data["project_id"], []).append({
+                "name": code_name,
+                "description": code_data["description"],
+                "color": code_data.get("color", "#3B82F6"),
+                "is_auto_generated": code_data.get("is_auto_generated", True),
+                "group_name": code_data.get("group_name")
+            })
 
-            # Check if code already exists in database
-            existing_code = db.query(Code).filter(
-                Code.name == code_name,
-                Code.project_id == code_data["project_id"]
-            ).first()
-
-            if existing_code:
-                # Code already exists - use the existing one
-                print(
-                    f"DEBUG: Code '{code_name}' already exists in database with ID {existing_code.id}")
-                created_codes[code_name] = existing_code
-                continue
-
-            # Create new codes only if they don't exist
-            try:
-                code = CodeService.create_code(
-                    db=db,
-                    name=code_data["name"],
-                    project_id=code_data["project_id"],
-                    created_by_id=user_id,
-                    description=code_data["description"],
-                    color=code_data.get("color", "#3B82F6"),
-                    is_auto_generated=code_data.get("is_auto_generated", True),
-                    codebook_id=ai_session_codebook.id,
-                    group_name=code_data.get("group_name")
-                )
-                created_codes[code_name] = code
-            except Exception as e:
-                print(f"ERROR: Failed to create code '{code_name}': {str(e)}")
-                # If code creation fails (e.g., duplicate name), try to get existing code
-                existing_code = db.query(Code).filter(
-                    Code.name == code_name,
-                    Code.project_id == code_data["project_id"]
-                ).first()
-                if existing_code:
-                    created_codes[code_name] = existing_code
-                else:
-                    print(
-                        f"ERROR: Could not create or find code '{code_name}' - skipping")
-                    continue
+        created_codes = {}  # code_name -> database_code
+        for project_id, project_codes in codes_by_project.items():
+            created_codes.update(CodeService.create_codes_bulk(
+                db=db,
+                project_id=project_id,
+                created_by_id=user_id,
+                codes=project_codes,
+                codebook_id=ai_session_codebook.id
+            ))
 
         # Create all assignments using bulk insert for efficiency
         from app.models.code_assignments import CodeAssignment
-        import datetime
+        from app.services.code_assignment_service import CodeAssignmentService
 
         assignment_mappings = []
         assignment_data_list = []  # Keep track of assignment data for later matching
@@ -301,51 +440,33 @@ class AICodingService:
                 "end_char": assignment_data["end_char"],
                 "text_snapshot": assignment_data["text"],
                 "created_by_id": user_id,
-                "confidence": assignment_data.get("confidence", 75),
-                "created_at": datetime.datetime.now(datetime.timezone.utc)
+                "confidence": assignment_data.get("confidence", 75)
             })
             assignment_data_list.append(assignment_data)
 
-        # Bulk insert assignments
-        if assignment_mappings:
-            db.bulk_insert_mappings(
-                CodeAssignment.__mapper__, assignment_mappings)
+        # Bulk insert assignments; spans already coded resolve to the stored row
+        outcomes = CodeAssignmentService.insert_assignments(
+            db, assignment_mappings)
 
         # Commit all changes
         db.commit()
 
-        # Query back the created assignments to get their IDs
+        # Load the assignments by the ids returned from the insert
         created_assignments = []
-        if assignment_mappings:
-            # Query assignments that were just created by matching on document_id, code_id, and start_char
-            for i, assignment_data in enumerate(assignment_data_list):
-                code_name = assignment_data["code_name"]
-                code = created_codes[code_name]
-
-                assignment = db.query(CodeAssignment).filter(
-                    CodeAssignment.document_id == assignment_data["document_id"],
-                    CodeAssignment.code_id == code.id,
-                    CodeAssignment.start_char == assignment_data["start_char"],
-                    CodeAssignment.end_char == assignment_data["end_char"]
-                ).order_by(CodeAssignment.created_at.desc()).first()
-
-                if assignment:
-                    created_assignments.append((assignment, assignment_data))
-                else:
-                    print(
-                        f"WARNING: Could not find created assignment for code '{code_name}'")
-                    # Create a dummy assignment object for response formatting
-                    dummy_assignment = type('Assignment', (), {
-                        'id': None,
-                        'document_id': assignment_data["document_id"],
-                        'start_char': assignment_data["start_char"],
-                        'end_char': assignment_data["end_char"],
-                        'text_snapshot': assignment_data["text"],
-                        'confidence': assignment_data.get("confidence", 75),
-                        'created_at': datetime.datetime.now(datetime.timezone.utc)
-                    })()
-                    created_assignments.append(
-                        (dummy_assignment, assignment_data))
+        if outcomes:
+            stored = {
+                assignment.id: assignment for assignment in db.query(CodeAssignment).filter(
+                    CodeAssignment.id.in_({assignment_id for assignment_id, _ in outcomes})
+                ).all()
+            }
+            seen_ids = set()
+            for (assignment_id, _), assignment_data in zip(outcomes, assignment_data_list):
+                # Several suggestions for the same span collapse into one assignment
+                if assignment_id in seen_ids or assignment_id not in stored:
+                    continue
+                seen_ids.add(assignment_id)
+                created_assignments.append(
+                    (stored[assignment_id], assignment_data))
 
         # Format final codes for response
         final_codes = []
@@ -1,7 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
 from app.services.ai.llm_service import LLMService
 from app.utils.rate_limiter import with_exponential_backoff, get_rate_limiter
-from typing import Tuple
+from typing import Any, Callable, Optional, Tuple
+
+# Service types with a structured chain on LLMService, named <service_type>_llm
+SERVICE_TYPES = (
+    "initial_coding", "theme_generation", "theme_merging",
+    "deductive_coding", "code_refinement", "code_grouping"
+)
 
 
 class AICodingUtils:
@@ -35,27 +42,64 @@ class AICodingUtils:
         return start_idx, end_idx
 
     @staticmethod
-    def make_rate_limited_llm_call(llm_service, service_type: str, input_data: dict, provider: str):
-        """Make an LLM call with rate limiting - same retry strategy for all services"""
-        service_mapping = {
-            "initial_coding": llm_service.initial_coding_llm,
-            "theme_generation": llm_service.theme_generation_llm,
-            "deductive_coding": llm_service.deductive_coding_llm,
-            "code_refinement": llm_service.code_refinement_llm,
-            "code_grouping": llm_service.code_grouping_llm
-        }
-
-        llm_method = service_mapping.get(service_type)
-        if not llm_method:
+    def make_rate_limited_llm_call(llm_service, service_type: str, input_data: dict, provider: str,
+                                   escalate: bool = False):
+        """Make an LLM call with rate limiting - same retry strategy for all services
+
+        With escalate, the call runs on the router's escalation model. Calls,
+        and the time spent waiting out rate limits between retries, are
+        recorded in llm_service.metrics when the service has one.
+        """
+        if service_type not in SERVICE_TYPES:
             raise ValueError(f"Unknown service type: {service_type}")
+        router = getattr(llm_service, "router", None)
+        if escalate:
+            llm_method = llm_service.escalation_llm(service_type)
+            model = router.escalation_model
+        else:
+            llm_method = getattr(llm_service, f"{service_type}_llm")
+            model = router.model_for(service_type) if router else getattr(
+                llm_service, "model_name", "unknown")
+        metrics = getattr(llm_service, "metrics", None)
 
         # Apply consistent rate limiting to all services
-        @with_exponential_backoff(provider)
+        on_wait = (lambda seconds: metrics.record_backoff(service_type, seconds)) if metrics else None
+
+        @with_exponential_backoff(provider, on_wait=on_wait)
         def make_call():
-            return llm_method.invoke(input_data)
+            if metrics is None:
+                return llm_method.invoke(input_data)
+            with metrics.track(service_type, model, escalation=escalate) as config:
+                return llm_method.invoke(input_data, config=config)
 
         return make_call()
 
+    @staticmethod
+    def make_escalating_llm_call(llm_service, service_type: str, input_data: dict, provider: str,
+                                 confidence: Callable[[Any], Optional[float]]):
+        """Make an LLM call and re-run it on the escalation model if its confidence (0-1) is low"""
+        response = AICodingUtils.make_rate_limited_llm_call(
+            llm_service, service_type, input_data, provider)
+        router = getattr(llm_service, "router", None)
+        if router is None or not router.should_escalate(service_type, confidence(response)):
+            return response
+
+        print(f"⬆️ Low confidence {service_type} response, re-running on {router.escalation_model}")
+        try:
+            return AICodingUtils.make_rate_limited_llm_call(
+                llm_service, service_type, input_data, provider, escalate=True)
+        except Exception as e:
+            print(f"⚠️ Escalation failed, keeping the original response: {str(e)[:100]}")
+            return response
+
+    @staticmethod
+    def run_parallel(fn: Callable, items: list, max_workers: int) -> list:
+        """Apply fn to items on a small thread pool, keeping the order of items"""
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            return list(executor.map(fn, items))
+
     @staticmethod
     def get_rate_limit_status(provider: str) -> dict:
         """Get rate limit status for a provider"""
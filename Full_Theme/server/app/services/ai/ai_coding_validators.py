@@ -54,7 +54,9 @@ class AICodingValidators:
         if project.research_details is not None:
             context_parts = []
             if isinstance(project.research_details, dict):
-                for key, value in project.research_details.items():
+                # Sorted so the context, part of the cached prompt prefix, is
+                # byte-identical however the JSON keys come back
+                for key, value in sorted(project.research_details.items()):
                     if isinstance(value, list):
                         context_parts.append(f"{key}: {', '.join(value)}")
                     else:
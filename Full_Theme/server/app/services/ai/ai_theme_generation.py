@@ -1,9 +1,20 @@
+from typing import List, Optional
+
 from sqlalchemy.orm import Session
-from app.schemas.ai_services import ThemeOutput
+from app.models.code_assignments import CodeAssignment
+from app.schemas.ai_services import ThemeOutput, ThemeMergingOutput
 from app.services.ai.llm_service import LLMService
 from app.services.theme_service import ThemeService
 from app.services.ai.ai_coding_validators import AICodingValidators
 from app.services.ai.ai_coding_utils import AICodingUtils
+from app.services.ai.code_clustering import cluster_codes
+
+# Codes per map call; keeps every prompt well inside the context window
+THEME_CLUSTER_SIZE = 40
+# Candidate themes per merge call
+THEME_MERGE_BATCH = 30
+# LLM calls in flight at once during one theme generation run
+THEME_CONCURRENCY = 4
 
 
 class AIThemeGenerationService:
@@ -14,10 +25,15 @@ class AIThemeGenerationService:
         codebook_id: int,
         db: Session,
         user_id: int,
-        model_name: str = "gemini-2.0-flash",
+        model_name: Optional[str] = None,
         provider: str = "google_genai"
     ) -> list[dict]:
-        """Generate themes in memory and immediately apply to database"""
+        """Generate themes in memory and immediately apply to database
+
+        Codes are clustered locally, each cluster gets a candidate theme in
+        parallel, and overlapping candidates are then merged by the LLM, so
+        several themes come back and prompt size is bounded by the cluster size.
+        """
         print(f"🚀 Starting theme generation for codebook {codebook_id}")
 
         llm_service = LLMService(model_name=model_name, provider=provider)
@@ -31,47 +47,171 @@ class AIThemeGenerationService:
         if not codebook:
             return []
 
-        # Format codes for LLM
-        codes_text = AIThemeGenerationService._format_codes_for_theme_generation(
-            codebook.codes)
+        codes = list(codebook.codes)
+        if not codes:
+            print("⏭️ Codebook has no codes")
+            return []
 
-        try:
-            # Make rate-limited LLM call
-            llm_response: ThemeOutput = AICodingUtils.make_rate_limited_llm_call(
-                llm_service=llm_service,
-                service_type="theme_generation",
-                input_data={"codes_text": codes_text},
-                provider=provider
-            )
+        # Map: one candidate theme per cluster of related codes
+        clusters = AIThemeGenerationService._cluster_codebook_codes(db, codes)
+        print(f"Clustered {len(codes)} codes into {len(clusters)} clusters")
+        candidates = AICodingUtils.run_parallel(
+            lambda cluster: AIThemeGenerationService._generate_candidate_theme(
+                llm_service, cluster, provider),
+            clusters,
+            max_workers=THEME_CONCURRENCY
+        )
+        candidates = [candidate for candidate in candidates if candidate]
+        if not candidates:
+            return []
 
-            # Create theme in database
-            theme = ThemeService.create_theme(
-                db=db,
-                name=llm_response.theme_name,
-                project_id=codebook.project_id,  # type: ignore
-                user_id=user_id,
-                description=llm_response.theme_description
-            )
+        # Reduce: merge overlapping candidates until one merge call covers them all
+        themes = AIThemeGenerationService._merge_candidate_themes(
+            llm_service, candidates, provider)
+
+        results = []
+        for theme_data in themes:
+            try:
+                # Create theme in database
+                theme = ThemeService.create_theme(
+                    db=db,
+                    name=theme_data["theme_name"],
+                    project_id=codebook.project_id,  # type: ignore
+                    user_id=user_id,
+                    description=theme_data["theme_description"]
+                )
+            except ValueError as e:
+                print(f"⚠️ Skipping theme '{theme_data['theme_name']}': {str(e)}")
+                continue
 
             # Format response
-            result = {
+            results.append({
                 "id": theme.id,
                 "name": theme.name,
                 "description": theme.description,
                 "project_id": theme.project_id,
                 "user_id": theme.user_id,
                 "created_at": theme.created_at.isoformat(),
-                "reasoning": llm_response.reasoning,
-                "related_codes": llm_response.related_codes,
+                "reasoning": theme_data["reasoning"],
+                "related_codes": theme_data["related_codes"],
                 "source_codebook_id": codebook_id
-            }
-
+            })
             print(f"✅ Successfully generated and created theme: {theme.name}")
-            return [result]
 
+        return results
+
+    @staticmethod
+    def _cluster_codebook_codes(db: Session, codes) -> List[list]:
+        """Cluster codes by text similarity and co-occurrence of their assignments"""
+        codes_by_id = {code.id: code for code in codes}
+        spans = db.query(
+            CodeAssignment.code_id,
+            CodeAssignment.document_id,
+            CodeAssignment.start_char,
+            CodeAssignment.end_char
+        ).filter(CodeAssignment.code_id.in_(list(codes_by_id))).all()
+
+        clusters = cluster_codes(
+            {code.id: f"{code.name}\n{code.description or ''}" for code in codes},
+            spans=[tuple(span) for span in spans],
+            max_cluster_size=THEME_CLUSTER_SIZE
+        )
+        return [[codes_by_id[code_id] for code_id in cluster] for cluster in clusters]
+
+    @staticmethod
+    def _generate_candidate_theme(llm_service: LLMService, codes, provider: str) -> Optional[dict]:
+        """Theme of one cluster; related codes are limited to the cluster's codes"""
+        try:
+            llm_response: ThemeOutput = AICodingUtils.make_rate_limited_llm_call(
+                llm_service=llm_service,
+                service_type="theme_generation",
+                input_data={
+                    "codes_text": AIThemeGenerationService._format_codes_for_theme_generation(codes)},
+                provider=provider
+            )
         except Exception as e:
-            print(f"❌ Error generating theme: {str(e)}")
-            return []
+            print(f"❌ Error generating theme for {len(codes)} codes: {str(e)}")
+            return None
+
+        names = [code.name for code in codes]
+        related = [name for name in llm_response.related_codes if name in set(names)]
+        return {
+            "theme_name": llm_response.theme_name,
+            "theme_description": llm_response.theme_description,
+            "reasoning": llm_response.reasoning,
+            "related_codes": related or names
+        }
+
+    @staticmethod
+    def _merge_candidate_themes(llm_service: LLMService, candidates: List[dict], provider: str) -> List[dict]:
+        """Merge candidates in rounds of THEME_MERGE_BATCH until a single round remains"""
+        while len(candidates) > 1:
+            batches = [candidates[i:i + THEME_MERGE_BATCH]
+                       for i in range(0, len(candidates), THEME_MERGE_BATCH)]
+            merged = [theme for batch in AICodingUtils.run_parallel(
+                lambda batch: AIThemeGenerationService._merge_batch(
+                    llm_service, batch, provider),
+                batches,
+                max_workers=THEME_CONCURRENCY
+            ) for theme in batch]
+            if len(batches) == 1 or len(merged) >= len(candidates):
+                return merged
+            candidates = merged
+        return candidates
+
+    @staticmethod
+    def _merge_batch(llm_service: LLMService, candidates: List[dict], provider: str) -> List[dict]:
+        """One reduce call; candidates the LLM leaves out are kept unchanged"""
+        if len(candidates) == 1:
+            return candidates
+
+        # Candidates of different clusters may share a name
+        by_name = {}
+        for candidate in candidates:
+            name = candidate["theme_name"]
+            suffix = 2
+            while name in by_name:
+                name = f"{candidate['theme_name']} ({suffix})"
+                suffix += 1
+            by_name[name] = candidate
+
+        themes_text = ""
+        for name, candidate in by_name.items():
+            themes_text += f"Theme: {name}\n"
+            themes_text += f"Description: {candidate['theme_description']}\n"
+            themes_text += f"Number of codes: {len(candidate['related_codes'])}\n\n"
+
+        try:
+            merge_response: ThemeMergingOutput = AICodingUtils.make_rate_limited_llm_call(
+                llm_service=llm_service,
+                service_type="theme_merging",
+                input_data={"themes_text": themes_text},
+                provider=provider
+            )
+        except Exception as e:
+            print(f"❌ Error merging {len(candidates)} themes: {str(e)}")
+            return candidates
+
+        merged = []
+        used = set()
+        for theme in merge_response.themes:
+            sources = [by_name[name] for name in theme.source_themes
+                       if name in by_name and name not in used]
+            if not sources:
+                continue
+            used.update(name for name in theme.source_themes if name in by_name)
+            related_codes = []
+            for source in sources:
+                related_codes.extend(
+                    code for code in source["related_codes"] if code not in related_codes)
+            merged.append({
+                "theme_name": theme.theme_name,
+                "theme_description": theme.theme_description,
+                "reasoning": merge_response.reasoning,
+                "related_codes": related_codes
+            })
+        merged.extend(candidate for name, candidate in by_name.items() if name not in used)
+        return merged
 
     @staticmethod
     def _format_codes_for_theme_generation(codes) -> str:
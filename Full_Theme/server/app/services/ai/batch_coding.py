@@ -0,0 +1,242 @@
+import copy
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from app.services.ai.ai_coding_utils import AICodingUtils
+from app.services.ai.chunk_dedup import UniqueChunk
+from app.services.ai.chunk_recovery import ChunkDispatcher
+from app.services.ai.model_routing import PhaseMetrics
+
+BATCH_PENDING = "pending"
+BATCH_COMPLETED = "completed"
+BATCH_FAILED = "failed"
+
+
+class BatchProvider:
+    """
+    Adapter for a provider's asynchronous batch API.
+
+    A batch file is JSON lines of {"custom_id", "service_type", "input"}.
+    results yields {"custom_id", "output", "error"} per request, where
+    output is the structured response as a dict. usage returns the job's
+    per-phase totals in PhaseMetrics.snapshot form, where the provider
+    reports them. submit takes ownership of the batch file; delete removes
+    everything the provider keeps for a job.
+    """
+
+    name = "base"
+
+    def submit(self, batch_path: str) -> str:
+        raise NotImplementedError
+
+    def status(self, job_id: str) -> str:
+        raise NotImplementedError
+
+    def results(self, job_id: str) -> Iterator[dict]:
+        raise NotImplementedError
+
+    def usage(self, job_id: str) -> Dict[str, dict]:
+        return {}
+
+    def delete(self, job_id: str) -> None:
+        raise NotImplementedError
+
+
+class LocalFileBatchProvider(BatchProvider):
+    """
+    Offline stand-in for a batch API.
+
+    Jobs are directories under work_dir. Each job runs on a background
+    thread after submission, through the same rate-limited and metered
+    calls as interactive coding, and results and usage are written next to
+    the input the way a provider would return them. A job whose process
+    exits before it finishes stays pending.
+    """
+
+    name = "local"
+
+    def __init__(self, llm_service, work_dir: str):
+        self.llm_service = llm_service
+        self.work_dir = work_dir
+
+    def submit(self, batch_path: str) -> str:
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.work_dir, job_id)
+        os.makedirs(job_dir)
+        os.replace(batch_path, os.path.join(job_dir, "input.jsonl"))
+        threading.Thread(target=self._run, args=(job_dir,), daemon=True).start()
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        job_dir = os.path.join(self.work_dir, job_id)
+        if not os.path.isdir(job_dir):
+            return BATCH_FAILED
+        if not os.path.exists(os.path.join(job_dir, "output.jsonl")):
+            return BATCH_PENDING
+        return BATCH_COMPLETED
+
+    def results(self, job_id: str) -> Iterator[dict]:
+        with open(os.path.join(self.work_dir, job_id, "output.jsonl"), encoding="utf-8") as output:
+            for line in output:
+                if line.strip():
+                    yield json.loads(line)
+
+    def usage(self, job_id: str) -> Dict[str, dict]:
+        usage_path = os.path.join(self.work_dir, job_id, "usage.json")
+        if not os.path.exists(usage_path):
+            return {}
+        with open(usage_path, encoding="utf-8") as usage:
+            return json.load(usage)
+
+    def delete(self, job_id: str) -> None:
+        shutil.rmtree(os.path.join(self.work_dir, job_id), ignore_errors=True)
+
+    def _run(self, job_dir: str) -> None:
+        # Metrics of this job only, while sharing the service's chains
+        job_service = copy.copy(self.llm_service)
+        metrics = getattr(self.llm_service, "metrics", None)
+        if metrics is not None:
+            job_service.metrics = PhaseMetrics(metrics.prices)
+
+        results = []
+        with open(os.path.join(job_dir, "input.jsonl"), encoding="utf-8") as batch:
+            for line in batch:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                result = {"custom_id": request["custom_id"], "output": None, "error": None}
+                try:
+                    result["output"] = AICodingUtils.make_rate_limited_llm_call(
+                        job_service, request["service_type"], request["input"], self.llm_service.provider
+                    ).model_dump()
+                except Exception as e:
+                    result["error"] = str(e)
+                results.append(result)
+        # Written in one go so a half-run job is never read as complete
+        temporary_path = os.path.join(job_dir, "output.jsonl.tmp")
+        try:
+            if metrics is not None:
+                with open(os.path.join(job_dir, "usage.json"), "w", encoding="utf-8") as usage:
+                    json.dump(job_service.metrics.snapshot(), usage)
+            with open(temporary_path, "w", encoding="utf-8") as output:
+                for result in results:
+                    output.write(json.dumps(result) + "\n")
+            os.replace(temporary_path, os.path.join(job_dir, "output.jsonl"))
+        except FileNotFoundError:
+            print(f"⚠️ Batch job {os.path.basename(job_dir)} was deleted before it finished")
+
+
+def get_batch_provider(name: str, llm_service, work_dir: str) -> BatchProvider:
+    """Batch adapter by name; provider APIs plug in here next to the local stand-in"""
+    if name == LocalFileBatchProvider.name:
+        return LocalFileBatchProvider(llm_service, work_dir)
+    raise ValueError(f"Unsupported batch provider: {name}. Supported providers are: local.")
+
+
+def batch_key(text: str) -> str:
+    """custom_id of a chunk; stable across re-planning the same documents"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class BatchChunkRunner:
+    """
+    Codes chunks through a batch provider instead of one call per chunk.
+
+    submit writes every chunk prompt to one batch file up front, so prompts
+    only see the context known when the batch is built. collect applies the
+    results once the provider has finished, matching them to chunks by
+    batch_key, so the chunks can be planned again from the documents.
+    Requests the batch could not answer are retried interactively with
+    fallback through ChunkDispatcher. The usage the provider reports is
+    added to metrics.
+    """
+
+    def __init__(
+        self,
+        provider: BatchProvider,
+        service_type: str,
+        output_schema: Type[BaseModel],
+        work_dir: str,
+        metrics: Optional[PhaseMetrics] = None
+    ):
+        self.provider = provider
+        self.service_type = service_type
+        self.output_schema = output_schema
+        self.work_dir = work_dir
+        self.metrics = metrics
+
+    def submit(self, unique_chunks: List[UniqueChunk], build_input: Callable[[str], dict]) -> str:
+        """Submit one request per chunk and return the provider's job id"""
+        batch_path = self._write_batch(unique_chunks, build_input)
+        try:
+            job_id = self.provider.submit(batch_path)
+        finally:
+            # Chunk text only stays with the provider, which deletes it after ingest
+            if os.path.exists(batch_path):
+                os.remove(batch_path)
+        print(f"📦 Submitted {len(unique_chunks)} {self.service_type} requests as batch {job_id}")
+        return job_id
+
+    def collect(
+        self,
+        job_id: str,
+        unique_chunks: List[UniqueChunk],
+        handle: Callable[[UniqueChunk, BaseModel], None],
+        fallback: Callable[[str], BaseModel]
+    ) -> Tuple[List[UniqueChunk], List[dict]]:
+        """Return (fully coded chunks, unrecoverable spans) like ChunkDispatcher.run"""
+        status = self.provider.status(job_id)
+        if status != BATCH_COMPLETED:
+            raise RuntimeError(f"Batch {job_id} is {status}")
+        if self.metrics is not None:
+            self.metrics.merge(self.provider.usage(job_id))
+
+        answered: Dict[str, BaseModel] = {}
+        for result in self.provider.results(job_id):
+            try:
+                if result.get("error"):
+                    raise ValueError(result["error"])
+                answered[result["custom_id"]] = self.output_schema.model_validate(result["output"])
+            except Exception as e:
+                print(f"❌ Batch request {result.get('custom_id')} failed: {str(e)[:100]}")
+
+        coded: List[UniqueChunk] = []
+        failed: List[UniqueChunk] = []
+        for chunk in unique_chunks:
+            response = answered.get(batch_key(chunk.text))
+            if response is None:
+                failed.append(chunk)
+                continue
+            try:
+                handle(chunk, response)
+                coded.append(chunk)
+            except Exception as e:
+                print(f"❌ Could not apply batch result: {str(e)[:100]}")
+                failed.append(chunk)
+        print(f"✅ Batch {job_id}: {len(coded)} chunks coded, {len(failed)} failed")
+
+        if not failed:
+            return coded, []
+
+        print(f"🔁 Coding {len(failed)} failed batch requests interactively")
+        recovered, unrecoverable = ChunkDispatcher(fallback, handle).run(failed)
+        return coded + recovered, unrecoverable
+
+    def _write_batch(self, unique_chunks: List[UniqueChunk], build_input: Callable[[str], dict]) -> str:
+        os.makedirs(self.work_dir, exist_ok=True)
+        batch_path = os.path.join(self.work_dir, f"{self.service_type}-{uuid.uuid4().hex}.jsonl")
+        with open(batch_path, "w", encoding="utf-8") as batch:
+            for chunk in unique_chunks:
+                batch.write(json.dumps({
+                    "custom_id": batch_key(chunk.text),
+                    "service_type": self.service_type,
+                    "input": build_input(chunk.text)
+                }) + "\n")
+        return batch_path
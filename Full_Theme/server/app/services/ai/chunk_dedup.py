@@ -0,0 +1,160 @@
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from app.utils.chunks import create_chunks
+from app.utils.similarity import (
+    MinHasher, connected_groups, estimated_similarity, lsh_candidate_pairs, normalize_text
+)
+
+# Page separators written by DocumentUploadService._extract_full_content
+PAGE_MARKER = re.compile(r"-{3}\s*Page\s+\d+\s*-{3}", re.IGNORECASE)
+# Chunks with fewer normalized characters than this carry nothing to code
+MIN_CONTENT_CHARS = 20
+# Estimated shingle Jaccard from which two chunks count as the same text
+NEAR_DUPLICATE_THRESHOLD = 0.9
+
+
+@dataclass
+class ChunkOccurrence:
+    """One place a chunk appears: its document and the chunk's offset in it"""
+    document_id: int
+    project_id: int
+    chunk: str
+    chunk_start: int
+    document_hash: str = ""
+    chunk_hash: str = ""
+
+
+@dataclass
+class UniqueChunk:
+    """A chunk sent to the LLM once, plus every place its codes apply to"""
+    text: str
+    occurrences: List[ChunkOccurrence] = field(default_factory=list)
+
+
+def chunk_content_key(chunk: str) -> str:
+    """Normalized chunk text with page markers removed; empty when content-free"""
+    normalized = normalize_text(PAGE_MARKER.sub(" ", chunk))
+    return normalized if len(normalized) >= MIN_CONTENT_CHARS else ""
+
+
+def document_content_hash(document) -> str:
+    """The stored file hash, or a hash of the extracted content for documents without one"""
+    file_hash = getattr(document, "file_hash", None)
+    if file_hash:
+        return str(file_hash)
+    return hashlib.sha256(str(document.content).encode("utf-8")).hexdigest()
+
+
+def locate_chunks(content: str, chunks: List[str]) -> List[Optional[Tuple[int, int]]]:
+    """
+    Span of each chunk in content; chunks come in document order.
+
+    Chunks whose whitespace differs from the document are found by a
+    whitespace-insensitive search. Chunks not found at all get None.
+    """
+    spans: List[Optional[Tuple[int, int]]] = []
+    cursor = 0
+    for chunk in chunks:
+        span = _find_chunk(content, chunk, cursor) or _find_chunk(content, chunk, 0)
+        spans.append(span)
+        if span is not None:
+            cursor = span[0] + 1
+    return spans
+
+
+def _find_chunk(content: str, chunk: str, cursor: int) -> Optional[Tuple[int, int]]:
+    start = content.find(chunk, cursor)
+    if start != -1:
+        return start, start + len(chunk)
+    words = chunk.split()
+    if not words:
+        return None
+    match = re.compile(r"\s+".join(map(re.escape, words))).search(content, cursor)
+    return match.span() if match else None
+
+
+def plan_unique_chunks(documents, chunk_size: int = 4000) -> Tuple[List[UniqueChunk], int, int]:
+    """
+    Chunk documents and collapse repeated chunks across all of them.
+
+    Exact repeats are found by hashing normalized text and near-duplicates
+    by MinHash/LSH. Content-free chunks (page markers, blank header rows) are
+    dropped, as are chunks that cannot be located in their document.
+    Returns (unique_chunks, total_chunks, skipped_chunks).
+    """
+    by_key = {}
+    unique: List[UniqueChunk] = []
+    keys: List[str] = []
+    total = skipped = 0
+
+    for document in documents:
+        content = str(document.content)
+        document_hash = document_content_hash(document)
+        chunks = create_chunks(content, chunk_size=chunk_size)
+        for chunk, span in zip(chunks, locate_chunks(content, chunks)):
+            total += 1
+            key = chunk_content_key(chunk)
+            if not key:
+                skipped += 1
+                continue
+            if span is None:
+                # Without an offset its assignments would point at the wrong text
+                print(f"⚠️ Chunk not found in document {document.id}; skipping it")
+                skipped += 1
+                continue
+            digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+            if digest not in by_key:
+                by_key[digest] = len(unique)
+                unique.append(UniqueChunk(text=chunk))
+                keys.append(key)
+            unique[by_key[digest]].occurrences.append(ChunkOccurrence(
+                document_id=document.id,
+                project_id=document.project_id,
+                # The document's own text, so quote offsets stay exact
+                chunk=content[span[0]:span[1]],
+                chunk_start=span[0],
+                document_hash=document_hash,
+                chunk_hash=digest
+            ))
+
+    return _merge_near_duplicates(unique, keys), total, skipped
+
+
+def _merge_near_duplicates(unique: List[UniqueChunk], keys: List[str]) -> List[UniqueChunk]:
+    if len(unique) < 2:
+        return unique
+
+    signatures, has_content = MinHasher().signatures(keys)
+    pairs = sorted(lsh_candidate_pairs(signatures, has_content))
+    similarity = estimated_similarity(signatures, pairs)
+    edges = [pair for pair, score in zip(pairs, similarity)
+             if score >= NEAR_DUPLICATE_THRESHOLD]
+
+    merged_into = {}
+    for members in connected_groups(len(unique), edges):
+        members.sort()
+        for member in members[1:]:
+            merged_into[member] = members[0]
+            unique[members[0]].occurrences.extend(unique[member].occurrences)
+    return [chunk for i, chunk in enumerate(unique) if i not in merged_into]
+
+
+def quote_span(occurrence: ChunkOccurrence, quote: Optional[str], exact: bool) -> Optional[Tuple[int, int]]:
+    """
+    Document offsets of quote inside an occurrence.
+
+    Without a quote, or when an exact copy of the dispatched chunk does not
+    contain it, the whole chunk is used. Near-duplicates that do not contain
+    the quote get no span, as their wording differs right there.
+    """
+    if quote:
+        position = occurrence.chunk.find(quote)
+        if position != -1:
+            start = occurrence.chunk_start + position
+            return start, start + len(quote)
+        if not exact:
+            return None
+    return occurrence.chunk_start, occurrence.chunk_start + len(occurrence.chunk)
@@ -0,0 +1,141 @@
+from dataclasses import replace
+from typing import Any, Callable, List, Set, Tuple
+
+from app.services.ai.chunk_dedup import ChunkOccurrence, UniqueChunk
+
+# Failed chunks shorter than twice this are not split any further
+MIN_SPLIT_CHARS = 500
+# Passes over the queue of transiently failed chunks after the main pass
+RETRY_ROUNDS = 2
+
+_TRANSIENT_MARKERS = (
+    "max attempts", "timeout", "timed out", "connection", "temporarily",
+    "unavailable", "overloaded", "502", "503", "504"
+)
+_SPLIT_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Errors worth retrying unchanged later, as opposed to ones the chunk itself causes"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _TRANSIENT_MARKERS)
+
+
+def split_point(text: str) -> int:
+    """Index near the middle of text, on a paragraph, line, sentence or word break if possible"""
+    middle = len(text) // 2
+    low, high = len(text) // 4, 3 * len(text) // 4
+    for separator in _SPLIT_SEPARATORS:
+        candidates = [index + len(separator) for index in (
+            text.rfind(separator, low, middle), text.find(separator, middle, high)) if index != -1]
+        if candidates:
+            return min(candidates, key=lambda index: abs(index - middle))
+    return middle
+
+
+def split_unique_chunk(chunk: UniqueChunk) -> List[UniqueChunk]:
+    """
+    Halve a chunk and every place it occurs.
+
+    Exact copies share the split. Near-duplicates have their own wording, so
+    each is halved on its own text and dispatched separately from here on.
+    """
+    exact = [o for o in chunk.occurrences if o.chunk == chunk.text]
+    pieces = _split_occurrences(chunk.text, exact) if exact else []
+    for occurrence in chunk.occurrences:
+        if occurrence.chunk != chunk.text:
+            pieces.extend(_split_occurrences(occurrence.chunk, [occurrence]))
+    return pieces
+
+
+def _split_occurrences(text: str, occurrences: List[ChunkOccurrence]) -> List[UniqueChunk]:
+    cut = split_point(text)
+    left, right = text[:cut], text[cut:]
+    return [
+        UniqueChunk(text=left, occurrences=[replace(o, chunk=left) for o in occurrences]),
+        UniqueChunk(text=right, occurrences=[
+            replace(o, chunk=right, chunk_start=o.chunk_start + cut) for o in occurrences]),
+    ]
+
+
+class ChunkDispatcher:
+    """
+    Sends chunks to the LLM without losing the ones that fail.
+
+    A chunk failing on its own content (invalid structured output, context
+    overflow) is split in half and each half retried, down to MIN_SPLIT_CHARS.
+    Transient failures are queued and retried after all other chunks. handle
+    receives every successfully coded chunk or piece as soon as it is coded.
+    """
+
+    def __init__(
+        self,
+        call: Callable[[str], Any],
+        handle: Callable[[UniqueChunk, Any], None],
+        min_split_chars: int = MIN_SPLIT_CHARS,
+        retry_rounds: int = RETRY_ROUNDS
+    ):
+        self.call = call
+        self.handle = handle
+        self.min_split_chars = min_split_chars
+        self.retry_rounds = retry_rounds
+        self.unrecoverable: List[dict] = []
+        self._failed_roots: Set[int] = set()
+
+    def run(self, unique_chunks: List[UniqueChunk]) -> Tuple[List[UniqueChunk], List[dict]]:
+        """Return (fully coded chunks, unrecoverable spans)"""
+        retry_queue: List[Tuple[int, UniqueChunk, str]] = []
+        for root, chunk in enumerate(unique_chunks):
+            print(
+                f"Processing chunk {root + 1}/{len(unique_chunks)} ({len(chunk.occurrences)} occurrences)")
+            self._dispatch(root, chunk, retry_queue)
+
+        for retry_round in range(self.retry_rounds):
+            if not retry_queue:
+                break
+            print(f"🔁 Retrying {len(retry_queue)} chunks (round {retry_round + 1})")
+            queue, retry_queue = retry_queue, []
+            for root, chunk, _ in queue:
+                self._dispatch(root, chunk, retry_queue)
+
+        for root, chunk, error in retry_queue:
+            self._give_up(root, chunk, error)
+
+        coded = [chunk for root, chunk in enumerate(unique_chunks) if root not in self._failed_roots]
+        return coded, self.unrecoverable
+
+    def _dispatch(self, root: int, chunk: UniqueChunk, retry_queue: list) -> None:
+        pending = [chunk]
+        while pending:
+            current = pending.pop()
+            try:
+                response = self.call(current.text)
+            except Exception as e:
+                if is_transient_error(e):
+                    print(f"⏳ Queued chunk for retry: {str(e)[:100]}")
+                    retry_queue.append((root, current, str(e)))
+                elif len(current.text) >= 2 * self.min_split_chars:
+                    print(f"✂️ Splitting {len(current.text)} character chunk after error: {str(e)[:100]}")
+                    # Reversed so the first half is coded first
+                    pending.extend(reversed(split_unique_chunk(current)))
+                else:
+                    self._give_up(root, current, str(e))
+                continue
+
+            try:
+                self.handle(current, response)
+            except Exception as e:
+                self._give_up(root, current, str(e))
+
+    def _give_up(self, root: int, chunk: UniqueChunk, error: str) -> None:
+        print(f"❌ Could not code {len(chunk.text)} character chunk: {error[:100]}")
+        self._failed_roots.add(root)
+        for occurrence in chunk.occurrences:
+            self.unrecoverable.append({
+                "document_id": occurrence.document_id,
+                "start_char": occurrence.chunk_start,
+                "end_char": occurrence.chunk_start + len(occurrence.chunk),
+                "error": error[:200]
+            })
@@ -0,0 +1,156 @@
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from app.utils.search_index import InvertedIndex, query_terms
+
+# Most similar codes linked to each code by text
+TEXT_NEIGHBOURS = 5
+# Weighted similarity from which two codes are linked at all
+MIN_EDGE_WEIGHT = 0.2
+# Overlapping spans compared per span; keeps long overlapping runs linear
+MAX_OVERLAP_WINDOW = 50
+# Terms in more than this share of codes are too common to tell codes apart
+MAX_TERM_SHARE = 0.2
+
+
+def co_occurrence_counts(
+    spans: Iterable[Tuple[Hashable, int, int, int]]
+) -> Tuple[Counter, Counter]:
+    """
+    Count how often codes are assigned to overlapping text.
+
+    spans are (code_key, document_id, start_char, end_char). Returns the
+    number of overlapping span pairs per code pair and the number of spans
+    per code.
+    """
+    by_document = defaultdict(set)
+    for code_key, document_id, start, end in spans:
+        by_document[document_id].add((start, end, code_key))
+
+    pair_counts: Counter = Counter()
+    span_counts: Counter = Counter()
+    for document_spans in by_document.values():
+        active: List[Tuple[int, Hashable]] = []
+        for start, end, code_key in sorted(document_spans, key=lambda span: (span[0], span[1])):
+            span_counts[code_key] += 1
+            active = [(active_end, key) for active_end, key in active if active_end > start]
+            for _, other_key in active[-MAX_OVERLAP_WINDOW:]:
+                if other_key != code_key:
+                    pair_counts[_pair(code_key, other_key)] += 1
+            active.append((end, code_key))
+            active = active[-MAX_OVERLAP_WINDOW:]
+    return pair_counts, span_counts
+
+
+def text_similarities(
+    codes: Dict[Hashable, str],
+    neighbours: int = TEXT_NEIGHBOURS,
+    min_max_frequency: int = 2
+) -> Dict[Tuple, float]:
+    """
+    BM25 similarity of each code to its most similar codes.
+
+    Scores are divided by the code's score against itself, so they fall
+    roughly between 0 and 1 and are comparable between codes.
+    """
+    index = InvertedIndex()
+    for key, text in codes.items():
+        index.add(key, text)
+
+    # Skipping very common terms bounds the work per query
+    max_frequency = max(min_max_frequency, int(len(codes) * MAX_TERM_SHARE))
+    similarities: Dict[Tuple, float] = {}
+    for key, text in codes.items():
+        terms = [term for term in query_terms(text)
+                 if index.document_frequency(term) <= max_frequency]
+        ranked = index.search(terms, match_all=False)
+        self_score = next((score for other, score in ranked if other == key), 0.0)
+        if self_score <= 0:
+            continue
+        kept = 0
+        for other, score in ranked:
+            if other == key:
+                continue
+            pair = _pair(key, other)
+            similarities[pair] = max(similarities.get(pair, 0.0), min(score / self_score, 1.0))
+            kept += 1
+            if kept >= neighbours:
+                break
+    return similarities
+
+
+def cluster_codes(
+    codes: Dict[Hashable, str],
+    spans: Iterable[Tuple[Hashable, int, int, int]] = (),
+    max_cluster_size: int = 40,
+    text_weight: float = 0.5,
+    min_edge_weight: float = MIN_EDGE_WEIGHT
+) -> List[List[Hashable]]:
+    """
+    Split codes into clusters of at most max_cluster_size related codes.
+
+    codes maps a key to the code's text (name and description). Codes are
+    linked by text similarity and by assignment co-occurrence, then merged
+    strongest link first as long as clusters stay within the size cap.
+    Leftover small clusters are packed together so the number of clusters,
+    and so of LLM calls, stays close to len(codes) / max_cluster_size.
+    """
+    keys = list(codes)
+    if len(keys) <= max_cluster_size:
+        return [keys] if keys else []
+
+    weights: Dict[Tuple, float] = defaultdict(float)
+    # Terms shared by up to a cluster's worth of codes still count
+    for pair, similarity in text_similarities(codes, min_max_frequency=max_cluster_size).items():
+        weights[pair] += text_weight * similarity
+    pair_counts, span_counts = co_occurrence_counts(spans)
+    for (first, second), count in pair_counts.items():
+        if first in codes and second in codes:
+            weights[(first, second)] += (1 - text_weight) * \
+                count / min(span_counts[first], span_counts[second])
+
+    parent = {key: key for key in keys}
+    size = {key: 1 for key in keys}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    order = {key: i for i, key in enumerate(keys)}
+    edges = sorted(((weight, pair) for pair, weight in weights.items() if weight >= min_edge_weight),
+                   key=lambda edge: (-edge[0], order[edge[1][0]], order[edge[1][1]]))
+    for _, (first, second) in edges:
+        root_first, root_second = find(first), find(second)
+        if root_first == root_second or size[root_first] + size[root_second] > max_cluster_size:
+            continue
+        if order[root_first] > order[root_second]:
+            root_first, root_second = root_second, root_first
+        parent[root_second] = root_first
+        size[root_first] += size[root_second]
+
+    members: Dict[Hashable, List[Hashable]] = defaultdict(list)
+    for key in keys:
+        members[find(key)].append(key)
+    return _pack_small_clusters(list(members.values()), max_cluster_size)
+
+
+def _pack_small_clusters(clusters: List[List[Hashable]], max_cluster_size: int) -> List[List[Hashable]]:
+    """Keep clusters of at least half the cap; fill bins with the smaller ones"""
+    large = [cluster for cluster in clusters if len(cluster) * 2 >= max_cluster_size]
+    small = sorted((cluster for cluster in clusters if len(cluster) * 2 < max_cluster_size),
+                   key=len, reverse=True)
+    bins: List[List[Hashable]] = []
+    for cluster in small:
+        target: Optional[List[Hashable]] = next(
+            (b for b in bins if len(b) + len(cluster) <= max_cluster_size), None)
+        if target is None:
+            bins.append(list(cluster))
+        else:
+            target.extend(cluster)
+    return large + bins
+
+
+def _pair(first: Hashable, second: Hashable) -> Tuple:
+    return (first, second) if str(first) <= str(second) else (second, first)
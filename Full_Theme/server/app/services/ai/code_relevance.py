@@ -0,0 +1,88 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.search_index import InvertedIndex, query_terms
+
+# Codes sent to the LLM with their descriptions for each chunk
+RELEVANT_CODES_TOP_K = 15
+# Code names listed in the codebook part of the cached prompt prefix during
+# initial coding; deductive coding lists every code, as it may assign any of them
+CODEBOOK_NAMES_LIMIT = 200
+
+
+class CodeRelevanceIndex:
+    """
+    BM25 index over code names and descriptions that picks the codes a chunk
+    prompt needs.
+
+    Each chunk gets the top_k best matching codes with descriptions, and
+    every prompt of a run shares a names-only codebook listing, so prompt size
+    stays flat as the codebook grows. Codes are added or replaced one at a time as
+    the session creates them.
+    """
+
+    def __init__(self, codes: Iterable = (), top_k: int = RELEVANT_CODES_TOP_K,
+                 names_limit: Optional[int] = CODEBOOK_NAMES_LIMIT):
+        self.top_k = top_k
+        self.names_limit = names_limit
+        self._index = InvertedIndex()
+        self._descriptions: Dict[str, Optional[str]] = {}
+        for code in codes:
+            self.update(code.name, code.description)
+
+    def __len__(self) -> int:
+        return len(self._descriptions)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._descriptions
+
+    def update(self, name: str, description: Optional[str]) -> None:
+        """Add a code or replace its description"""
+        if name in self._descriptions and self._descriptions[name] == description:
+            return
+        self._descriptions[name] = description
+        # The name is repeated so it outweighs words of a long description
+        self._index.add(name, f"{name}\n{name}\n{description or ''}")
+
+    def remove(self, name: str) -> None:
+        self._descriptions.pop(name, None)
+        self._index.remove(name)
+
+    def select(self, text: str) -> Tuple[List[str], List[str]]:
+        """Split code names into the top_k most relevant to text and the rest"""
+        if len(self._descriptions) <= self.top_k:
+            return list(self._descriptions), []
+        ranked = self._index.search(query_terms(text), match_all=False)
+        relevant = [name for name, _ in ranked[:self.top_k]]
+        chosen = set(relevant)
+        others = [name for name in self._descriptions if name not in chosen]
+        return relevant, others
+
+    def format_codebook(self) -> str:
+        """
+        Names of all codes for the shared prompt prefix.
+
+        Coding runs take the listing once before the first chunk, so the
+        prefix stays byte-identical for provider prompt caching; codes created
+        later reach prompts through format_relevant. Codes keep the order they
+        were added in. A names_limit of None lists every code.
+        """
+        if not self._descriptions:
+            return "No codes available."
+        names = list(self._descriptions)
+        if self.names_limit is None:
+            return "; ".join(names)
+        listed = "; ".join(names[:self.names_limit])
+        if len(names) > self.names_limit:
+            listed += f"; ... and {len(names) - self.names_limit} more"
+        return listed
+
+    def format_relevant(self, text: str) -> str:
+        """Codes most relevant to one chunk, with descriptions"""
+        if not self._descriptions:
+            return "No codes available."
+
+        relevant, _ = self.select(text)
+        return "\n".join(
+            f"- {name}: {self._descriptions[name] or 'No description provided'}"
+            for name in relevant
+        )
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Type
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda, RunnablePassthrough
+from langchain_core.runnables.config import get_callback_manager_for_config
+from pydantic import BaseModel
+
+from app.schemas.ai_services import (
+    CodeGroup, CodeGroupingOutput, CodeOutput, CodeRefinementOutput, DeductiveCodingOutput,
+    MergedTheme, MultipleCodesOutput, ThemeMergingOutput, ThemeOutput)
+
+# Provider name that selects the fake model in LLMService
+FAKE_PROVIDER = "fake"
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z'-]{3,}")
+_SENTENCE = re.compile(r"[^.!?\n]+[.!?]?")
+_STOPWORDS = {
+    "that", "this", "with", "from", "have", "they", "their", "there", "were", "what",
+    "when", "which", "would", "could", "about", "been", "into", "than", "them", "then",
+    "very", "just", "also", "some", "more", "because", "while", "where", "your", "like",
+    "said", "participant", "every"
+}
+
+
+class FakeLLMError(Exception):
+    """Injected failure; rate limit errors mention 429 so the rate limiter retries them"""
+
+
+class FakeChatModel:
+    """
+    Deterministic local stand-in for a chat model.
+
+    Responses are schema-valid and derived from the prompt inputs, so the
+    same input always gets the same answer and quotes are real substrings
+    of the coded text. Latency, jitter, 429 responses and failures are
+    injected at the configured rates to exercise concurrency and retries
+    without network access. The n-th call for a given input draws the same
+    latency and faults on every run. Estimated token usage, including prompt
+    cache hits, is reported to callbacks for PhaseMetrics.
+    """
+
+    def __init__(
+        self,
+        model: str = "fake-model",
+        latency_seconds: float = 0.0,
+        jitter_seconds: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0
+    ):
+        self.model = model
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.rate_limit_rate = rate_limit_rate
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._attempts: Counter = Counter()
+        self._cached_prefixes: set = set()
+        self._generators: Dict[Type[BaseModel], Callable[[dict, random.Random], BaseModel]] = {
+            MultipleCodesOutput: _initial_codes,
+            DeductiveCodingOutput: _deductive_codes,
+            CodeRefinementOutput: _refinement,
+            CodeGroupingOutput: _grouping,
+            ThemeOutput: _theme,
+            ThemeMergingOutput: _theme_merging,
+        }
+
+    def structured_chain(self, prompt, output_schema: Type[BaseModel]) -> Runnable:
+        """prompt | structured model equivalent; the prompt is still rendered as for a real model"""
+        generate = self._generators[output_schema]
+
+        def respond(inputs: dict, config: RunnableConfig) -> BaseModel:
+            messages = inputs["_prompt"].to_messages()
+            inputs = {key: value for key, value in inputs.items() if key != "_prompt"}
+            rng = self._draw(inputs)
+            self._inject(rng)
+            response = generate(inputs, random.Random(self._digest(inputs)))
+            self._report_usage(config, messages, response)
+            return response
+
+        return RunnablePassthrough.assign(_prompt=prompt) | RunnableLambda(respond)
+
+    def _report_usage(self, config: RunnableConfig, messages: List[BaseMessage], response: BaseModel) -> None:
+        """
+        Report token usage to callbacks like a chat model would.
+
+        Tokens are estimated at four characters each. Everything before the
+        last message counts as the prompt prefix, which is served from the
+        cache when the same prefix was sent before, as with provider prompt
+        caching.
+        """
+        prefix = "".join(_message_text(message) for message in messages[:-1])
+        prefix_digest = hashlib.sha256(prefix.encode()).hexdigest()
+        with self._lock:
+            cached = prefix_digest in self._cached_prefixes
+            self._cached_prefixes.add(prefix_digest)
+        input_tokens = sum(len(_message_text(message)) for message in messages) // 4
+        usage = {
+            "input_tokens": input_tokens,
+            "output_tokens": len(response.model_dump_json()) // 4,
+            "input_token_details": {"cache_read": len(prefix) // 4 if cached else 0},
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+
+        run_managers = get_callback_manager_for_config(config).on_chat_model_start(
+            {"name": self.model}, [messages])
+        for run_manager in run_managers:
+            run_manager.on_llm_end(LLMResult(generations=[[ChatGeneration(
+                message=AIMessage(content="", usage_metadata=usage))]]))
+
+    def _digest(self, inputs: dict) -> str:
+        payload = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self.seed}:{self.model}:{payload}".encode()).hexdigest()
+
+    def _draw(self, inputs: dict) -> random.Random:
+        digest = self._digest(inputs)
+        with self._lock:
+            self._attempts[digest] += 1
+            attempt = self._attempts[digest]
+        return random.Random(f"{digest}:{attempt}")
+
+    def _inject(self, rng: random.Random) -> None:
+        delay = self.latency_seconds + rng.uniform(0, self.jitter_seconds)
+        if delay > 0:
+            time.sleep(delay)
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            raise FakeLLMError("429 Too Many Requests: fake rate limit")
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise FakeLLMError("Invalid structured output from fake model")
+
+
+def _message_text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(block.get("text", "") for block in message.content if isinstance(block, dict))
+
+
+def _sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE.findall(text or "") if len(s.strip()) > 15]
+
+
+def _keywords(text: str, count: int = 2) -> List[str]:
+    words = Counter(w.lower() for w in _WORD.findall(text or "") if w.lower() not in _STOPWORDS)
+    return [word for word, _ in sorted(words.items(), key=lambda item: (-item[1], item[0]))[:count]]
+
+
+def _label(text: str) -> str:
+    return " ".join(word.capitalize() for word in _keywords(text)) or "General Observation"
+
+
+def _listed_codes(inputs: dict, relevant_key: str) -> List[str]:
+    """Code names from the codebook listing and the relevant codes of a coding prompt"""
+    names = [line[2:].split(": ", 1)[0]
+             for line in (inputs.get(relevant_key) or "").splitlines() if line.startswith("- ")]
+    codebook = inputs.get("codebook") or ""
+    if codebook != "No codes available.":
+        names.extend(name for name in codebook.split("; ")
+                     if name and not name.startswith("... and ") and name not in names)
+    return names
+
+
+def _prefixed(text: str, prefix: str) -> List[str]:
+    return [line[len(prefix):].strip() for line in (text or "").splitlines() if line.startswith(prefix)]
+
+
+def _initial_codes(inputs: dict, rng: random.Random) -> MultipleCodesOutput:
+    sentences = _sentences(inputs.get("text", ""))
+    existing = _listed_codes(inputs, "existing_codes")
+    codes = []
+    for quote in rng.sample(sentences, min(len(sentences), rng.randint(1, 3))):
+        reuse = existing and rng.random() < 0.5
+        name = rng.choice(existing) if reuse else _label(quote)
+        codes.append(CodeOutput(
+            reasoning=f"The passage discusses {name.lower()}.",
+            code=name,
+            quote=quote,
+            code_description=f"Participants describe {name.lower()}.",
+            is_new_code=not reuse,
+            existing_code_rationale="Matches the existing code." if reuse else "",
+            confidence=rng.randint(55, 98)
+        ))
+    return MultipleCodesOutput(codes=codes, analysis_notes="Generated by the fake model.")
+
+
+def _deductive_codes(inputs: dict, rng: random.Random) -> DeductiveCodingOutput:
+    sentences = _sentences(inputs.get("text", ""))
+    available = _listed_codes(inputs, "available_codes")
+    assigned = rng.sample(available, min(len(available), rng.randint(1, 2))) if sentences else []
+    return DeductiveCodingOutput(
+        reasoning="Codes chosen by keyword overlap.",
+        assigned_codes=assigned,
+        quote=rng.choice(sentences) if sentences else "",
+        confidence_scores=[round(rng.uniform(0.5, 0.99), 2) for _ in assigned],
+        rationale="Generated by the fake model."
+    )
+
+
+def _refinement(inputs: dict, rng: random.Random) -> CodeRefinementOutput:
+    roll = rng.random()
+    if roll < 0.1 and int(inputs.get("assignment_count", 0)) <= 1:
+        action = "delete"
+    elif roll < 0.3:
+        action = "modify"
+    else:
+        action = "keep"
+    name = inputs.get("code_name", "")
+    return CodeRefinementOutput(
+        action=action,
+        reasoning=f"Fake review of {name}.",
+        refined_code_name=name.title() if action == "modify" else "",
+        refined_code_description=f"Refined: {inputs.get('code_description', '')}" if action == "modify" else "",
+        confidence=round(rng.uniform(0.6, 0.99), 2)
+    )
+
+
+def _grouping(inputs: dict, rng: random.Random) -> CodeGroupingOutput:
+    groups: Dict[str, List[str]] = {}
+    for name in _prefixed(inputs.get("codes_summary", ""), "Code: "):
+        groups.setdefault((_keywords(name, 1) or ["other"])[0], []).append(name)
+    return CodeGroupingOutput(
+        reasoning="Codes grouped by their leading keyword.",
+        groups=[CodeGroup(group_name=key.capitalize(), group_description=f"Codes about {key}",
+                          code_names=names, rationale="Shared keyword.")
+                for key, names in groups.items() if len(names) > 1],
+        ungrouped_codes=[names[0] for names in groups.values() if len(names) == 1]
+    )
+
+
+def _theme(inputs: dict, rng: random.Random) -> ThemeOutput:
+    names = _prefixed(inputs.get("codes_text", ""), "Code: ")
+    theme_name = _label(" ".join(names))
+    return ThemeOutput(
+        reasoning="Theme named after the most common words in its codes.",
+        theme_name=theme_name,
+        theme_description=f"Experiences of {theme_name.lower()}.",
+        related_codes=names
+    )
+
+
+def _theme_merging(inputs: dict, rng: random.Random) -> ThemeMergingOutput:
+    by_label: Dict[str, List[str]] = {}
+    for name in _prefixed(inputs.get("themes_text", ""), "Theme: "):
+        by_label.setdefault(_label(name), []).append(name)
+    return ThemeMergingOutput(
+        reasoning="Candidates with the same keywords were merged.",
+        themes=[MergedTheme(theme_name=label, theme_description=f"Experiences of {label.lower()}.",
+                            source_themes=sources) for label, sources in by_label.items()]
+    )
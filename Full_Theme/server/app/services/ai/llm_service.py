@@ -1,34 +1,73 @@
 from langchain.chat_models import init_chat_model
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain_core.runnables import Runnable
-from app.schemas.ai_services import CodeOutput, MultipleCodesOutput, ThemeOutput, DeductiveCodingOutput, CodeRefinementOutput, CodeGroupingOutput
+from app.schemas.ai_services import CodeOutput, MultipleCodesOutput, ThemeOutput, ThemeMergingOutput, DeductiveCodingOutput, CodeRefinementOutput, CodeGroupingOutput
 from app.prompts.initial_coding import system_message
 from app.prompts.theme_generation import system_message as theme_system_message
+from app.prompts.theme_merging import system_message as theme_merging_system_message
 from app.prompts.deductive_coding import system_message as deductive_system_message
 from app.prompts.code_refinement import system_message as refinement_system_message
 from app.prompts.code_grouping import system_message as grouping_system_message
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.services.ai.model_routing import ModelRouter, PhaseMetrics
+from app.services.ai.fake_llm import FAKE_PROVIDER, FakeChatModel
 from app.utils.llm_provider_api_key import get_llm_provider_api_key
 
+# Providers that cache prompt prefixes only at explicit cache_control
+# breakpoints; Gemini and OpenAI cache repeated prefixes implicitly
+CACHE_CONTROL_PROVIDERS = ("anthropic",)
+
 
 class LLMService:
-    def __init__(self, model_name: str, provider: str = "google_genai"):
-        self.model_name = model_name
+    """
+    Structured LLM chains per AI service type.
+
+    Each service type runs on the model the router assigns it, so cheap
+    phases can use a cheaper model. Passing model_name pins every phase to
+    that model. metrics collects latency, tokens and cost per phase.
+    The "fake" provider runs every chain on a local FakeChatModel; request
+    schemas only accept it when settings.ENABLE_FAKE_LLM is on.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        provider: str = "google_genai",
+        router: Optional[ModelRouter] = None,
+        metrics: Optional[PhaseMetrics] = None
+    ):
         self.provider = provider
-        self.llm = init_chat_model(
-            model=self.model_name,
-            model_provider=self.provider,
-            api_key=get_llm_provider_api_key(self.provider),
+        self.router = router or ModelRouter(
+            default_model=settings.AI_DEFAULT_MODEL,
+            service_models=settings.AI_SERVICE_MODELS,
+            escalation_model=settings.AI_ESCALATION_MODEL,
+            escalation_confidence=settings.AI_ESCALATION_CONFIDENCE,
+            model_name=model_name
         )
+        self.metrics = metrics or PhaseMetrics(settings.AI_MODEL_PRICES)
+        self.model_name = self.router.default_model
+        self._chat_models: Dict[str, object] = {}
+        self._chains: Dict[Tuple[str, str], Runnable] = {}
+        self._prompts: Dict[str, tuple] = {}
+        self.llm = self._chat_model(self.model_name)
+
+        # Coding prompts put what is the same for every chunk of a run first,
+        # so providers can serve that prefix from their prompt cache
 
         # Initial coding prompt with enhanced context
         initial_coding_prompt = ChatPromptTemplate.from_messages(
             [
-                SystemMessagePromptTemplate.from_template(system_message),
-                HumanMessagePromptTemplate.from_template("""
+                self.prefix_template(SystemMessagePromptTemplate, system_message, provider),
+                self.prefix_template(HumanMessagePromptTemplate, """
 Research Context:
 {research_context}
 
-Existing Codes (use these if they fit, or create new ones):
+Codebook (use these codes if they fit, or create new ones):
+{codebook}
+""", provider),
+                HumanMessagePromptTemplate.from_template("""
+Most Relevant Existing Codes:
 {existing_codes}
 
 Text to Analyze:
@@ -36,34 +75,45 @@ Text to Analyze:
 """),
             ]
         )
-        self.initial_coding_llm: Runnable = (
-            initial_coding_prompt |
-            self.llm.with_structured_output(MultipleCodesOutput)
-        )
+        self._prompts["initial_coding"] = (initial_coding_prompt, MultipleCodesOutput)
+        self.initial_coding_llm: Runnable = self.llm_for("initial_coding")
 
         # Theme generation prompt
         theme_prompt = ChatPromptTemplate.from_messages(
             [
-                SystemMessagePromptTemplate.from_template(
-                    theme_system_message),
+                self.prefix_template(SystemMessagePromptTemplate, theme_system_message, provider),
                 HumanMessagePromptTemplate.from_template("{codes_text}"),
             ]
         )
-        self.theme_generation_llm: Runnable = (
-            theme_prompt |
-            self.llm.with_structured_output(ThemeOutput)
+        self._prompts["theme_generation"] = (theme_prompt, ThemeOutput)
+        self.theme_generation_llm: Runnable = self.llm_for("theme_generation")
+
+        # Theme merging prompt
+        theme_merging_prompt = ChatPromptTemplate.from_messages(
+            [
+                self.prefix_template(SystemMessagePromptTemplate, theme_merging_system_message, provider),
+                HumanMessagePromptTemplate.from_template("""
+Candidate Themes:
+{themes_text}
+"""),
+            ]
         )
+        self._prompts["theme_merging"] = (theme_merging_prompt, ThemeMergingOutput)
+        self.theme_merging_llm: Runnable = self.llm_for("theme_merging")
 
         # Deductive coding prompt
         deductive_coding_prompt = ChatPromptTemplate.from_messages(
             [
-                SystemMessagePromptTemplate.from_template(
-                    deductive_system_message),
-                HumanMessagePromptTemplate.from_template("""
+                self.prefix_template(SystemMessagePromptTemplate, deductive_system_message, provider),
+                self.prefix_template(HumanMessagePromptTemplate, """
 Research Context:
 {research_context}
 
 Available Codes from Codebook:
+{codebook}
+""", provider),
+                HumanMessagePromptTemplate.from_template("""
+Most Relevant Codes with Descriptions:
 {available_codes}
 
 Text to Analyze:
@@ -71,16 +121,13 @@ Text to Analyze:
 """),
             ]
         )
-        self.deductive_coding_llm: Runnable = (
-            deductive_coding_prompt |
-            self.llm.with_structured_output(DeductiveCodingOutput)
-        )
+        self._prompts["deductive_coding"] = (deductive_coding_prompt, DeductiveCodingOutput)
+        self.deductive_coding_llm: Runnable = self.llm_for("deductive_coding")
 
         # Code refinement prompt
         refinement_prompt = ChatPromptTemplate.from_messages(
             [
-                SystemMessagePromptTemplate.from_template(
-                    refinement_system_message),
+                self.prefix_template(SystemMessagePromptTemplate, refinement_system_message, provider),
                 HumanMessagePromptTemplate.from_template("""
 Code to Review:
 Name: {code_name}
@@ -93,16 +140,13 @@ Total number of assignments: {assignment_count}
 """),
             ]
         )
-        self.code_refinement_llm: Runnable = (
-            refinement_prompt |
-            self.llm.with_structured_output(CodeRefinementOutput)
-        )
+        self._prompts["code_refinement"] = (refinement_prompt, CodeRefinementOutput)
+        self.code_refinement_llm: Runnable = self.llm_for("code_refinement")
 
         # Code grouping prompt
         grouping_prompt = ChatPromptTemplate.from_messages(
             [
-                SystemMessagePromptTemplate.from_template(
-                    grouping_system_message),
+                self.prefix_template(SystemMessagePromptTemplate, grouping_system_message, provider),
                 HumanMessagePromptTemplate.from_template("""
 Codes to Group:
 {codes_summary}
@@ -112,7 +156,50 @@ Sample assignments for context:
 """),
             ]
         )
-        self.code_grouping_llm: Runnable = (
-            grouping_prompt |
-            self.llm.with_structured_output(CodeGroupingOutput)
-        )
+        self._prompts["code_grouping"] = (grouping_prompt, CodeGroupingOutput)
+        self.code_grouping_llm: Runnable = self.llm_for("code_grouping")
+
+    def llm_for(self, service_type: str, model: Optional[str] = None) -> Runnable:
+        """Structured chain for a service type on the given or routed model"""
+        model = model or self.router.model_for(service_type)
+        key = (service_type, model)
+        if key not in self._chains:
+            prompt, output_schema = self._prompts[service_type]
+            chat_model = self._chat_model(model)
+            if isinstance(chat_model, FakeChatModel):
+                self._chains[key] = chat_model.structured_chain(prompt, output_schema)
+            else:
+                self._chains[key] = prompt | chat_model.with_structured_output(output_schema)
+        return self._chains[key]
+
+    @staticmethod
+    def prefix_template(template_class, template: str, provider: str):
+        """Message template for a static prompt prefix, marked as a cache breakpoint where the provider takes one"""
+        if provider in CACHE_CONTROL_PROVIDERS:
+            return template_class.from_template(
+                [{"type": "text", "text": template, "cache_control": {"type": "ephemeral"}}])
+        return template_class.from_template(template)
+
+    def escalation_llm(self, service_type: str) -> Optional[Runnable]:
+        if not self.router.escalation_model:
+            return None
+        return self.llm_for(service_type, self.router.escalation_model)
+
+    def _chat_model(self, model: str):
+        if model not in self._chat_models:
+            if self.provider == FAKE_PROVIDER:
+                self._chat_models[model] = FakeChatModel(
+                    model=model,
+                    latency_seconds=settings.FAKE_LLM_LATENCY_SECONDS,
+                    jitter_seconds=settings.FAKE_LLM_JITTER_SECONDS,
+                    rate_limit_rate=settings.FAKE_LLM_RATE_LIMIT_RATE,
+                    failure_rate=settings.FAKE_LLM_FAILURE_RATE,
+                    seed=settings.FAKE_LLM_SEED
+                )
+            else:
+                self._chat_models[model] = init_chat_model(
+                    model=model,
+                    model_provider=self.provider,
+                    api_key=get_llm_provider_api_key(self.provider),
+                )
+        return self._chat_models[model]
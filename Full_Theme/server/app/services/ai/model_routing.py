@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+class ModelRouter:
+    """
+    Picks the model for each AI service type.
+
+    A pinned model_name overrides the per-service configuration so a caller
+    can run the whole pipeline on one model.
+    """
+
+    def __init__(
+        self,
+        default_model: str,
+        service_models: Optional[Dict[str, str]] = None,
+        escalation_model: Optional[str] = None,
+        escalation_confidence: float = 0.6,
+        model_name: Optional[str] = None
+    ):
+        self.default_model = model_name or default_model
+        self.service_models = {} if model_name else dict(service_models or {})
+        self.escalation_model = escalation_model
+        self.escalation_confidence = escalation_confidence
+
+    def model_for(self, service_type: str) -> str:
+        return self.service_models.get(service_type, self.default_model)
+
+    def should_escalate(self, service_type: str, confidence: Optional[float]) -> bool:
+        """True if a response with this confidence (0-1) should be re-run on the escalation model"""
+        return (
+            confidence is not None
+            and self.escalation_model is not None
+            and self.escalation_model != self.model_for(service_type)
+            and confidence < self.escalation_confidence
+        )
+
+
+class _UsageCallback(BaseCallbackHandler):
+    """Collects token usage reported by chat model calls"""
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response: LLMResult, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                # input_tokens includes the prompt tokens served from the provider's cache
+                self.input_tokens += usage.get("input_tokens", 0)
+                self.cached_input_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+                self.output_tokens += usage.get("output_tokens", 0)
+
+
+class PhaseMetrics:
+    """
+    Calls, latency, tokens and estimated cost per AI service type, shared across threads.
+
+    Input tokens are split into those served from the provider's prompt
+    cache and the rest; cached tokens are priced at the model's
+    "cached_input" price when one is configured.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Dict[str, float]]] = None):
+        self.prices = prices or {}
+        self._lock = threading.Lock()
+        self._phases: Dict[str, dict] = defaultdict(lambda: {
+            "calls": 0, "failures": 0, "escalations": 0, "seconds": 0.0, "backoff_seconds": 0.0,
+            "input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0,
+            "cost_usd": 0.0, "models": defaultdict(int)
+        })
+
+    @contextmanager
+    def track(self, service_type: str, model: str, escalation: bool = False) -> Iterator[dict]:
+        """Time one call; yields the invoke config carrying the token usage callback"""
+        usage = _UsageCallback()
+        started = time.perf_counter()
+        failed = True
+        try:
+            yield {"callbacks": [usage]}
+            failed = False
+        finally:
+            self.record(service_type, model, time.perf_counter() - started,
+                        usage.input_tokens, usage.output_tokens, failed, escalation,
+                        cached_input_tokens=usage.cached_input_tokens)
+
+    def record(
+        self,
+        service_type: str,
+        model: str,
+        seconds: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        failed: bool = False,
+        escalation: bool = False,
+        cached_input_tokens: int = 0
+    ) -> None:
+        price = self.prices.get(model, {})
+        input_price = price.get("input", 0.0)
+        with self._lock:
+            phase = self._phases[service_type]
+            phase["calls"] += 1
+            phase["failures"] += int(failed)
+            phase["escalations"] += int(escalation)
+            phase["seconds"] += seconds
+            phase["input_tokens"] += input_tokens
+            phase["cached_input_tokens"] += cached_input_tokens
+            phase["output_tokens"] += output_tokens
+            phase["cost_usd"] += ((input_tokens - cached_input_tokens) * input_price +
+                                  cached_input_tokens * price.get("cached_input", input_price) +
+                                  output_tokens * price.get("output", 0.0)) / 1_000_000
+            phase["models"][model] += 1
+
+    def record_backoff(self, service_type: str, seconds: float) -> None:
+        """Time spent waiting out rate limits before retrying a call"""
+        with self._lock:
+            self._phases[service_type]["backoff_seconds"] += seconds
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Raw per-phase totals, JSON serializable, for merge"""
+        with self._lock:
+            return {service_type: {**phase, "models": dict(phase["models"])}
+                    for service_type, phase in self._phases.items()}
+
+    def merge(self, snapshot: Dict[str, dict]) -> None:
+        """Add totals recorded elsewhere, such as by a batch job, to these metrics"""
+        with self._lock:
+            for service_type, totals in snapshot.items():
+                phase = self._phases[service_type]
+                for key, value in totals.items():
+                    if key == "models":
+                        for model, calls in value.items():
+                            phase["models"][model] += calls
+                    else:
+                        phase[key] += value
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                service_type: {
+                    **phase,
+                    "seconds": round(phase["seconds"], 3),
+                    "backoff_seconds": round(phase["backoff_seconds"], 3),
+                    "avg_seconds": round(phase["seconds"] / phase["calls"], 3) if phase["calls"] else 0.0,
+                    "uncached_input_tokens": phase["input_tokens"] - phase["cached_input_tokens"],
+                    "cache_hit_rate": round(phase["cached_input_tokens"] / phase["input_tokens"], 3)
+                    if phase["input_tokens"] else 0.0,
+                    "cost_usd": round(phase["cost_usd"], 6),
+                    "models": dict(phase["models"])
+                }
+                for service_type, phase in self._phases.items()
+            }
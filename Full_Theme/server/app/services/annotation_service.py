@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, select
 
 from app.core.permissions import PermissionChecker
 from app.models.annotation import Annotation
@@ -24,7 +24,8 @@ class AnnotationService:
         project_id: Optional[int] = None,
         start_char: Optional[int] = None,
         end_char: Optional[int] = None,
-        text_snapshot: Optional[str] = None
+        text_snapshot: Optional[str] = None,
+        parent_id: Optional[int] = None
     ) -> Annotation:
         """
         Create a new annotation linked to a document, code, or both.
@@ -68,7 +69,19 @@ class AnnotationService:
 
             # If no explicit project_id provided, use the code's
             if not project_id:
-                project_id = code.project_id  # type: ignore        # Create the annotation
+                project_id = code.project_id  # type: ignore
+
+        if parent_id:
+            # Replies must stay inside the thread's project
+            parent = db.query(Annotation.project_id).filter(
+                Annotation.id == parent_id).first()
+            if not parent:
+                raise ValueError("Parent annotation not found")
+            if parent.project_id != project_id:
+                raise ValueError(
+                    "Parent annotation belongs to a different project")
+
+        # Create the annotation
         annotation = Annotation(
             content=content,
             annotation_type=annotation_type,
@@ -78,7 +91,8 @@ class AnnotationService:
             created_by_id=user_id,
             start_char=start_char,
             end_char=end_char,
-            text_snapshot=text_snapshot
+            text_snapshot=text_snapshot,
+            parent_id=parent_id
         )
 
         db.add(annotation)
@@ -135,9 +149,11 @@ class AnnotationService:
     def get_project_annotations(
         db: Session,
         project_id: int,
-        user_id: int
+        user_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None
     ) -> List[AnnotationWithDetails]:
-        """Get all annotations for a project with details"""
+        """Get annotations for a project with details, paginated by annotation id"""
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             raise ValueError("User not found")
@@ -149,28 +165,44 @@ class AnnotationService:
         if not project:
             raise ValueError("Project not found or access denied")
 
-        annotations = db.query(Annotation).filter(
-            Annotation.project_id == project_id).all()
-
-        results = []
-        for annotation in annotations:
-            creator = db.query(User).filter(
-                User.id == annotation.created_by_id).first()
-
-            results.append(AnnotationWithDetails(
-                id=annotation.id,  # type: ignore
-                content=annotation.content,  # type: ignore
-                annotation_type=annotation.annotation_type,  # type: ignore
-                document_id=annotation.document_id,  # type: ignore
-                code_id=annotation.code_id,  # type: ignore
-                project_id=annotation.project_id,  # type: ignore
-                created_by_id=annotation.created_by_id,  # type: ignore
-                created_at=annotation.created_at,  # type: ignore
-                updated_at=annotation.updated_at,  # type: ignore
-                created_by_email=creator.email if creator else None  # type: ignore
-            ))
-
-        return results
+        query = AnnotationService._details_query(db).filter(
+            Annotation.project_id == project_id)
+
+        return AnnotationService._fetch_page(query, after_id, limit)
+
+    @staticmethod
+    def get_annotation_thread(
+        db: Session,
+        annotation_id: int,
+        user_id: int
+    ) -> List[AnnotationWithDetails]:
+        """Get an annotation and all of its nested replies, loaded with one recursive query"""
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise ValueError("User not found")
+
+        annotation = db.query(Annotation.id, Annotation.project_id).filter(
+            Annotation.id == annotation_id).first()
+        if not annotation:
+            raise ValueError("Annotation not found")
+
+        project = PermissionChecker.check_project_access(
+            db, annotation.project_id, user, raise_exception=False)
+        if not project:
+            raise ValueError("Access denied")
+
+        thread = db.query(Annotation.id).filter(
+            Annotation.id == annotation_id
+        ).cte(name="annotation_thread", recursive=True)
+        thread = thread.union_all(
+            db.query(Annotation.id).filter(Annotation.parent_id == thread.c.id)
+        )
+
+        query = AnnotationService._details_query(db).filter(
+            Annotation.id.in_(select(thread.c.id))
+        ).order_by(Annotation.id)
+
+        return [AnnotationService._to_details(row) for row in query.all()]
 
     @staticmethod
     def update_annotation(
@@ -253,15 +285,17 @@ class AnnotationService:
         created_by_id: Optional[int] = None,
         annotation_type: Optional[str] = None,
         search_text: Optional[str] = None,
-        annotation_id: Optional[int] = None
+        annotation_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None
     ) -> List[AnnotationWithDetails]:
-        """Filter annotations based on various criteria"""
+        """Filter annotations based on various criteria, paginated by annotation id"""
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             raise ValueError("User not found")
 
         # Start with base query
-        query = db.query(Annotation)
+        query = AnnotationService._details_query(db)
 
         # Apply filters
         filters = []
@@ -275,21 +309,15 @@ class AnnotationService:
                 raise ValueError("Project not found or access denied")
 
             filters.append(Annotation.project_id == project_id)
-        else:            # If no specific project, limit to projects user has access to
-            # Get projects where user is owner or collaborator
-            accessible_projects = db.query(Project).filter(
+        else:
+            # If no specific project, limit to projects user has access to
+            accessible_projects = select(Project.id).where(
                 or_(
                     Project.owner_id == user.id,
                     Project.collaborators.any(User.id == user.id)
                 )
-            ).all()
-            project_ids = [p.id for p in accessible_projects]
-            if project_ids:
-                filters.append(Annotation.project_id.in_(
-                    project_ids))  # type: ignore
-            else:
-                # If user has no projects, return empty result set
-                return []
+            )
+            filters.append(Annotation.project_id.in_(accessible_projects))
 
         if document_id:
             filters.append(Annotation.document_id == document_id)
@@ -311,50 +339,53 @@ class AnnotationService:
             filters.append(Annotation.id == annotation_id)
 
         # Apply all filters
-        if filters:
-            query = query.filter(and_(*filters))
-
-        # Execute query
-        annotations = query.all()
-
-        # Build detailed response
-        results = []
-        for annotation in annotations:
-            creator = db.query(User).filter(
-                User.id == annotation.created_by_id).first()
-
-            # Get document name if available
-            document_name = None
-            if annotation.document_id:  # type: ignore
-                document = db.query(Document).filter(
-                    Document.id == annotation.document_id).first()
-                if document:
-                    document_name = document.name
-
-            # Get code name if available
-            code_name = None
-            if annotation.code_id:  # type: ignore
-                code = db.query(Code).filter(
-                    Code.id == annotation.code_id).first()
-                if code:
-                    code_name = code.name
-
-            results.append(AnnotationWithDetails(
-                id=annotation.id,  # type: ignore
-                content=annotation.content,  # type: ignore
-                annotation_type=annotation.annotation_type,  # type: ignore
-                document_id=annotation.document_id,  # type: ignore
-                code_id=annotation.code_id,  # type: ignore
-                project_id=annotation.project_id,  # type: ignore
-                start_char=annotation.start_char,  # type: ignore
-                end_char=annotation.end_char,  # type: ignore
-                text_snapshot=annotation.text_snapshot,  # type: ignore
-                created_by_id=annotation.created_by_id,  # type: ignore
-                created_at=annotation.created_at,  # type: ignore
-                updated_at=annotation.updated_at,  # type: ignore
-                created_by_email=creator.email if creator else None,  # type: ignore
-                document_name=document_name,  # type: ignore
-                code_name=code_name  # type: ignore
-            ))
-
-        return results
+        query = query.filter(and_(*filters))
+
+        return AnnotationService._fetch_page(query, after_id, limit)
+
+    @staticmethod
+    def _details_query(db: Session):
+        """
+        Query projecting exactly the columns of AnnotationWithDetails, with the
+        creator, document and code names joined in instead of loaded per row
+        """
+        return db.query(
+            Annotation.id,
+            Annotation.content,
+            Annotation.annotation_type,
+            Annotation.document_id,
+            Annotation.code_id,
+            Annotation.project_id,
+            Annotation.parent_id,
+            Annotation.start_char,
+            Annotation.end_char,
+            Annotation.text_snapshot,
+            Annotation.created_by_id,
+            Annotation.created_at,
+            Annotation.updated_at,
+            User.email.label("created_by_email"),
+            Document.name.label("document_name"),
+            Code.name.label("code_name")
+        ).outerjoin(
+            User, User.id == Annotation.created_by_id
+        ).outerjoin(
+            Document, Document.id == Annotation.document_id
+        ).outerjoin(
+            Code, Code.id == Annotation.code_id
+        )
+
+    @staticmethod
+    def _fetch_page(query, after_id: Optional[int], limit: Optional[int]) -> List[AnnotationWithDetails]:
+        """Keyset-paginate a details query on annotation id"""
+        if after_id is not None:
+            query = query.filter(Annotation.id > after_id)
+
+        query = query.order_by(Annotation.id)
+        if limit is not None:
+            query = query.limit(limit)
+
+        return [AnnotationService._to_details(row) for row in query.all()]
+
+    @staticmethod
+    def _to_details(row) -> AnnotationWithDetails:
+        return AnnotationWithDetails(**row._mapping)
@@ -1,5 +1,8 @@
+from sqlalchemy import insert, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, selectinload
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from fastapi import HTTPException
 import datetime
 
@@ -9,6 +12,13 @@ from app.models.code_assignments import CodeAssignment as CodeAssignmentModel
 from app.models.user import User
 from app.core.permissions import PermissionChecker
 from app.schemas.code_assignment import CodeAssignment, CodeAssignmentInDB
+from app.services.codebook_service import CodebookService
+
+# Columns of the uq_code_assignments_span unique constraint
+ASSIGNMENT_KEY_COLUMNS = ("document_id", "code_id",
+                          "start_char", "end_char", "created_by_id")
+# Rows per multi-row INSERT/lookup, well below bind parameter limits
+INSERT_BATCH_SIZE = 1000
 
 
 class CodeAssignmentService:
@@ -241,222 +251,254 @@ class CodeAssignmentService:
                 raise e
 
         # Get all unique project IDs and code names
-        project_ids = list(set(doc.project_id for doc in documents))
+        document_projects = {doc.id: doc.project_id for doc in documents}
+        project_ids = list(set(document_projects.values()))
         code_names = list(set(req.code_name for req in requests))
         print(
             f"DEBUG: Processing {len(code_names)} unique codes across {len(project_ids)} projects")
 
-        # Fetch all existing codes in a single query
-        existing_codes = db.query(Code).filter(
-            Code.project_id.in_(project_ids),
-            Code.name.in_(code_names)
-        ).all()
+        code_columns = (Code.id, Code.project_id, Code.name, Code.description,
+                        Code.color, Code.created_at)
 
-        # Build lookup for existing codes
+        # Fetch all existing codes in a single query, keeping the first code per name
         codes_lookup = {}
-        for code in existing_codes:
-            key = (code.project_id, code.name)
-            codes_lookup[key] = code
-
-        # Identify codes that need to be created
-        codes_to_create = []
-        codes_created_count = 0
+        for code in db.query(*code_columns).filter(
+            Code.project_id.in_(project_ids),
+            Code.name.in_(code_names)
+        ).order_by(Code.id).all():
+            codes_lookup.setdefault((code.project_id, code.name), code)
 
+        # Identify codes that need to be created, keyed so each is only created once
+        codes_to_create: Dict[tuple, Dict[str, Any]] = {}
         for req in requests:
-            document = document_map[req.document_id]  # type: ignore
-            project_id = document.project_id  # type: ignore
-            code_key = (project_id, req.code_name)
-
-            if code_key not in codes_lookup:
-                # Check if we haven't already added this code to the creation list
-                if not any(c['name'] == req.code_name and c['project_id'] == project_id for c in codes_to_create):
-                    codes_to_create.append({
-                        'name': req.code_name,
-                        'project_id': project_id,
-                        'description': req.code_description or f"Auto-created code: {req.code_name}",
-                        'color': req.code_color or "#3B82F6",
-                        'created_by_id': user_id,
-                        'is_auto_generated': is_auto_generated,
-                        'codebook_id': codebook_id
-                    })
+            code_key = (document_projects[req.document_id], req.code_name)
+            if code_key not in codes_lookup and code_key not in codes_to_create:
+                codes_to_create[code_key] = {
+                    'name': req.code_name,
+                    'project_id': code_key[0],
+                    'description': req.code_description or f"Auto-created code: {req.code_name}",
+                    'color': req.code_color or "#3B82F6",
+                    'created_by_id': user_id,
+                    'is_auto_generated': is_auto_generated,
+                    'codebook_id': codebook_id
+                }
 
         # Bulk create new codes if needed
         if codes_to_create:
             print(f"Creating {len(codes_to_create)} new codes in bulk")
 
-            # Add timestamps for bulk insert
+            # Core inserts skip the Code before_insert listener, so resolve
+            # the default codebook once per project here
+            default_codebooks = {}
             current_time = datetime.datetime.now(datetime.timezone.utc)
-            for code_data in codes_to_create:
+            for code_data in codes_to_create.values():
+                if code_data['codebook_id'] is None:
+                    project_id = code_data['project_id']
+                    if project_id not in default_codebooks:
+                        default_codebooks[project_id] = CodebookService.get_or_create_default_codebook(
+                            db, user_id, project_id).id
+                    code_data['codebook_id'] = default_codebooks[project_id]
                 code_data['created_at'] = current_time
                 code_data['updated_at'] = current_time
 
-            # Use bulk_insert_mappings for efficient insertion
-            db.bulk_insert_mappings(Code.__mapper__, codes_to_create)
-            db.commit()
-            codes_created_count = len(codes_to_create)
-
-            # Refresh codes_lookup with newly created codes
-            new_codes = db.query(Code).filter(
-                Code.project_id.in_(project_ids),
-                Code.name.in_([c['name'] for c in codes_to_create])
-            ).all()
-
-            for code in new_codes:
-                key = (code.project_id, code.name)
-                if key not in codes_lookup:  # Only add if not already present
-                    codes_lookup[key] = code
-
-        # Check for duplicate assignments before creating
-        existing_assignments = db.query(CodeAssignmentModel).filter(
-            CodeAssignmentModel.document_id.in_(document_ids),
-            CodeAssignmentModel.created_by_id == user_id
-        ).all()
-
-        existing_assignment_keys = set()
-        for assignment in existing_assignments:
-            key = (assignment.document_id, assignment.code_id,
-                   assignment.start_char, assignment.end_char)
-            existing_assignment_keys.add(key)
+            for code in db.execute(
+                insert(Code.__table__).returning(*code_columns),
+                list(codes_to_create.values())
+            ):
+                codes_lookup[(code.project_id, code.name)] = code
 
         # Prepare assignments for bulk creation
-        assignments_to_create = []
-        results = []
+        assignment_rows = []
+        assignment_indexes = []
         errors = []
 
         for i, req in enumerate(requests):
-            try:
-                document = document_map[req.document_id]  # type: ignore
-                project_id = document.project_id  # type: ignore
-                code_key = (project_id, req.code_name)
-
-                code = codes_lookup.get(code_key)
-                if not code:
-                    errors.append({
-                        'index': i,
-                        'assignment': req.model_dump(),
-                        'error': f"Code '{req.code_name}' not found for project {project_id}"
-                    })
-                    continue
-
-                # Check for duplicate assignment
-                assignment_key = (req.document_id, code.id,
-                                  req.start_char, req.end_char)
-                if assignment_key in existing_assignment_keys:
-                    # Skip duplicate but still return it in results
-                    existing_assignment = next(
-                        (a for a in existing_assignments if (a.document_id,
-                         a.code_id, a.start_char, a.end_char) == assignment_key),
-                        None
-                    )
-                    if existing_assignment:
-                        results.append({
-                            "code_assignment": {
-                                "id": existing_assignment.id,
-                                "text": existing_assignment.text_snapshot,
-                                "start_char": existing_assignment.start_char,
-                                "end_char": existing_assignment.end_char,
-                                "document_id": existing_assignment.document_id,
-                                "confidence": existing_assignment.confidence if existing_assignment.confidence is not None else 80,
-                                "created_at": existing_assignment.created_at
-                            },
-                            "code": {
-                                "id": code.id,
-                                "name": code.name,
-                                "description": code.description,
-                                "color": code.color,
-                                "project_id": code.project_id,
-                                "created_at": code.created_at,
-                                "is_auto_generated": is_auto_generated,
-                                "was_created": False
-                            },
-                            "assignment_status": "success",
-                            "message": f"Code '{code.name}' already assigned to this text selection"
-                        })
-                    continue
-
-                current_time = datetime.datetime.now(datetime.timezone.utc)
-                # Add to bulk creation list
-                assignment_data = {
-                    'document_id': req.document_id,
-                    'code_id': code.id,
-                    'start_char': req.start_char,
-                    'end_char': req.end_char,
-                    'text_snapshot': req.text,
-                    'confidence': req.confidence if req.confidence is not None else 80,
-                    'created_by_id': user_id,
-                    'created_at': current_time,
-                    'updated_at': current_time
-                }
-                assignments_to_create.append(assignment_data)
-
-                # Prepare result entry (we'll get the ID after bulk insert)
-                results.append({
-                    "code_assignment": {
-                        "id": None,  # Will be filled after bulk insert
-                        "text": req.text,
-                        "start_char": req.start_char,
-                        "end_char": req.end_char,
-                        "document_id": req.document_id,
-                        "confidence": req.confidence if req.confidence is not None else 80,
-                        "created_at": assignment_data['created_at']
-                    },
-                    "code": {
-                        "id": code.id,
-                        "name": code.name,
-                        "description": code.description,
-                        "color": code.color,
-                        "project_id": code.project_id,
-                        "created_at": code.created_at,
-                        "is_auto_generated": is_auto_generated,
-                        "was_created": any(c['name'] == req.code_name and c['project_id'] == project_id for c in codes_to_create)
-                    },
-                    "assignment_status": "success",
-                    "message": f"Successfully assigned code '{code.name}' to text selection"
-                })
-
-            except Exception as e:
+            project_id = document_projects[req.document_id]
+            code = codes_lookup.get((project_id, req.code_name))
+            if not code:
                 errors.append({
                     'index': i,
                     'assignment': req.model_dump(),
-                    'error': str(e)
+                    'error': f"Code '{req.code_name}' not found for project {project_id}"
                 })
+                continue
+
+            assignment_rows.append({
+                'document_id': req.document_id,
+                'code_id': code.id,
+                'start_char': req.start_char,
+                'end_char': req.end_char,
+                'text_snapshot': req.text,
+                'confidence': req.confidence if req.confidence is not None else 80,
+                'created_by_id': user_id
+            })
+            assignment_indexes.append(i)
+
+        # Insert assignments, letting the unique key skip ones that already exist
+        outcomes = CodeAssignmentService.insert_assignments(db, assignment_rows)
+        db.commit()
+
+        # Load the stored rows of pre-existing duplicates so results reflect the database
+        existing_ids = [assignment_id for assignment_id, created in outcomes if not created]
+        existing_rows = {}
+        for batch_start in range(0, len(existing_ids), INSERT_BATCH_SIZE):
+            batch = existing_ids[batch_start:batch_start + INSERT_BATCH_SIZE]
+            for row in db.query(
+                CodeAssignmentModel.id, CodeAssignmentModel.text_snapshot,
+                CodeAssignmentModel.confidence, CodeAssignmentModel.created_at
+            ).filter(CodeAssignmentModel.id.in_(batch)).all():
+                existing_rows[row.id] = row
+
+        results = []
+        current_time = datetime.datetime.now(datetime.timezone.utc)
+        for i, row, (assignment_id, created) in zip(assignment_indexes, assignment_rows, outcomes):
+            req = requests[i]
+            code = codes_lookup[(document_projects[req.document_id], req.code_name)]
+            existing = existing_rows.get(assignment_id)
+
+            if created or existing is None:
+                assignment_out = {
+                    "id": assignment_id,
+                    "text": req.text,
+                    "start_char": req.start_char,
+                    "end_char": req.end_char,
+                    "document_id": req.document_id,
+                    "confidence": row['confidence'],
+                    "created_at": current_time
+                }
+            else:
+                assignment_out = {
+                    "id": assignment_id,
+                    "text": existing.text_snapshot,
+                    "start_char": req.start_char,
+                    "end_char": req.end_char,
+                    "document_id": req.document_id,
+                    "confidence": existing.confidence if existing.confidence is not None else 80,
+                    "created_at": existing.created_at
+                }
 
-        # Bulk create assignments
-        if assignments_to_create:
-            print(f"Creating {len(assignments_to_create)} assignments in bulk")
-            db.bulk_insert_mappings(
-                CodeAssignmentModel.__mapper__, assignments_to_create)
-            db.commit()
-
-            # Get the created assignments to fill in the IDs
-            created_assignments = db.query(CodeAssignmentModel).filter(
-                CodeAssignmentModel.document_id.in_(document_ids),
-                CodeAssignmentModel.created_by_id == user_id
-            ).order_by(CodeAssignmentModel.created_at.desc()).limit(len(assignments_to_create)).all()
-
-            # Update results with actual IDs (this is a simplification - in production you might want more robust ID matching)
-            assignment_idx = 0
-            for result in results:
-                if result["code_assignment"]["id"] is None and assignment_idx < len(created_assignments):
-                    result["code_assignment"]["id"] = created_assignments[assignment_idx].id
-                    assignment_idx += 1
+            results.append({
+                "code_assignment": assignment_out,
+                "code": {
+                    "id": code.id,
+                    "name": code.name,
+                    "description": code.description,
+                    "color": code.color,
+                    "project_id": code.project_id,
+                    "created_at": code.created_at,
+                    "is_auto_generated": is_auto_generated,
+                    "was_created": (code.project_id, code.name) in codes_to_create
+                },
+                "assignment_status": "success",
+                "message": f"Successfully assigned code '{code.name}' to text selection" if created
+                else f"Code '{code.name}' already assigned to this text selection"
+            })
 
         successful_assignments = len(
             [r for r in results if r["assignment_status"] == "success"])
 
         print(
-            f"Bulk assignment completed - {successful_assignments} successful, {codes_created_count} codes created, {len(errors)} errors")
+            f"Bulk assignment completed - {successful_assignments} successful, {len(codes_to_create)} codes created, {len(errors)} errors")
         return {
             "results": results,
             "summary": {
                 "total_requests": len(requests),
                 "successful_assignments": successful_assignments,
-                "codes_created": codes_created_count,
+                "codes_created": len(codes_to_create),
                 "errors": errors,
                 "total_errors": len(errors)
             }
         }
 
+    @staticmethod
+    def insert_assignments(
+        db: Session,
+        rows: List[Dict[str, Any]]
+    ) -> List[Tuple[int, bool]]:
+        """
+        Insert code assignment rows, skipping any whose unique key
+        (document, code, span, creator) already exists.
+
+        Returns one (assignment_id, created) pair per input row, in input order.
+        Repeated keys within rows map to the same id and only the first counts
+        as created. Does not commit.
+        """
+        if not rows:
+            return []
+
+        current_time = datetime.datetime.now(datetime.timezone.utc)
+        unique_rows: Dict[tuple, Dict[str, Any]] = {}
+        for row in rows:
+            key = tuple(row[column] for column in ASSIGNMENT_KEY_COLUMNS)
+            if key not in unique_rows:
+                unique_rows[key] = {
+                    'status': 'pending',
+                    'created_at': current_time,
+                    'updated_at': current_time,
+                    **row
+                }
+
+        key_columns = [getattr(CodeAssignmentModel, column)
+                       for column in ASSIGNMENT_KEY_COLUMNS]
+        dialect = db.get_bind().dialect.name
+        created_ids: Dict[tuple, int] = {}
+
+        table = CodeAssignmentModel.__table__
+        if dialect == "postgresql":
+            statement = postgresql_insert(table).on_conflict_do_nothing(
+                index_elements=list(ASSIGNMENT_KEY_COLUMNS))
+        elif dialect == "sqlite":
+            statement = sqlite_insert(table).on_conflict_do_nothing(
+                index_elements=list(ASSIGNMENT_KEY_COLUMNS))
+        else:
+            statement = insert(table)
+        statement = statement.returning(table.c.id, *key_columns)
+
+        pending = list(unique_rows.values())
+        for batch_start in range(0, len(pending), INSERT_BATCH_SIZE):
+            batch = pending[batch_start:batch_start + INSERT_BATCH_SIZE]
+            if dialect not in ("postgresql", "sqlite"):
+                # No portable ON CONFLICT: drop rows whose key is already stored
+                stored = CodeAssignmentService._lookup_assignment_ids(
+                    db, [tuple(row[column] for column in ASSIGNMENT_KEY_COLUMNS) for row in batch])
+                batch = [row for row in batch if tuple(
+                    row[column] for column in ASSIGNMENT_KEY_COLUMNS) not in stored]
+                if not batch:
+                    continue
+
+            # executemany form: SQLAlchemy batches it into multi-row
+            # INSERT ... RETURNING statements with a cached compilation
+            for row in db.execute(statement, batch):
+                created_ids[tuple(row[1:])] = row[0]
+
+        # Keys that hit the conflict target already existed
+        existing_ids = CodeAssignmentService._lookup_assignment_ids(
+            db, [key for key in unique_rows if key not in created_ids])
+
+        outcomes = []
+        seen = set()
+        for row in rows:
+            key = tuple(row[column] for column in ASSIGNMENT_KEY_COLUMNS)
+            if key in created_ids:
+                outcomes.append((created_ids[key], key not in seen))
+            else:
+                outcomes.append((existing_ids.get(key), False))
+            seen.add(key)
+        return outcomes  # type: ignore
+
+    @staticmethod
+    def _lookup_assignment_ids(db: Session, keys: List[tuple]) -> Dict[tuple, int]:
+        """Map unique assignment keys to the ids of the stored rows"""
+        key_columns = [getattr(CodeAssignmentModel, column)
+                       for column in ASSIGNMENT_KEY_COLUMNS]
+        found = {}
+        for batch_start in range(0, len(keys), INSERT_BATCH_SIZE):
+            batch = keys[batch_start:batch_start + INSERT_BATCH_SIZE]
+            for row in db.query(CodeAssignmentModel.id, *key_columns).filter(
+                    tuple_(*key_columns).in_(batch)).all():
+                found[tuple(row[1:])] = row[0]
+        return found
+
     @staticmethod
     def get_code_assignments_for_document(
         db: Session,
@@ -1,13 +1,18 @@
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, case, func, or_, tuple_
+from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 from fastapi import HTTPException
 
 from app.models.code_assignments import CodeAssignment as CodeAssignmentModel
 from app.models.codebook import Codebook
 from app.models.code import Code
+from app.models.document import Document
 from app.models.user import User
 from app.core.permissions import PermissionChecker
 
+REVIEW_STATUSES = ("pending", "accepted", "rejected")
+REVIEW_SORTS = ("id", "confidence_desc", "confidence_asc")
+
 
 class CodeReviewService:
     """Simplified service for AI code assignment review workflow"""
@@ -17,9 +22,24 @@ class CodeReviewService:
         db: Session,
         codebook_id: int,
         user_id: int,
-        status_filter: Optional[str] = None
+        status_filter: Optional[str] = None,
+        document_id: Optional[int] = None,
+        code_id: Optional[int] = None,
+        min_confidence: Optional[int] = None,
+        max_confidence: Optional[int] = None,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Get code assignments from an AI codebook with optional status filtering"""
+        """
+        Get the review queue of an AI codebook.
+
+        Filters are applied in the database and results are keyset-paginated:
+        pass the returned next_cursor back as cursor to get the following page.
+        sort is "id", "confidence_desc" or "confidence_asc"; assignments
+        without a confidence sort as if it were -1. Without a limit the whole
+        queue is returned.
+        """
 
         # Get user object
         user = db.query(User).filter(User.id == user_id).first()
@@ -38,40 +58,100 @@ class CodeReviewService:
             raise ValueError(
                 "AI-generated codebook not found or access denied")
 
-        # Get all assignments for codes in this codebook
-        query = db.query(CodeAssignmentModel).join(
+        if sort not in REVIEW_SORTS:
+            raise ValueError(
+                f"Invalid sort. Must be one of: {', '.join(REVIEW_SORTS)}")
+
+        # Project only the columns the review screen shows
+        confidence_key = func.coalesce(CodeAssignmentModel.confidence, -1)
+        query = db.query(
+            CodeAssignmentModel.id,
+            CodeAssignmentModel.text_snapshot,
+            CodeAssignmentModel.start_char,
+            CodeAssignmentModel.end_char,
+            CodeAssignmentModel.confidence,
+            CodeAssignmentModel.status,
+            CodeAssignmentModel.document_id,
+            CodeAssignmentModel.created_at,
+            Document.name.label("document_name"),
+            Code.id.label("code_id"),
+            Code.name.label("code_name"),
+            Code.description.label("code_description"),
+            Code.color.label("code_color")
+        ).join(
             Code, CodeAssignmentModel.code_id == Code.id
+        ).outerjoin(
+            Document, CodeAssignmentModel.document_id == Document.id
         ).filter(
             Code.codebook_id == codebook_id,
             CodeAssignmentModel.created_by_id == user_id  # Only user's own assignments
-        ).options(
-            selectinload(CodeAssignmentModel.code),
-            selectinload(CodeAssignmentModel.document)
         )
 
         # Apply status filter if provided
         if status_filter:
-            if status_filter not in ["pending", "accepted", "rejected"]:
+            if status_filter not in REVIEW_STATUSES:
                 raise ValueError(
                     "Invalid status filter. Must be 'pending', 'accepted', or 'rejected'")
             query = query.filter(CodeAssignmentModel.status == status_filter)
-
-        assignments = query.all()
-
-        # Group by status for summary
-        all_assignments = db.query(CodeAssignmentModel).join(
-            Code, CodeAssignmentModel.code_id == Code.id
-        ).filter(
-            Code.codebook_id == codebook_id,
-            CodeAssignmentModel.created_by_id == user_id
-        ).all()
-
-        status_counts = {
-            "pending": len([a for a in all_assignments if a.status == "pending"]), # type: ignore
-            "accepted": len([a for a in all_assignments if a.status == "accepted"]), # type: ignore
-            "rejected": len([a for a in all_assignments if a.status == "rejected"]) # type: ignore
-
-        }
+        if document_id is not None:
+            query = query.filter(CodeAssignmentModel.document_id == document_id)
+        if code_id is not None:
+            query = query.filter(CodeAssignmentModel.code_id == code_id)
+        if min_confidence is not None:
+            query = query.filter(CodeAssignmentModel.confidence >= min_confidence)
+        if max_confidence is not None:
+            query = query.filter(CodeAssignmentModel.confidence <= max_confidence)
+
+        filtered_total = query.with_entities(
+            func.count(CodeAssignmentModel.id)).scalar()
+
+        # Keyset pagination: continue strictly after the last row of the previous page
+        if cursor:
+            last_confidence, last_id = CodeReviewService._parse_cursor(
+                cursor, sort)
+            if sort == "id":
+                query = query.filter(CodeAssignmentModel.id > last_id)
+            elif sort == "confidence_desc":
+                query = query.filter(or_(
+                    confidence_key < last_confidence,
+                    and_(confidence_key == last_confidence,
+                         CodeAssignmentModel.id > last_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    confidence_key > last_confidence,
+                    and_(confidence_key == last_confidence,
+                         CodeAssignmentModel.id > last_id)
+                ))
+
+        if sort == "confidence_desc":
+            query = query.order_by(confidence_key.desc(), CodeAssignmentModel.id)
+        elif sort == "confidence_asc":
+            query = query.order_by(confidence_key, CodeAssignmentModel.id)
+        else:
+            query = query.order_by(CodeAssignmentModel.id)
+
+        if limit is not None:
+            # One extra row tells whether another page exists
+            rows = query.limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+        else:
+            rows = query.all()
+            has_more = False
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = str(last.id) if sort == "id" else \
+                f"{last.confidence if last.confidence is not None else -1}:{last.id}"
+
+        # Status counts come from one aggregate instead of reloading every assignment
+        counts = CodeReviewService._status_counts_query(db, user_id).filter(
+            Code.codebook_id == codebook_id
+        ).group_by(Code.codebook_id).first()
+        status_counts = {status: getattr(counts, status) if counts else 0
+                         for status in REVIEW_STATUSES}
 
         return {
             "codebook": {
@@ -83,30 +163,122 @@ class CodeReviewService:
             },
             "assignments": [
                 {
-                    "id": a.id,
-                    "text": a.text_snapshot,
-                    "start_char": a.start_char,
-                    "end_char": a.end_char,
-                    "confidence": a.confidence,
-                    "status": a.status,
-                    "document_id": a.document_id,
-                    "document_name": a.document.name if a.document else None,  # type: ignore
+                    "id": row.id,
+                    "text": row.text_snapshot,
+                    "start_char": row.start_char,
+                    "end_char": row.end_char,
+                    "confidence": row.confidence,
+                    "status": row.status,
+                    "document_id": row.document_id,
+                    "document_name": row.document_name,
                     "code": {
-                        "id": a.code.id,
-                        "name": a.code.name,
-                        "description": a.code.description,
-                        "color": a.code.color
+                        "id": row.code_id,
+                        "name": row.code_name,
+                        "description": row.code_description,
+                        "color": row.code_color
                     },
-                    "created_at": a.created_at
-                } for a in assignments
+                    "created_at": row.created_at
+                } for row in rows
             ],
             "summary": {
-                "total": len(all_assignments),
+                "total": counts.total if counts else 0,
                 **status_counts,
                 "review_complete": status_counts["pending"] == 0
+            },
+            "pagination": {
+                "sort": sort,
+                "limit": limit,
+                "filtered_total": filtered_total,
+                "next_cursor": next_cursor
             }
         }
 
+    @staticmethod
+    def _parse_cursor(cursor: str, sort: str):
+        """Split a review queue cursor into (confidence, id)"""
+        try:
+            if sort == "id":
+                return None, int(cursor)
+            confidence, assignment_id = cursor.split(":", 1)
+            return int(confidence), int(assignment_id)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def get_project_ai_codebook_summaries(
+        db: Session,
+        project_id: int,
+        user_id: int,
+        unfinalized_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Review progress of every AI codebook the user has in a project, from one query"""
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise ValueError("User not found")
+
+        project = PermissionChecker.check_project_access(
+            db, project_id, user, raise_exception=False)
+        if not project:
+            raise ValueError("Project not found or access denied")
+
+        counts = CodeReviewService._status_counts_query(db, user_id).filter(
+            Code.project_id == project_id
+        ).group_by(Code.codebook_id).subquery()
+
+        query = db.query(
+            Codebook.id,
+            Codebook.name,
+            Codebook.description,
+            Codebook.is_ai_generated,
+            Codebook.finalized,
+            Codebook.created_at,
+            *[func.coalesce(counts.c[column], 0).label(column)
+              for column in ("total", *REVIEW_STATUSES)]
+        ).outerjoin(
+            counts, counts.c.codebook_id == Codebook.id
+        ).filter(
+            Codebook.project_id == project_id,
+            Codebook.user_id == user_id,
+            Codebook.is_ai_generated == True
+        )
+        if unfinalized_only:
+            query = query.filter(Codebook.finalized == False)
+
+        return [
+            {
+                "id": row.id,
+                "name": row.name,
+                "description": row.description,
+                "is_ai_generated": row.is_ai_generated,
+                "finalized": row.finalized,
+                "created_at": row.created_at,
+                "assignment_summary": {
+                    "total": row.total,
+                    **{status: getattr(row, status) for status in REVIEW_STATUSES},
+                    "review_complete": row.pending == 0
+                }
+            }
+            for row in query.order_by(Codebook.created_at.desc(), Codebook.id.desc()).all()
+        ]
+
+    @staticmethod
+    def _status_counts_query(db: Session, user_id: int):
+        """
+        Per-codebook assignment counts by review status, using
+        COUNT(*) FILTER (WHERE status = ...); callers add filters and group_by
+        """
+        return db.query(
+            Code.codebook_id.label("codebook_id"),
+            func.count(CodeAssignmentModel.id).label("total"),
+            *[func.count(CodeAssignmentModel.id).filter(
+                CodeAssignmentModel.status == status).label(status)
+              for status in REVIEW_STATUSES]
+        ).join(
+            Code, CodeAssignmentModel.code_id == Code.id
+        ).filter(
+            CodeAssignmentModel.created_by_id == user_id  # Only user's own assignments
+        )
+
     @staticmethod
     def bulk_review_assignments(
         db: Session,
@@ -146,16 +318,18 @@ class CodeReviewService:
             results["rejected"] = rejected_result
 
         total_updated = 0
-        if results["accepted"]:
-            total_updated += results["accepted"]["updated_count"]
-        if results["rejected"]:
-            total_updated += results["rejected"]["updated_count"]
+        not_found_ids: List[int] = []
+        for result in results.values():
+            if result:
+                total_updated += result["updated_count"]
+                not_found_ids.extend(result["not_found_ids"])
 
         return {
             "total_updated": total_updated,
             "accepted_count": len(accepted_assignment_ids),
             "rejected_count": len(rejected_assignment_ids),
             "codes_moved_to_default": total_codes_moved,
+            "not_found_ids": not_found_ids,
             "details": results,
             "workflow_note": "Accepted codes automatically moved to your default codebook!"
         }
@@ -173,10 +347,13 @@ class CodeReviewService:
         - Accept assignment → Code moves to user's default codebook automatically
         - Reject assignment → Code stays in AI session codebook (ignored)
 
-        This eliminates the need for manual merging steps!
+        Works set-based: one UPDATE for statuses, one lookup for name collisions
+        in the default codebooks and bulk UPDATEs for code moves and re-pointing.
+        IDs that do not exist or belong to someone else are reported per ID
+        instead of failing the whole batch.
         """
 
-        if status not in ["pending", "accepted", "rejected"]:
+        if status not in REVIEW_STATUSES:
             raise ValueError(
                 "Invalid status. Must be 'pending', 'accepted', or 'rejected'")
 
@@ -185,76 +362,174 @@ class CodeReviewService:
         if not user:
             raise ValueError("User not found")
 
-        # Get assignments with codes and codebooks
-        assignments = db.query(CodeAssignmentModel).options(
-            selectinload(CodeAssignmentModel.code).selectinload(Code.codebook)
-        ).filter(
-            CodeAssignmentModel.id.in_(assignment_ids),
-            CodeAssignmentModel.created_by_id == user_id
-        ).all()
-
-        if len(assignments) != len(assignment_ids):
-            found_ids = [a.id for a in assignments]
-            missing_ids = [
-                aid for aid in assignment_ids if aid not in found_ids]
-            raise ValueError(
-                f"Assignments not found or access denied: {missing_ids}")
-
-        # Track code movements for response
+        requested_ids = list(dict.fromkeys(assignment_ids))
+
+        # Load only the columns needed to decide each assignment's outcome
+        rows = []
+        for batch in _chunks(requested_ids):
+            rows.extend(db.query(
+                CodeAssignmentModel.id,
+                CodeAssignmentModel.code_id,
+                CodeAssignmentModel.document_id,
+                CodeAssignmentModel.start_char,
+                CodeAssignmentModel.end_char,
+                Code.name.label("code_name"),
+                Code.project_id,
+                Codebook.name.label("codebook_name"),
+                Codebook.is_ai_generated,
+                Codebook.finalized
+            ).join(
+                Code, CodeAssignmentModel.code_id == Code.id
+            ).join(
+                Codebook, Code.codebook_id == Codebook.id
+            ).filter(
+                CodeAssignmentModel.id.in_(batch),
+                CodeAssignmentModel.created_by_id == user_id
+            ).all())
+
+        rows_by_id = {row.id: row for row in rows}
+        found_ids = [aid for aid in requested_ids if aid in rows_by_id]
+
+        # One UPDATE per batch for all statuses
+        for batch in _chunks(found_ids):
+            db.query(CodeAssignmentModel).filter(
+                CodeAssignmentModel.id.in_(batch)
+            ).update({CodeAssignmentModel.status: status}, synchronize_session=False)
+
+        final_code_ids = {row.id: row.code_id for row in rows}
+        code_actions: Dict[int, str] = {}
+        duplicates: Dict[int, int] = {}
         codes_moved_to_default = []
-        default_codebook = None
-
-        # Update status and handle automatic code movement
-        for assignment in assignments:
-            # Update assignment status
-            setattr(assignment, 'status', status)
-
-            # AUTO-MANAGE CODES: Move accepted codes to default codebook
-            if status == "accepted":
-                code = assignment.code
-                current_codebook = code.codebook
-
-                # Only move codes from AI session codebooks to avoid confusion
-                if current_codebook.is_ai_generated and not current_codebook.finalized:
-                    # Get or create user's default codebook (lazy loading)
-                    if not default_codebook:
-                        from app.services.codebook_service import CodebookService
-                        default_codebook = CodebookService.get_or_create_default_codebook(
-                            db=db,
-                            user_id=user_id,
-                            project_id=current_codebook.project_id
-                        )
-
-                    # Check if code with same name already exists in default codebook
-                    existing_code = db.query(Code).filter(
-                        Code.name == code.name,
-                        Code.codebook_id == default_codebook.id
-                    ).first()
-
-                    if not existing_code:
-                        # Move code to default codebook
-                        code.codebook_id = default_codebook.id
-                        codes_moved_to_default.append({
-                            "code_id": code.id,
-                            "code_name": code.name,
-                            "from_codebook": current_codebook.name,
-                            "to_codebook": default_codebook.name
-                        })
+        default_codebooks: Dict[int, Codebook] = {}
+
+        # AUTO-MANAGE CODES: Move accepted codes from AI session codebooks to default codebooks
+        candidates = {}
+        if status == "accepted":
+            for row in rows:
+                if row.is_ai_generated and not row.finalized:
+                    candidates.setdefault(row.code_id, row)
+
+        if candidates:
+            from app.services.codebook_service import CodebookService
+            for project_id in sorted({row.project_id for row in candidates.values()}):
+                default_codebooks[project_id] = CodebookService.get_or_create_default_codebook(
+                    db=db, user_id=user_id, project_id=project_id)
+            default_ids = {cb.id: project_id for project_id,
+                           cb in default_codebooks.items()}
+
+            # One query finds every name already taken in the default codebooks
+            taken = {}
+            for code in db.query(Code.id, Code.name, Code.codebook_id).filter(
+                Code.codebook_id.in_(default_ids.keys()),
+                Code.name.in_({row.code_name for row in candidates.values()})
+            ).order_by(Code.id).all():
+                taken.setdefault((default_ids[code.codebook_id], code.name), code.id)
+
+            # The lowest-id code of each free name moves; same-named codes merge into it
+            code_targets: Dict[int, int] = {}
+            moves: Dict[int, List[int]] = {}
+            for code_id in sorted(candidates):
+                row = candidates[code_id]
+                key = (row.project_id, row.code_name)
+                if key in taken:
+                    code_targets[code_id] = taken[key]
+                    code_actions[code_id] = "merged"
+                else:
+                    taken[key] = code_id
+                    default_codebook = default_codebooks[row.project_id]
+                    moves.setdefault(default_codebook.id, []).append(code_id)  # type: ignore
+                    code_actions[code_id] = "moved"
+                    codes_moved_to_default.append({
+                        "code_id": code_id,
+                        "code_name": row.code_name,
+                        "from_codebook": row.codebook_name,
+                        "to_codebook": default_codebook.name
+                    })
+
+            for codebook_id, code_ids in moves.items():
+                for batch in _chunks(code_ids):
+                    db.query(Code).filter(Code.id.in_(batch)).update(
+                        {Code.codebook_id: codebook_id}, synchronize_session=False)
+
+            if code_targets:
+                repoint = [rows_by_id[aid] for aid in found_ids
+                           if rows_by_id[aid].code_id in code_targets]
+
+                # Re-pointing must not duplicate a span the target code already has
+                existing_spans = {}
+                span_keys = [(row.document_id, code_targets[row.code_id], row.start_char,
+                              row.end_char) for row in repoint]
+                for batch in _chunks(span_keys):
+                    for existing in db.query(
+                        CodeAssignmentModel.id, CodeAssignmentModel.document_id,
+                        CodeAssignmentModel.code_id, CodeAssignmentModel.start_char,
+                        CodeAssignmentModel.end_char
+                    ).filter(
+                        CodeAssignmentModel.created_by_id == user_id,
+                        tuple_(CodeAssignmentModel.document_id, CodeAssignmentModel.code_id,
+                               CodeAssignmentModel.start_char, CodeAssignmentModel.end_char).in_(batch)
+                    ).all():
+                        existing_spans[tuple(existing[1:])] = existing.id
+
+                movable = []
+                for row, span in zip(repoint, span_keys):
+                    if span in existing_spans:
+                        duplicates[row.id] = existing_spans[span]
                     else:
-                        # Code already exists, just update the assignment to point to existing code
-                        assignment.code_id = existing_code.id
+                        existing_spans[span] = row.id
+                        movable.append(row.id)
+                        final_code_ids[row.id] = code_targets[row.code_id]
+
+                for batch in _chunks(movable):
+                    db.query(CodeAssignmentModel).filter(
+                        CodeAssignmentModel.id.in_(batch)
+                    ).update({
+                        CodeAssignmentModel.code_id: case(
+                            code_targets, value=CodeAssignmentModel.code_id)
+                    }, synchronize_session=False)
 
         db.commit()
 
+        outcomes = []
+        for aid in requested_ids:
+            row = rows_by_id.get(aid)
+            if row is None:
+                outcomes.append({"assignment_id": aid, "outcome": "not_found"})
+                continue
+            outcome = {
+                "assignment_id": aid,
+                "outcome": "updated",
+                "code_id": final_code_ids[aid],
+                "code_action": code_actions.get(row.code_id, "unchanged")
+            }
+            if aid in duplicates:
+                # Target code already covers this span; the assignment keeps its AI code
+                outcome["code_action"] = "duplicate"
+                outcome["code_id"] = row.code_id
+                outcome["duplicate_of"] = duplicates[aid]
+            outcomes.append(outcome)
+
+        not_found_ids = [aid for aid in requested_ids if aid not in rows_by_id]
+        default_codebook = next(iter(default_codebooks.values()), None)
+
         return {
-            "updated_count": len(assignments),
+            "updated_count": len(found_ids),
             "status": status,
             "assignment_ids": assignment_ids,
+            "not_found_ids": not_found_ids,
+            "outcomes": outcomes,
             "codes_moved_to_default": codes_moved_to_default,
             "default_codebook": {
-                "id": default_codebook.id if default_codebook else None,
-                "name": default_codebook.name if default_codebook else None
+                "id": default_codebook.id,
+                "name": default_codebook.name
             } if default_codebook else None,
-            "message": f"Successfully updated {len(assignments)} assignments to '{status}'" +
-            (f" and moved {len(codes_moved_to_default)} codes to default codebook" if codes_moved_to_default else "")
+            "message": f"Successfully updated {len(found_ids)} assignments to '{status}'" +
+            (f" and moved {len(codes_moved_to_default)} codes to default codebook" if codes_moved_to_default else "") +
+            (f"; {len(not_found_ids)} not found or access denied" if not_found_ids else "")
         }
+
+
+def _chunks(values: List[Any], size: int = 1000):
+    """Split values into IN-list sized batches"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import datetime
 
 from app.core.permissions import PermissionChecker
@@ -98,6 +98,75 @@ class CodeService:
 
         return db_code
 
+    @staticmethod
+    def create_codes_bulk(
+        db: Session,
+        project_id: int,
+        created_by_id: int,
+        codes: List[Dict[str, Any]],
+        codebook_id: Optional[int] = None
+    ) -> Dict[str, Code]:
+        """
+        Create many codes with one permission check and one flush.
+
+        Each item takes the fields of create_code (name, description, color,
+        group_name, is_auto_generated). Names already used in the project map
+        to the existing code instead of failing. Without codebook_id new codes
+        go to the creator's default codebook, resolved once for the whole flush.
+        The caller commits. Returns {name: code} for every requested name.
+        """
+        user = db.query(User).filter(User.id == created_by_id).first()
+        if not user:
+            raise ValueError("User not found")
+
+        project = PermissionChecker.check_project_access(
+            db, project_id, user, raise_exception=False
+        )
+        if not project:
+            raise ValueError("Project not found or access denied")
+
+        if codebook_id:
+            codebook = db.query(Codebook).filter(
+                Codebook.id == codebook_id,
+                Codebook.project_id == project_id
+            ).first()
+            if not codebook:
+                raise ValueError(
+                    "Specified codebook not found in this project")
+
+        requested = {}
+        for code_data in codes:
+            requested.setdefault(code_data["name"], code_data)
+        if not requested:
+            return {}
+
+        result: Dict[str, Code] = {
+            code.name: code for code in db.query(Code).filter(
+                Code.project_id == project_id,
+                Code.name.in_(requested.keys())
+            ).order_by(Code.id.desc())
+        }
+
+        new_codes = [Code(
+            name=name,
+            description=code_data.get("description"),
+            color=code_data.get("color") or "#3B82F6",
+            group_name=code_data.get("group_name"),
+            is_auto_generated=code_data.get("is_auto_generated", False),
+            project_id=project_id,
+            created_by_id=created_by_id,
+            codebook_id=codebook_id
+        ) for name, code_data in requested.items() if name not in result]
+
+        db.add_all(new_codes)
+        db.flush()
+        print(
+            f"DEBUG: Bulk created {len(new_codes)} codes in project {project_id}, "
+            f"{len(requested) - len(new_codes)} already existed")
+
+        result.update((code.name, code) for code in new_codes)
+        return result
+
     @staticmethod
     def update_code(
         db: Session,
@@ -1,12 +1,19 @@
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 import datetime
 
 from app.core.permissions import PermissionChecker
-from app.models.codebook import Codebook
-from app.models.code import Code
+from app.db.routing import read_only
+from app.models.codebook import Codebook, CodebookSequence
+from app.models.code import Code, DEFAULT_CODEBOOK_CACHE
 from app.models.user import User
 
+# Names taken outside the counter (e.g. before it existed) are skipped this often
+AI_SESSION_NAME_ATTEMPTS = 5
+
 
 class CodebookService:
     """Service for codebook management and operations"""
@@ -216,14 +223,23 @@ class CodebookService:
         user_id: int,
         project_id: int
     ) -> Codebook:
-        """Get or create the default codebook for a user in a project"""
+        """Get or create the default codebook for a user in a project
+
+        A new codebook is only flushed, so it commits or rolls back with the
+        caller's transaction. The result shares the per-transaction cache used
+        when new codes are flushed without a codebook.
+        """
+        cache = db.info.setdefault(DEFAULT_CODEBOOK_CACHE, {})
+        default_codebook = cache.get((user_id, project_id))
+        if default_codebook is not None:
+            return default_codebook
 
         # Try to get existing default codebook
         default_codebook = db.query(Codebook).filter(
             Codebook.user_id == user_id,
             Codebook.project_id == project_id,
             Codebook.is_ai_generated == False
-        ).first()
+        ).order_by(Codebook.id).first()
 
         if not default_codebook:
             # Create default codebook
@@ -235,9 +251,9 @@ class CodebookService:
                 description="Default codebook for user-created codes."
             )
             db.add(default_codebook)
-            db.commit()
-            db.refresh(default_codebook)
+            db.flush()
 
+        cache[(user_id, project_id)] = default_codebook
         return default_codebook
 
     @staticmethod
@@ -313,9 +329,16 @@ class CodebookService:
         db: Session,
         user_id: int,
         project_id: int,
-        session_type: str = "AI_generated"
+        session_type: str = "AI_generated",
+        reuse_latest: bool = False
     ) -> Codebook:
-        """Create a new AI session codebook with incremental naming (AI_generated_1, AI_generated_2, etc.)"""
+        """Create a new AI session codebook with incremental naming (AI_generated_1, AI_generated_2, etc.)
+
+        Numbers come from an atomically incremented counter row, so concurrent
+        AI runs never pick the same name. Numbers are not reused after deletes.
+        With reuse_latest the newest unfinalized codebook of the session type is
+        returned instead, if there is one.
+        """
 
         # Get user object
         user = db.query(User).filter(User.id == user_id).first()
@@ -329,47 +352,65 @@ class CodebookService:
         if not project:
             raise ValueError("Project not found or access denied")
 
-        # Find the next available number for AI session codebooks
-        existing_ai_codebooks = db.query(Codebook).filter(
-            Codebook.user_id == user_id,
-            Codebook.project_id == project_id,
-            Codebook.is_ai_generated == True,
-            Codebook.name.like(f"{session_type}_%")
-        ).all()
-
-        # Extract numbers from existing codebooks and find the next available
-        used_numbers = set()
-        for codebook in existing_ai_codebooks:
+        if reuse_latest:
+            name_pattern = session_type.replace("_", "\\_") + "\\_%"
+            latest = db.query(Codebook).filter(
+                Codebook.user_id == user_id,
+                Codebook.project_id == project_id,
+                Codebook.is_ai_generated == True,
+                Codebook.finalized == False,
+                Codebook.name.like(name_pattern, escape="\\")
+            ).order_by(Codebook.id.desc()).first()
+            if latest:
+                return latest
+
+        # Names come from a per-(user, project, session_type) counter; the
+        # unique index on AI session names catches anything the counter missed
+        for _ in range(AI_SESSION_NAME_ATTEMPTS):
+            next_number = CodebookService._next_session_number(
+                db, user_id, project_id, session_type)
+            ai_codebook = Codebook(
+                name=f"{session_type}_{next_number}",
+                user_id=user_id,
+                project_id=project_id,
+                is_ai_generated=True,
+                description=f"Codebook for {session_type.replace('_', ' ').lower()} codes - Session {next_number}"
+            )
             try:
-                # Extract number from names like "AI_generated_1", "AI_generated_2"
-                parts = codebook.name.split('_')
-                if len(parts) >= 3 and parts[-1].isdigit():
-                    used_numbers.add(int(parts[-1]))
-            except (ValueError, IndexError):
+                with db.begin_nested():
+                    db.add(ai_codebook)
+            except IntegrityError:
                 continue
 
-        # Find the next available number
-        next_number = 1
-        while next_number in used_numbers:
-            next_number += 1
+            db.commit()
+            db.refresh(ai_codebook)
+            return ai_codebook
 
-        # Create new AI session codebook
-        ai_codebook_name = f"{session_type}_{next_number}"
-        ai_codebook = Codebook(
-            name=ai_codebook_name,
-            user_id=user_id,
-            project_id=project_id,
-            is_ai_generated=True,
-            description=f"Codebook for {session_type.replace('_', ' ').lower()} codes - Session {next_number}"
-        )
+        raise ValueError("Could not allocate an AI session codebook name")
 
-        db.add(ai_codebook)
-        db.commit()
-        db.refresh(ai_codebook)
+    @staticmethod
+    def _next_session_number(db: Session, user_id: int, project_id: int, session_type: str) -> int:
+        """Atomically increment and return the session counter in one upsert"""
+        table = CodebookSequence.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            statement = postgresql_insert(table)
+        elif dialect == "sqlite":
+            statement = sqlite_insert(table)
+        else:
+            raise ValueError(f"AI session numbering is not supported on {dialect}")
 
-        return ai_codebook
+        statement = statement.values(
+            user_id=user_id, project_id=project_id, session_type=session_type, last_value=1
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "project_id", "session_type"],
+            set_={"last_value": table.c.last_value + 1}
+        ).returning(table.c.last_value)
+        return db.execute(statement).scalar_one()
 
     @staticmethod
+    @read_only
     def get_project_finalized_codebooks(
         db: Session,
         project_id: int,
@@ -10,9 +10,11 @@ This module provides comprehensive document management services including:
 from .upload import DocumentUploadService
 from .retrieval import DocumentRetrievalService
 from .management import DocumentManagementService
+from .search import DocumentSearchService
 
 __all__ = [
     'DocumentUploadService',
     'DocumentRetrievalService',
-    'DocumentManagementService'
+    'DocumentManagementService',
+    'DocumentSearchService'
 ]
@@ -5,8 +5,11 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.core.permissions import PermissionChecker
+from app.db.routing import read_only
 from app.models.document import Document, DocumentType
 from app.models.user import User
+from app.schemas.document import DocumentSearchResponse
+from .search import DocumentSearchService
 
 
 class DocumentRetrievalService:
@@ -41,37 +44,23 @@ class DocumentRetrievalService:
         return query.order_by(Document.created_at.desc()).all()
 
     @staticmethod
+    @read_only
     def search_documents(
         db: Session,
         project_id: int,
         user_id: int,
         search_text: str,
-        document_type: Optional[DocumentType] = None
-    ) -> List[Document]:
-        """Search documents by content"""
-
-        # Get user object
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            return []
-
-        # Check user access to project
-        project = PermissionChecker.check_project_access(
-            db, project_id, user, raise_exception=False
-        )
-        if not project:
-            return []
-
-        query = db.query(Document).filter(
-            Document.project_id == project_id,
-            Document.content.ilike(f"%{search_text}%")
+        document_type: Optional[DocumentType] = None,
+        mode: str = "words",
+        skip: int = 0,
+        limit: int = 20
+    ) -> DocumentSearchResponse:
+        """Search documents by content, ranked by relevance with hit offsets"""
+        return DocumentSearchService.search(
+            db, project_id, user_id, search_text, document_type,
+            mode=mode, skip=skip, limit=limit
         )
 
-        if document_type:
-            query = query.filter(Document.document_type == document_type)
-
-        return query.order_by(Document.created_at.desc()).all()
-
     @staticmethod
     def get_documents_by_ids(
         db: Session,
@@ -0,0 +1,263 @@
+"""
+Document full-text search service
+"""
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal, literal_column
+from sqlalchemy.orm import Session
+
+from app.core.permissions import PermissionChecker
+from app.models.document import Document, DocumentType
+from app.models.user import User
+from app.schemas.document import DocumentSearchHit, DocumentSearchResponse, DocumentSearchResult
+from app.utils.search_index import (
+    HEADLINE_OPTIONS, InvertedIndex, find_term_positions, make_snippet, marked_positions, query_terms,
+    substring_positions)
+
+# Must stay identical to the expression of ix_documents_content_fts so Postgres uses the GIN index
+SEARCH_CONFIG = literal_column("'english'")
+
+
+class DocumentSearchService:
+    """
+    Ranked, paginated search over document content.
+
+    Postgres answers word queries from the tsvector GIN index and substring
+    queries from the pg_trgm index. Other databases (SQLite in tests) fall back
+    to an in-process inverted index per project, kept in sync with the
+    documents table on every search. Word hits come from the same stemmer
+    that matched the document: ts_headline on Postgres, the index's own
+    tokenizer otherwise.
+    """
+
+    _project_indexes: Dict[int, InvertedIndex] = {}
+    _project_signatures: Dict[int, Dict[int, Tuple]] = {}
+    _registry_lock = threading.Lock()
+
+    @staticmethod
+    def search(
+        db: Session,
+        project_id: int,
+        user_id: int,
+        search_text: str,
+        document_type: Optional[DocumentType] = None,
+        mode: str = "words",
+        skip: int = 0,
+        limit: int = 20,
+        max_hits_per_document: int = 20
+    ) -> DocumentSearchResponse:
+        """Search documents of a project, returning ranked results with hit offsets"""
+        response = DocumentSearchResponse(
+            query=search_text, mode=mode, total=0, skip=skip, limit=limit)  # type: ignore
+
+        # Get user object
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return response
+
+        # Check user access to project
+        project = PermissionChecker.check_project_access(
+            db, project_id, user, raise_exception=False
+        )
+        if not project or not search_text.strip():
+            return response
+
+        if mode == "substring":
+            ranked, total = DocumentSearchService._rank_substring(
+                db, project_id, search_text, document_type, skip, limit)
+        elif db.get_bind().dialect.name == "postgresql":
+            ranked, total = DocumentSearchService._rank_postgres(
+                db, project_id, search_text, document_type, skip, limit)
+        else:
+            ranked, total = DocumentSearchService._rank_in_process(
+                db, project_id, search_text, document_type, skip, limit)
+
+        response.total = total
+        if not ranked:
+            return response
+
+        documents = {
+            row.id: row for row in db.query(
+                Document.id, Document.name, Document.document_type, Document.content
+            ).filter(Document.id.in_([doc_id for doc_id, _ in ranked])).all()
+        }
+
+        terms = query_terms(search_text)
+        headline_positions = {}
+        if mode != "substring" and db.get_bind().dialect.name == "postgresql":
+            headline_positions = DocumentSearchService._headline_positions(
+                db, [doc_id for doc_id, _ in ranked], search_text)
+        for doc_id, score in ranked:
+            document = documents.get(doc_id)
+            if document is None:
+                continue
+
+            content = document.content or ""
+            if mode == "substring":
+                positions = [
+                    (match.start(), match.end()) for match in
+                    re.finditer(re.escape(search_text), content, re.IGNORECASE)
+                ]
+            else:
+                positions = headline_positions.get(doc_id) or find_term_positions(content, terms)
+                if not positions:
+                    # Matched by a stemmer the offsets disagree with; show where the terms occur
+                    positions = substring_positions(content, terms)
+
+            response.results.append(DocumentSearchResult(
+                document_id=document.id,
+                name=document.name,
+                document_type=document.document_type,
+                score=float(score or 0),
+                hit_count=len(positions),
+                hits=[
+                    DocumentSearchHit(
+                        start_char=start,
+                        end_char=end,
+                        snippet=make_snippet(content, start, end)
+                    ) for start, end in positions[:max_hits_per_document]
+                ]
+            ))
+
+        return response
+
+    @staticmethod
+    def _rank_postgres(
+        db: Session,
+        project_id: int,
+        search_text: str,
+        document_type: Optional[DocumentType],
+        skip: int,
+        limit: int
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """Rank with ts_rank_cd against the expression GIN index"""
+        document_vector = func.to_tsvector(
+            SEARCH_CONFIG, func.coalesce(Document.content, ""))
+        search_query = func.websearch_to_tsquery(SEARCH_CONFIG, search_text)
+        score = func.ts_rank_cd(document_vector, search_query)
+
+        query = db.query(Document.id, score.label("score")).filter(
+            Document.project_id == project_id,
+            document_vector.op("@@")(search_query)
+        )
+        if document_type:
+            query = query.filter(Document.document_type == document_type)
+
+        total = query.count()
+        rows = query.order_by(score.desc(), Document.id).offset(
+            skip).limit(limit).all()
+        return [(row.id, row.score) for row in rows], total
+
+    @staticmethod
+    def _headline_positions(db: Session, document_ids: List[int], search_text: str) -> Dict[int, List[Tuple[int, int]]]:
+        """Offsets of the words Postgres matched, read from a fully highlighted ts_headline"""
+        headline = func.ts_headline(
+            SEARCH_CONFIG,
+            func.coalesce(Document.content, ""),
+            func.websearch_to_tsquery(SEARCH_CONFIG, search_text),
+            literal(HEADLINE_OPTIONS)
+        )
+        positions = {}
+        for doc_id, content, marked in db.query(Document.id, Document.content, headline).filter(
+                Document.id.in_(document_ids)).all():
+            found = marked_positions(marked or "", content or "")
+            if found is not None:
+                positions[doc_id] = found
+        return positions
+
+    @staticmethod
+    def _rank_substring(
+        db: Session,
+        project_id: int,
+        search_text: str,
+        document_type: Optional[DocumentType],
+        skip: int,
+        limit: int
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """Rank case-insensitive substring matches by number of occurrences"""
+        escaped = search_text.replace("\\", "\\\\").replace(
+            "%", "\\%").replace("_", "\\_")
+        needle = search_text.lower()
+        lowered_content = func.lower(Document.content)
+        occurrences = (
+            func.length(lowered_content) -
+            func.length(func.replace(lowered_content, needle, ""))
+        ) / len(needle)
+
+        query = db.query(Document.id, occurrences.label("score")).filter(
+            Document.project_id == project_id,
+            Document.content.ilike(f"%{escaped}%", escape="\\")
+        )
+        if document_type:
+            query = query.filter(Document.document_type == document_type)
+
+        total = query.count()
+        rows = query.order_by(occurrences.desc(), Document.id).offset(
+            skip).limit(limit).all()
+        return [(row.id, row.score) for row in rows], total
+
+    @staticmethod
+    def _rank_in_process(
+        db: Session,
+        project_id: int,
+        search_text: str,
+        document_type: Optional[DocumentType],
+        skip: int,
+        limit: int
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """Rank with the in-process BM25 index for databases without native FTS"""
+        index, document_types = DocumentSearchService._sync_project_index(
+            db, project_id)
+
+        ranked = index.search(query_terms(search_text))
+        if document_type:
+            ranked = [(doc_id, score) for doc_id, score in ranked
+                      if document_types.get(doc_id) == document_type]
+
+        return ranked[skip:skip + limit], len(ranked)
+
+    @staticmethod
+    def invalidate(project_id: Optional[int] = None) -> None:
+        """Drop the in-process index of one project, or of every project"""
+        with DocumentSearchService._registry_lock:
+            if project_id is None:
+                DocumentSearchService._project_indexes.clear()
+                DocumentSearchService._project_signatures.clear()
+            else:
+                DocumentSearchService._project_indexes.pop(project_id, None)
+                DocumentSearchService._project_signatures.pop(project_id, None)
+
+    @staticmethod
+    def _sync_project_index(db: Session, project_id: int) -> Tuple[InvertedIndex, Dict[int, DocumentType]]:
+        """Bring the project's index up to date, re-indexing only added or changed documents"""
+        rows = db.query(
+            Document.id,
+            Document.file_hash,
+            func.length(Document.content),
+            Document.document_type
+        ).filter(Document.project_id == project_id).all()
+
+        with DocumentSearchService._registry_lock:
+            index = DocumentSearchService._project_indexes.setdefault(
+                project_id, InvertedIndex())
+            signatures = DocumentSearchService._project_signatures.setdefault(
+                project_id, {})
+
+        current = {row[0]: (row[1], row[2]) for row in rows}
+        with index.lock:
+            for doc_id in [doc_id for doc_id in signatures if doc_id not in current]:
+                index.remove(doc_id)
+                del signatures[doc_id]
+
+            changed = [doc_id for doc_id, signature in current.items()
+                       if signatures.get(doc_id) != signature]
+            for batch_start in range(0, len(changed), 500):
+                batch = changed[batch_start:batch_start + 500]
+                for doc_id, content in db.query(Document.id, Document.content).filter(
+                        Document.id.in_(batch)).all():
+                    index.add(doc_id, content or "")
+                    signatures[doc_id] = current[doc_id]
+
+        return index, {row[0]: row[3] for row in rows}
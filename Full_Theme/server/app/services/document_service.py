@@ -2,7 +2,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.models.document import Document, DocumentType
-from app.schemas.document import DocumentUpload
+from app.schemas.document import DocumentUpload, DocumentSearchResponse
 from .document.upload import DocumentUploadService
 from .document.retrieval import DocumentRetrievalService
 from .document.management import DocumentManagementService
@@ -61,8 +61,12 @@ class DocumentService:
         project_id: int,
         user_id: int,
         search_text: str,
-        document_type: Optional[DocumentType] = None
-    ) -> List[Document]:
+        document_type: Optional[DocumentType] = None,
+        mode: str = "words",
+        skip: int = 0,
+        limit: int = 20
+    ) -> DocumentSearchResponse:
         return DocumentRetrievalService.search_documents(
-            db, project_id, user_id, search_text, document_type
+            db, project_id, user_id, search_text, document_type,
+            mode=mode, skip=skip, limit=limit
         )
\ No newline at end of file
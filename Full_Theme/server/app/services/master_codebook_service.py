@@ -1,8 +1,19 @@
-from sqlalchemy.orm import Session
-from typing import Dict, List
+from sqlalchemy import and_, false, func, insert, literal, or_, select
+from sqlalchemy.orm import Session, aliased
+from typing import Dict, List, Optional
 from app.models.codebook import Codebook
 from app.models.code import Code
+from app.models.code_assignments import CodeAssignment
+from app.models.user import User
 from app.core.permissions import PermissionChecker
+from app.utils.similarity import (
+    MinHasher, connected_groups, estimated_similarity, lsh_candidate_pairs, normalize_text
+)
+
+NAME_CONFLICT_MODES = ("merge", "first")
+CONFLICT_SIMILARITY_THRESHOLD = 0.5
+# Share of the name in the score when both codes have a description
+CONFLICT_NAME_WEIGHT = 0.7
 
 
 class MasterCodebookService:
@@ -14,15 +25,25 @@ class MasterCodebookService:
         project_id: int,
         owner_id: int,
         selected_codes: Dict[int, List[int]],  # {codebook_id: [code_ids]}
-        master_name: str = "Master Codebook"
+        master_name: str = "Master Codebook",
+        include_assignments: bool = False,
+        on_name_conflict: str = "merge"
     ) -> Codebook:
         """
         Create a master codebook by selecting codes from multiple collaborator codebooks.
         Only project owners can call this.
+
+        Codes (and optionally their assignments) are copied with one
+        INSERT ... SELECT per table. Selected codes sharing a name (ignoring case
+        and surrounding whitespace) become a single master code; with
+        on_name_conflict="merge" the assignments of all of them are copied onto
+        it, with "first" only those of the lowest-id code.
         """
+        if on_name_conflict not in NAME_CONFLICT_MODES:
+            raise ValueError("Invalid on_name_conflict. Must be 'merge' or 'first'")
 
         # Verify owner permissions
-        user = db.query(User).filter(User.id == owner_id).first() # type: ignore
+        user = db.query(User).filter(User.id == owner_id).first()
         project = PermissionChecker.check_project_access(db, project_id, user) # type: ignore
         if not project or project.owner_id != owner_id: # type: ignore
             raise ValueError("Only project owners can create master codebooks")
@@ -39,76 +60,198 @@ class MasterCodebookService:
         db.add(master_codebook)
         db.flush()
 
-        # Copy selected codes to master codebook
-        total_codes_copied = 0
-        for codebook_id, code_ids in selected_codes.items():
-            codes_to_copy = db.query(Code).filter(
-                Code.id.in_(code_ids),
-                Code.codebook_id == codebook_id
-            ).all()
-
-            for original_code in codes_to_copy:
-                # Create copy in master codebook
-                new_code = Code(
-                    name=original_code.name,
-                    description=original_code.description,
-                    color=original_code.color,
-                    project_id=project_id,
-                    codebook_id=master_codebook.id,
-                    created_by_id=owner_id,
-                    is_auto_generated=False
+        # Selected codes of this project, ranked within each name
+        source = aliased(Code)
+        ranked = select(
+            source.id,
+            source.name,
+            source.definition,
+            source.description,
+            source.color,
+            source.group_name,
+            func.row_number().over(
+                partition_by=_name_key(source), order_by=source.id).label("name_rank"),
+            # Name of the code that is copied for this name
+            func.first_value(source.name).over(
+                partition_by=_name_key(source), order_by=source.id).label("master_name")
+        ).join(
+            Codebook, source.codebook_id == Codebook.id
+        ).where(
+            _selected(source, selected_codes),
+            Codebook.project_id == project_id
+        ).subquery()
+
+        # Copy selected codes to master codebook, one per name
+        codes_result = db.execute(insert(Code.__table__).from_select(
+            ["name", "definition", "description", "color", "group_name",
+             "project_id", "codebook_id", "created_by_id", "is_auto_generated"],
+            select(
+                ranked.c.name,
+                ranked.c.definition,
+                ranked.c.description,
+                ranked.c.color,
+                ranked.c.group_name,
+                literal(project_id),
+                literal(master_codebook.id),
+                literal(owner_id),
+                literal(False)
+            ).where(ranked.c.name_rank == 1)
+        ))
+        total_codes_copied = codes_result.rowcount
+
+        total_assignments_copied = 0
+        if include_assignments and total_codes_copied:
+            master_code = aliased(Code)
+            spans = select(
+                CodeAssignment.document_id,
+                master_code.id.label("code_id"),
+                CodeAssignment.start_char,
+                CodeAssignment.end_char,
+                CodeAssignment.text_snapshot,
+                CodeAssignment.note,
+                CodeAssignment.confidence,
+                CodeAssignment.status,
+                CodeAssignment.created_by_id,
+                # Merged codes may carry the same span; keep it once
+                func.row_number().over(
+                    partition_by=(CodeAssignment.document_id, master_code.id,
+                                  CodeAssignment.start_char, CodeAssignment.end_char,
+                                  CodeAssignment.created_by_id),
+                    order_by=CodeAssignment.id
+                ).label("span_rank")
+            ).join(
+                ranked, CodeAssignment.code_id == ranked.c.id
+            ).join(
+                master_code, and_(
+                    master_code.codebook_id == master_codebook.id,
+                    master_code.name == ranked.c.master_name
                 )
-                db.add(new_code)
-                total_codes_copied += 1
+            )
+            if on_name_conflict == "first":
+                spans = spans.where(ranked.c.name_rank == 1)
+            spans = spans.subquery()
+
+            assignments_result = db.execute(insert(CodeAssignment.__table__).from_select(
+                ["document_id", "code_id", "start_char", "end_char", "text_snapshot",
+                 "note", "confidence", "status", "created_by_id"],
+                select(
+                    spans.c.document_id,
+                    spans.c.code_id,
+                    spans.c.start_char,
+                    spans.c.end_char,
+                    spans.c.text_snapshot,
+                    spans.c.note,
+                    spans.c.confidence,
+                    spans.c.status,
+                    spans.c.created_by_id
+                ).where(spans.c.span_rank == 1)
+            ))
+            total_assignments_copied = assignments_result.rowcount
 
         db.commit()
         db.refresh(master_codebook)
 
         return {
             "master_codebook": master_codebook, # type: ignore
-            "codes_copied": total_codes_copied 
+            "codes_copied": total_codes_copied,
+            "assignments_copied": total_assignments_copied
         }
 
     @staticmethod
     def detect_code_conflicts(
         db: Session,
-        project_id: int
+        project_id: int,
+        threshold: float = CONFLICT_SIMILARITY_THRESHOLD,
+        limit: Optional[int] = None
     ) -> List[Dict]:
         """
         Detect potentially conflicting codes across finalized codebooks.
-        Returns groups of similar codes for owner review.
+        Returns groups of similar codes for owner review, most relevant first.
+
+        Names and descriptions are compared by character trigram MinHash with
+        LSH banding, so only likely matches are ever scored and 10k codes stay
+        interactive. Exact name matches (ignoring case and punctuation) always
+        conflict.
         """
 
-        # Get all codes from finalized codebooks
-        finalized_codes = db.query(Code).join(Codebook).filter(
+        # Get all codes from finalized codebooks with their owners in one query
+        finalized_codes = db.query(
+            Code.id,
+            Code.name,
+            Code.description,
+            Code.codebook_id,
+            Codebook.user_id
+        ).join(Codebook, Code.codebook_id == Codebook.id).filter(
             Codebook.project_id == project_id,
             Codebook.finalized == True
-        ).all()
+        ).order_by(Code.id).all()
 
-        conflicts = []
+        if len(finalized_codes) < 2:
+            return []
 
-        # Simple conflict detection based on exact name matches
-        # (You could enhance this with fuzzy matching)
-        code_groups = {}
-        for code in finalized_codes:
-            name_key = code.name.lower().strip()
-            if name_key not in code_groups:
-                code_groups[name_key] = []
-            code_groups[name_key].append({
-                "id": code.id,
-                "name": code.name,
-                "description": code.description,
-                "codebook_id": code.codebook_id,
-                "user_id": code.codebook.user_id
+        hasher = MinHasher()
+        name_signatures, has_name = hasher.signatures(
+            [code.name for code in finalized_codes])
+        description_signatures, has_description = hasher.signatures(
+            [code.description for code in finalized_codes])
+
+        pairs = sorted(lsh_candidate_pairs(name_signatures, has_name) |
+                       lsh_candidate_pairs(description_signatures, has_description))
+        name_scores = estimated_similarity(name_signatures, pairs)
+        description_scores = estimated_similarity(description_signatures, pairs)
+
+        normalized_names = [normalize_text(code.name) for code in finalized_codes]
+        edges = {}
+        for (first, second), name_score, description_score in zip(pairs, name_scores, description_scores):
+            if normalized_names[first] == normalized_names[second]:
+                score = 1.0
+            elif has_description[first] and has_description[second]:
+                score = CONFLICT_NAME_WEIGHT * name_score + \
+                    (1 - CONFLICT_NAME_WEIGHT) * description_score
+            else:
+                score = name_score
+            if score >= threshold:
+                edges[(first, second)] = float(score)
+
+        groups = connected_groups(len(finalized_codes), edges)
+        group_of = {index: group for group, members in enumerate(groups) for index in members}
+        group_scores: Dict[int, List[float]] = {}
+        for (first, _), score in edges.items():
+            group_scores.setdefault(group_of[first], []).append(score)
+
+        conflicts = []
+        for group, members in enumerate(groups):
+            scores = group_scores[group]
+            codes = [{
+                "id": finalized_codes[i].id,
+                "name": finalized_codes[i].name,
+                "description": finalized_codes[i].description,
+                "codebook_id": finalized_codes[i].codebook_id,
+                "user_id": finalized_codes[i].user_id
+            } for i in members]
+            names = [normalized_names[i] for i in members]
+            conflicts.append({
+                "conflicting_name": max(set(names), key=lambda name: (names.count(name), -len(name), name)),
+                "codes": codes,
+                "conflict_count": len(codes),
+                "user_count": len({code["user_id"] for code in codes}),
+                "similarity": round(sum(scores) / len(scores), 3),
+                "exact_match": len(set(names)) == 1
             })
 
-        # Return groups with conflicts (more than 1 code with same name)
-        for name, codes in code_groups.items():
-            if len(codes) > 1:
-                conflicts.append({
-                    "conflicting_name": name,
-                    "codes": codes,
-                    "conflict_count": len(codes)
-                })
+        # Conflicts between collaborators first, then the closest matches
+        conflicts.sort(key=lambda conflict: (
+            conflict["user_count"] < 2, -conflict["similarity"], -conflict["conflict_count"]))
+        return conflicts[:limit] if limit else conflicts
+
+
+def _name_key(code):
+    """Case and whitespace insensitive code name used to match codes by name"""
+    return func.lower(func.trim(code.name))
+
 
-        return conflicts
+def _selected(code, selected_codes: Dict[int, List[int]]):
+    """Filter matching the selected code ids of each source codebook"""
+    conditions = [and_(code.codebook_id == codebook_id, code.id.in_(code_ids))
+                  for codebook_id, code_ids in selected_codes.items() if code_ids]
+    return or_(*conditions) if conditions else false()
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session, selectinload
 from app.models.code import Code
 from app.models.codebook import Codebook
 from app.models.code_assignments import CodeAssignment
+from app.services.codebook_service import CodebookService
 
 
 class ProjectSerializer:
@@ -101,8 +102,8 @@ class ProjectSerializer:
                 codebook_ids.add(code.codebook_id)
             else:
                 # Handle codes without codebook_id
-                default_codebook = Code.get_default_codebook(
-                    user_id=user_id, project_id=project_id, db=db
+                default_codebook = CodebookService.get_or_create_default_codebook(
+                    db=db, user_id=user_id, project_id=project_id
                 )
                 code.codebook_id = default_codebook.id
                 db.commit()
@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, func, select, union
 from typing import List, Optional, Dict, Any
-from app.models.project import Project
+from app.db.routing import read_only
+from app.models.project import Project, project_collaborators
+from app.models.document import Document
 from app.models.user import User
 from app.schemas.project import ProjectCreate, ProjectUpdate, ProjectSummary, ResearchDetailsUpdate
 from app.services.project_comprehensive import ProjectComprehensiveService
@@ -198,26 +200,55 @@ class ProjectService:
 
     @staticmethod
     def get_project_summary_list(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[ProjectSummary]:
-        """Get a list of project summaries for a user"""
-        projects = ProjectService.get_user_projects(db, user_id, skip, limit)
-
-        summaries = []
-        for project in projects:
-            summary = ProjectSummary(
-                id=project.id,  # type: ignore
-                title=project.title,  # type: ignore
-                description=project.description,  # type: ignore
-                owner_id=project.owner_id,  # type: ignore
-                document_count=len(project.documents),  # type: ignore
-                collaborator_count=len(project.collaborators),  # type: ignore
-                created_at=project.created_at,  # type: ignore
-                updated_at=project.updated_at  # type: ignore
-            )
-            summaries.append(summary)
-
-        return summaries
+        """Get a list of project summaries for a user in a single query"""
+        # Owned and shared project ids as a plain union instead of a correlated EXISTS
+        accessible = union(
+            select(Project.id.label("project_id")).where(
+                Project.owner_id == user_id),
+            select(project_collaborators.c.project_id).where(
+                project_collaborators.c.user_id == user_id)
+        ).subquery()
+
+        # Counts are aggregated once per table and joined, without loading any rows
+        document_counts = select(
+            Document.project_id,
+            func.count(Document.id).label("document_count")
+        ).where(
+            Document.project_id.in_(select(accessible.c.project_id))
+        ).group_by(Document.project_id).subquery()
+
+        collaborator_counts = select(
+            project_collaborators.c.project_id,
+            func.count(project_collaborators.c.user_id).label(
+                "collaborator_count")
+        ).where(
+            project_collaborators.c.project_id.in_(
+                select(accessible.c.project_id))
+        ).group_by(project_collaborators.c.project_id).subquery()
+
+        rows = db.query(
+            Project.id,
+            Project.title,
+            Project.description,
+            Project.owner_id,
+            Project.created_at,
+            Project.updated_at,
+            func.coalesce(document_counts.c.document_count,
+                          0).label("document_count"),
+            func.coalesce(collaborator_counts.c.collaborator_count,
+                          0).label("collaborator_count")
+        ).join(
+            accessible, accessible.c.project_id == Project.id
+        ).outerjoin(
+            document_counts, document_counts.c.project_id == Project.id
+        ).outerjoin(
+            collaborator_counts, collaborator_counts.c.project_id == Project.id
+        ).order_by(Project.id).offset(skip).limit(limit).all()
+
+        return [ProjectSummary(**row._mapping) for row in rows]
 
     @staticmethod
+    @read_only
     def get_project_comprehensive(db: Session, project_id: int, user_id: int) -> Optional[Dict[str, Any]]:
         """Get a project with all related data loaded efficiently"""
         # Check access first
@@ -0,0 +1,404 @@
+"""
+Project-wide search over codes, annotations and code assignment snapshots
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, literal, literal_column, select
+from sqlalchemy.orm import Session
+
+from app.core.permissions import PermissionChecker
+from app.models.annotation import Annotation
+from app.models.code import Code
+from app.models.code_assignments import CodeAssignment
+from app.models.document import Document
+from app.models.user import User
+from app.schemas.search import ProjectSearchResponse, SearchHit, SearchResult
+from app.utils.search_index import (
+    HEADLINE_OPTIONS, InvertedIndex, find_term_positions, make_snippet, marked_positions, query_terms,
+    substring_positions)
+
+# Must stay identical to the expressions of the ix_*_fts indexes so Postgres uses them
+SEARCH_CONFIG = literal_column("'english'")
+ENTITY_TYPES = ("code", "annotation", "code_assignment")
+# Codes are indexed as "<name>\n<description>"
+CODE_FIELD_SEPARATOR = "\n"
+_PENDING_CHANGES_KEY = "project_search_changes"
+
+
+class _ProjectIndex:
+    """In-process index of one project plus the watermarks it was synced at"""
+
+    def __init__(self):
+        self.index = InvertedIndex()
+        self.watermarks: Dict[str, Tuple[int, Optional[int]]] = {}
+
+
+class ProjectSearchService:
+    """
+    Unified search over code names/descriptions, annotation content and code
+    assignment text snapshots of a project.
+
+    Postgres answers queries from GIN full-text indexes. Other databases use an
+    in-process BM25 index per project that is updated from ORM flushes as
+    assignments, annotations and codes change, and reconciled against cheap
+    count/max(id) watermarks to catch bulk inserts and deletes.
+    """
+
+    _project_indexes: Dict[int, _ProjectIndex] = {}
+    _registry_lock = threading.Lock()
+
+    @staticmethod
+    def search(
+        db: Session,
+        project_id: int,
+        user_id: int,
+        search_text: str,
+        entity_types: Optional[List[str]] = None,
+        skip: int = 0,
+        limit: int = 20,
+        max_hits_per_result: int = 10
+    ) -> ProjectSearchResponse:
+        """Search a project, returning results of all entity types ranked together"""
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise ValueError("User not found")
+
+        project = PermissionChecker.check_project_access(
+            db, project_id, user, raise_exception=False)
+        if not project:
+            raise ValueError("Project not found or access denied")
+
+        entity_types = [entity_type for entity_type in ENTITY_TYPES
+                        if not entity_types or entity_type in entity_types]
+        response = ProjectSearchResponse(
+            query=search_text, total=0, skip=skip, limit=limit,
+            counts={entity_type: 0 for entity_type in entity_types})
+
+        terms = query_terms(search_text)
+        if not terms:
+            return response
+
+        if db.get_bind().dialect.name == "postgresql":
+            ranked, counts = ProjectSearchService._rank_postgres(
+                db, project_id, search_text, entity_types, skip + limit)
+        else:
+            ranked, counts = ProjectSearchService._rank_in_process(
+                db, project_id, terms, entity_types)
+
+        response.counts.update(counts)
+        response.total = sum(counts.values())
+        page = ranked[skip:skip + limit]
+        if page:
+            response.results = ProjectSearchService._build_results(
+                db, page, terms, max_hits_per_result,
+                headline_query=search_text if db.get_bind().dialect.name == "postgresql" else None)
+        return response
+
+    @staticmethod
+    def invalidate(project_id: Optional[int] = None) -> None:
+        """Drop the in-process index of one project, or of every project"""
+        with ProjectSearchService._registry_lock:
+            if project_id is None:
+                ProjectSearchService._project_indexes.clear()
+            else:
+                ProjectSearchService._project_indexes.pop(project_id, None)
+
+    @staticmethod
+    def _rank_postgres(
+        db: Session,
+        project_id: int,
+        search_text: str,
+        entity_types: List[str],
+        fetch: int
+    ) -> Tuple[List[Tuple[Tuple[str, int], float]], Dict[str, int]]:
+        """Rank each entity type with ts_rank_cd, then merge the top rows"""
+        search_query = func.websearch_to_tsquery(SEARCH_CONFIG, search_text)
+        ranked = []
+        counts = {}
+
+        for entity_type in entity_types:
+            if entity_type == "code":
+                id_column = Code.id
+                vector = func.to_tsvector(
+                    SEARCH_CONFIG,
+                    func.coalesce(Code.name, "") + " " +
+                    func.coalesce(Code.description, ""))
+                query = db.query(id_column, func.ts_rank_cd(vector, search_query)).filter(
+                    Code.project_id == project_id)
+            elif entity_type == "annotation":
+                id_column = Annotation.id
+                vector = func.to_tsvector(
+                    SEARCH_CONFIG, func.coalesce(Annotation.content, ""))
+                query = db.query(id_column, func.ts_rank_cd(vector, search_query)).filter(
+                    Annotation.project_id == project_id)
+            else:
+                id_column = CodeAssignment.id
+                vector = func.to_tsvector(
+                    SEARCH_CONFIG, func.coalesce(CodeAssignment.text_snapshot, ""))
+                query = db.query(id_column, func.ts_rank_cd(vector, search_query)).join(
+                    Document, Document.id == CodeAssignment.document_id
+                ).filter(Document.project_id == project_id)
+
+            query = query.filter(vector.op("@@")(search_query))
+            counts[entity_type] = query.count()
+            rows = query.order_by(
+                func.ts_rank_cd(vector, search_query).desc(), id_column
+            ).limit(fetch).all()
+            ranked.extend(((entity_type, row[0]), float(row[1] or 0))
+                          for row in rows)
+
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked, counts
+
+    @staticmethod
+    def _rank_in_process(
+        db: Session,
+        project_id: int,
+        terms: List[str],
+        entity_types: List[str]
+    ) -> Tuple[List[Tuple[Tuple[str, int], float]], Dict[str, int]]:
+        """Rank with the project's in-process index"""
+        state = ProjectSearchService._sync_project_index(db, project_id)
+
+        wanted = set(entity_types)
+        ranked = [(key, score) for key, score in state.index.search(terms)
+                  if key[0] in wanted]  # type: ignore
+        counts = {entity_type: 0 for entity_type in entity_types}
+        for key, _ in ranked:
+            counts[key[0]] += 1  # type: ignore
+        return ranked, counts  # type: ignore
+
+    @staticmethod
+    def _sync_project_index(db: Session, project_id: int) -> _ProjectIndex:
+        """Build the project's index on first use, then reconcile it against watermarks"""
+        with ProjectSearchService._registry_lock:
+            state = ProjectSearchService._project_indexes.get(project_id)
+            if state is None:
+                state = ProjectSearchService._project_indexes[project_id] = _ProjectIndex(
+                )
+
+        with state.index.lock:
+            for entity_type in ENTITY_TYPES:
+                id_column, query = ProjectSearchService._entity_id_query(
+                    db, project_id, entity_type)
+                watermark = tuple(query.with_entities(
+                    func.count(id_column), func.max(id_column)).one())
+                if state.watermarks.get(entity_type) == watermark:
+                    continue
+
+                current_ids = {row[0] for row in query.all()}
+                indexed_ids = {key[1] for key in state.index.keys()
+                               if key[0] == entity_type}  # type: ignore
+
+                for entity_id in indexed_ids - current_ids:
+                    state.index.remove((entity_type, entity_id))
+
+                missing = list(current_ids - indexed_ids)
+                for batch_start in range(0, len(missing), 500):
+                    batch = missing[batch_start:batch_start + 500]
+                    for entity_id, text in ProjectSearchService._entity_texts(
+                            db, entity_type, batch):
+                        state.index.add((entity_type, entity_id), text)
+
+                state.watermarks[entity_type] = watermark  # type: ignore
+
+        return state
+
+    @staticmethod
+    def _entity_id_query(db: Session, project_id: int, entity_type: str):
+        """Query of the ids of one entity type inside a project"""
+        if entity_type == "code":
+            return Code.id, db.query(Code.id).filter(Code.project_id == project_id)
+        if entity_type == "annotation":
+            return Annotation.id, db.query(Annotation.id).filter(
+                Annotation.project_id == project_id)
+        return CodeAssignment.id, db.query(CodeAssignment.id).join(
+            Document, Document.id == CodeAssignment.document_id
+        ).filter(Document.project_id == project_id)
+
+    @staticmethod
+    def _entity_texts(db: Session, entity_type: str, entity_ids: List[int]) -> List[Tuple[int, str]]:
+        """Searchable text of the given entities"""
+        if entity_type == "code":
+            rows = db.query(Code.id, Code.name, Code.description).filter(
+                Code.id.in_(entity_ids)).all()
+            return [(row.id, _code_text(row.name, row.description)) for row in rows]
+        if entity_type == "annotation":
+            rows = db.query(Annotation.id, Annotation.content).filter(
+                Annotation.id.in_(entity_ids)).all()
+            return [(row.id, row.content or "") for row in rows]
+        rows = db.query(CodeAssignment.id, CodeAssignment.text_snapshot).filter(
+            CodeAssignment.id.in_(entity_ids)).all()
+        return [(row.id, row.text_snapshot or "") for row in rows]
+
+    @staticmethod
+    def _build_results(
+        db: Session,
+        page: List[Tuple[Tuple[str, int], float]],
+        terms: List[str],
+        max_hits_per_result: int,
+        headline_query: Optional[str] = None
+    ) -> List[SearchResult]:
+        """Load the entities of one page and locate their hits
+
+        With headline_query (Postgres), hits are the words ts_headline
+        highlights, so they come from the same stemmer that ranked the page.
+        """
+        ids_by_type: Dict[str, List[int]] = {}
+        for (entity_type, entity_id), _ in page:
+            ids_by_type.setdefault(entity_type, []).append(entity_id)
+
+        def headline(column):
+            if headline_query is None:
+                return literal(None)
+            return func.ts_headline(
+                SEARCH_CONFIG, func.coalesce(column, ""),
+                func.websearch_to_tsquery(SEARCH_CONFIG, headline_query),
+                literal(HEADLINE_OPTIONS))
+
+        loaded: Dict[Tuple[str, int], dict] = {}
+        if ids_by_type.get("code"):
+            for row in db.query(
+                Code.id, Code.name, Code.description,
+                headline(Code.name).label("name_marked"),
+                headline(Code.description).label("description_marked")
+            ).filter(Code.id.in_(ids_by_type["code"])).all():
+                loaded[("code", row.id)] = {
+                    "title": row.name,
+                    "code_id": row.id,
+                    "fields": [("name", row.name or "", row.name_marked),
+                               ("description", row.description or "", row.description_marked)]
+                }
+        if ids_by_type.get("annotation"):
+            for row in db.query(
+                Annotation.id, Annotation.content, Annotation.document_id, Annotation.code_id,
+                headline(Annotation.content).label("content_marked")
+            ).filter(Annotation.id.in_(ids_by_type["annotation"])).all():
+                content = row.content or ""
+                loaded[("annotation", row.id)] = {
+                    "title": content[:80],
+                    "document_id": row.document_id,
+                    "code_id": row.code_id,
+                    "fields": [("content", content, row.content_marked)]
+                }
+        if ids_by_type.get("code_assignment"):
+            for row in db.query(
+                CodeAssignment.id, CodeAssignment.text_snapshot, CodeAssignment.document_id,
+                CodeAssignment.code_id, CodeAssignment.start_char, CodeAssignment.end_char,
+                Code.name.label("code_name"),
+                headline(CodeAssignment.text_snapshot).label("text_snapshot_marked")
+            ).join(Code, Code.id == CodeAssignment.code_id).filter(
+                CodeAssignment.id.in_(ids_by_type["code_assignment"])
+            ).all():
+                loaded[("code_assignment", row.id)] = {
+                    "title": row.code_name,
+                    "document_id": row.document_id,
+                    "code_id": row.code_id,
+                    "start_char": row.start_char,
+                    "end_char": row.end_char,
+                    "fields": [("text_snapshot", row.text_snapshot or "", row.text_snapshot_marked)]
+                }
+
+        results = []
+        for (entity_type, entity_id), score in page:
+            entity = loaded.get((entity_type, entity_id))
+            if entity is None:
+                continue
+
+            fields = entity.pop("fields")
+            positions = {field: (marked_positions(marked, text) if marked is not None else None)
+                         or find_term_positions(text, terms)
+                         for field, text, marked in fields}
+            if not any(positions.values()):
+                # Matched by a stemmer the offsets disagree with; show where the terms occur
+                positions = {field: substring_positions(text, terms) for field, text, _ in fields}
+
+            hits = [
+                SearchHit(field=field, start_char=start, end_char=end,
+                          snippet=make_snippet(text, start, end))
+                for field, text, _ in fields
+                for start, end in positions[field]
+            ]
+
+            results.append(SearchResult(
+                entity_type=entity_type,  # type: ignore
+                entity_id=entity_id,
+                score=score,
+                hit_count=len(hits),
+                hits=hits[:max_hits_per_result],
+                **entity
+            ))
+        return results
+
+
+def _code_text(name: Optional[str], description: Optional[str]) -> str:
+    return (name or "") + CODE_FIELD_SEPARATOR + (description or "")
+
+
+def _record_search_changes(session: Session, flush_context) -> None:
+    """Remember flushed changes to searchable entities until the transaction commits"""
+    if not ProjectSearchService._project_indexes:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        return
+
+    changed = [(obj, False) for obj in list(session.new) + list(session.dirty)]
+    changed += [(obj, True) for obj in session.deleted]
+    changed = [(obj, deleted) for obj, deleted in changed
+               if isinstance(obj, (Code, Annotation, CodeAssignment))]
+    if not changed:
+        return
+
+    document_ids = {obj.document_id for obj, _ in changed
+                    if isinstance(obj, CodeAssignment)}
+    document_projects = {}
+    if document_ids:
+        # Execute on the flush connection directly so no autoflush is triggered
+        document_projects = dict(session.connection().execute(
+            select(Document.id, Document.project_id).where(
+                Document.id.in_(document_ids))
+        ).all())
+
+    pending = session.info.setdefault(_PENDING_CHANGES_KEY, {})
+    for obj, deleted in changed:
+        if isinstance(obj, Code):
+            entity_type, project_id = "code", obj.project_id
+            text = _code_text(obj.name, obj.description)  # type: ignore
+        elif isinstance(obj, Annotation):
+            entity_type, project_id = "annotation", obj.project_id
+            text = obj.content or ""
+        else:
+            entity_type = "code_assignment"
+            project_id = document_projects.get(obj.document_id)
+            text = obj.text_snapshot or ""
+
+        # Unknown project (e.g. its document was deleted too) is left to the watermark check
+        if project_id is None or obj.id is None:
+            continue
+        pending[(project_id, (entity_type, obj.id))] = None if deleted else text
+
+
+def _apply_search_changes(session: Session) -> None:
+    """Apply committed changes to the in-process indexes that are already built"""
+    pending = session.info.pop(_PENDING_CHANGES_KEY, None)
+    if not pending:
+        return
+
+    for (project_id, key), text in pending.items():
+        state = ProjectSearchService._project_indexes.get(project_id)
+        if state is None:
+            continue
+        if text is None:
+            state.index.remove(key)
+        else:
+            state.index.add(key, text)
+
+
+def _discard_search_changes(session: Session) -> None:
+    session.info.pop(_PENDING_CHANGES_KEY, None)
+
+
+event.listen(Session, "after_flush", _record_search_changes)
+event.listen(Session, "after_commit", _apply_search_changes)
+event.listen(Session, "after_rollback", _discard_search_changes)
@@ -1,6 +1,6 @@
 import time
 import threading
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Optional
 import logging
 import uuid
 
@@ -63,8 +63,12 @@ class SimpleRateLimiter:
 
         return False
 
-    def call_with_backoff(self, provider: str, func, *args, **kwargs):
-        """Call a function with exponential backoff - attempts are per-operation, not global."""
+    def call_with_backoff(self, provider: str, func, *args,
+                          on_wait: Optional[Callable[[float], None]] = None, **kwargs):
+        """Call a function with exponential backoff - attempts are per-operation, not global.
+
+        on_wait, if given, is called with the seconds slept before each retry.
+        """
         lock = self._get_lock(provider)
 
         # Reset provider status if it's been successful for a while
@@ -91,6 +95,8 @@ class SimpleRateLimiter:
                 print(
                     f"⏳ Waiting {current_delay:.1f}s before retry for {provider} (operation attempt {attempt})...")
                 time.sleep(current_delay)
+                if on_wait is not None:
+                    on_wait(current_delay)
 
             try:
                 result = func(*args, **kwargs)
@@ -170,11 +176,11 @@ def get_rate_limiter() -> SimpleRateLimiter:
     return _rate_limiter
 
 
-def with_exponential_backoff(provider: str):
+def with_exponential_backoff(provider: str, on_wait: Optional[Callable[[float], None]] = None):
     """Decorator to add exponential backoff to a function."""
     def decorator(func):
         def wrapper(*args, **kwargs):
-            return _rate_limiter.call_with_backoff(provider, func, *args, **kwargs)
+            return _rate_limiter.call_with_backoff(provider, func, *args, on_wait=on_wait, **kwargs)
         return wrapper
     return decorator
 
@@ -0,0 +1,189 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_SUFFIXES = ("ing", "ed", "es", "s")
+# ts_headline markers around matched words; private use characters that
+# searched text does not contain, so hit offsets can be read back from the headline
+HIT_START = "\ue000"
+HIT_END = "\ue001"
+HEADLINE_OPTIONS = f'HighlightAll=true, StartSel="{HIT_START}", StopSel="{HIT_END}"'
+
+
+def light_stem(term: str) -> str:
+    """Strip the most common English inflections so 'coding' matches 'code'-style queries"""
+    for suffix in _SUFFIXES:
+        if len(term) > len(suffix) + 3 and term.endswith(suffix):
+            return term[:-len(suffix)]
+    return term
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """Split text into (stemmed_term, start_char, end_char) tuples"""
+    return [
+        (light_stem(match.group(0).lower()), match.start(), match.end())
+        for match in TOKEN_PATTERN.finditer(text or "")
+    ]
+
+
+def query_terms(text: str) -> List[str]:
+    """Unique stemmed terms of a query, in the order they were typed"""
+    terms = []
+    for term, _, _ in tokenize(text):
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def find_term_positions(text: str, terms: Iterable[str]) -> List[Tuple[int, int]]:
+    """Character offsets of every token in text matching one of the terms"""
+    wanted = set(terms)
+    return [(start, end) for term, start, end in tokenize(text) if term in wanted]
+
+
+def marked_positions(marked: str, text: str) -> Optional[List[Tuple[int, int]]]:
+    """Spans between HIT_START and HIT_END markers; None if the headline changed the text"""
+    if HIT_START in text or HIT_END in text:
+        return None
+    positions = []
+    plain = []
+    length = 0
+    start = None
+    for piece in re.split(f"({HIT_START}|{HIT_END})", marked):
+        if piece == HIT_START:
+            start = length
+        elif piece == HIT_END:
+            if start is not None:
+                positions.append((start, length))
+            start = None
+        else:
+            plain.append(piece)
+            length += len(piece)
+    return positions if "".join(plain) == text else None
+
+
+def substring_positions(text: str, terms: Iterable[str]) -> List[Tuple[int, int]]:
+    """Case-insensitive occurrences of the query terms, in text order"""
+    terms = sorted(set(terms), key=len, reverse=True)
+    if not terms:
+        return []
+    pattern = "|".join(re.escape(term) for term in terms)
+    return [(match.start(), match.end()) for match in re.finditer(pattern, text, re.IGNORECASE)]
+
+
+def make_snippet(text: str, start: int, end: int, radius: int = 60) -> str:
+    """Cut a window of text around a hit, marking truncation with ellipses"""
+    snippet_start = max(0, start - radius)
+    snippet_end = min(len(text), end + radius)
+    snippet = text[snippet_start:snippet_end].replace("\n", " ").strip()
+    if snippet_start > 0:
+        snippet = "..." + snippet
+    if snippet_end < len(text):
+        snippet = snippet + "..."
+    return snippet
+
+
+class InvertedIndex:
+    """
+    BM25-ranked inverted index keeping the character offsets of every posting.
+
+    Entries are keyed by any hashable (document id, (entity_type, id), ...) and
+    can be added, replaced and removed individually so callers can maintain the
+    index incrementally instead of rebuilding it.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Hashable, List[Tuple[int, int]]]] = defaultdict(dict)
+        self._entry_terms: Dict[Hashable, set] = {}
+        self._entry_lengths: Dict[Hashable, int] = {}
+        self._total_length = 0
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entry_lengths)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entry_lengths
+
+    def keys(self) -> List[Hashable]:
+        return list(self._entry_lengths.keys())
+
+    def document_frequency(self, term: str) -> int:
+        """Number of entries containing term"""
+        with self.lock:
+            return len(self._postings.get(term, ()))
+
+    def add(self, key: Hashable, text: str) -> None:
+        """Index text under key, replacing any previous entry for the key"""
+        with self.lock:
+            self.remove(key)
+            tokens = tokenize(text)
+            for term, start, end in tokens:
+                self._postings[term].setdefault(key, []).append((start, end))
+            self._entry_terms[key] = {term for term, _, _ in tokens}
+            self._entry_lengths[key] = len(tokens)
+            self._total_length += len(tokens)
+
+    def remove(self, key: Hashable) -> None:
+        with self.lock:
+            terms = self._entry_terms.pop(key, None)
+            if terms is None:
+                return
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._entry_lengths.pop(key, 0)
+
+    def clear(self) -> None:
+        with self.lock:
+            self._postings.clear()
+            self._entry_terms.clear()
+            self._entry_lengths.clear()
+            self._total_length = 0
+
+    def search(self, terms: List[str], match_all: bool = True) -> List[Tuple[Hashable, float]]:
+        """Return (key, score) pairs ordered by descending BM25 score"""
+        with self.lock:
+            if not terms or not self._entry_lengths:
+                return []
+
+            postings_per_term = [self._postings.get(term, {}) for term in terms]
+            if match_all:
+                if any(not postings for postings in postings_per_term):
+                    return []
+                candidates = set.intersection(
+                    *(set(postings) for postings in postings_per_term))
+            else:
+                candidates = set().union(*postings_per_term)
+
+            entry_count = len(self._entry_lengths)
+            average_length = self._total_length / entry_count or 1.0
+            scores = {}
+            for postings in postings_per_term:
+                if not postings:
+                    continue
+                idf = math.log(1 + (entry_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key in candidates.intersection(postings):
+                    frequency = len(postings[key])
+                    length_norm = 1 - self.b + self.b * \
+                        self._entry_lengths[key] / average_length
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * \
+                        (self.k1 + 1) / (frequency + self.k1 * length_norm)
+
+            return sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))
+
+    def positions(self, key: Hashable, terms: List[str]) -> List[Tuple[int, int]]:
+        """Sorted character offsets of the given terms inside one entry"""
+        with self.lock:
+            hits = []
+            for term in terms:
+                hits.extend(self._postings.get(term, {}).get(key, []))
+            return sorted(hits)
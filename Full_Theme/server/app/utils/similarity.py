@@ -0,0 +1,157 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+# N-grams hashed at once by MinHasher; the hash matrix takes
+# MINHASH_BATCH_SHINGLES * num_perm * 8 bytes (16 MB with 64 permutations)
+MINHASH_BATCH_SHINGLES = 32_768
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase text and collapse punctuation and whitespace runs into single spaces"""
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+def char_shingles(text: Optional[str], size: int = 3) -> np.ndarray:
+    """Hashes of the distinct character n-grams of normalized text"""
+    normalized = normalize_text(text)
+    if not normalized:
+        return np.empty(0, dtype=np.uint64)
+    # Pad so short words and word boundaries still produce n-grams
+    padded = f" {normalized} "
+    grams = {padded[i:i + size] for i in range(max(1, len(padded) - size + 1))}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams),
+                       dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    """
+    MinHash signatures over character n-gram sets.
+
+    The fraction of equal signature slots of two texts estimates the Jaccard
+    similarity of their n-gram sets. Hash functions are seeded so signatures
+    are stable between calls and processes.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: odd 64-bit multipliers, high 32 bits kept
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+    def signatures(
+        self, texts: List[Optional[str]], max_shingles: int = MINHASH_BATCH_SHINGLES
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (signatures, has_content); empty texts get a sentinel row and False.
+
+        Texts are hashed in batches of at most max_shingles n-grams, which
+        bounds the (n-grams x num_perm) hash matrix; a text with more n-grams
+        is hashed in several slices.
+        """
+        signatures = np.full((len(texts), self.num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+        has_content = np.zeros(len(texts), dtype=bool)
+
+        rows: List[int] = []
+        shingle_sets: List[np.ndarray] = []
+        batched = 0
+        for row, text in enumerate(texts):
+            shingles = char_shingles(text, self.shingle_size)
+            if not len(shingles):
+                continue
+            has_content[row] = True
+            for start in range(0, len(shingles), max_shingles):
+                part = shingles[start:start + max_shingles]
+                if batched + len(part) > max_shingles:
+                    self._hash_batch(signatures, rows, shingle_sets)
+                    rows, shingle_sets, batched = [], [], 0
+                rows.append(row)
+                shingle_sets.append(part)
+                batched += len(part)
+        if rows:
+            self._hash_batch(signatures, rows, shingle_sets)
+
+        return signatures, has_content
+
+    def _hash_batch(self, signatures: np.ndarray, rows: List[int], shingle_sets: List[np.ndarray]) -> None:
+        flat = np.concatenate(shingle_sets)
+        offsets = np.cumsum([0] + [len(shingles) for shingles in shingle_sets[:-1]])
+        hashed = (flat[:, None] * self._a + self._b) >> np.uint64(32)
+        # A row appears more than once when its n-grams span several slices
+        np.minimum.at(signatures, np.asarray(rows), np.minimum.reduceat(hashed, offsets, axis=0))
+
+
+def lsh_candidate_pairs(
+    signatures: np.ndarray,
+    has_content: np.ndarray,
+    bands: int = 16,
+    max_bucket: int = 100
+) -> Set[Tuple[int, int]]:
+    """
+    Pairs of rows sharing at least one LSH band.
+
+    With r = num_perm / bands rows per band, a pair with Jaccard s becomes a
+    candidate with probability 1 - (1 - s^r)^bands, so only similar rows are
+    ever compared. Buckets larger than max_bucket only pair each member with
+    its neighbours in full-signature order, which keeps identical and closest
+    rows together while staying linear.
+    """
+    rows_per_band = signatures.shape[1] // bands
+    valid = np.flatnonzero(has_content)
+    pairs: Set[Tuple[int, int]] = set()
+
+    for band in range(bands):
+        block = np.ascontiguousarray(
+            signatures[valid, band * rows_per_band:(band + 1) * rows_per_band])
+        buckets: Dict[bytes, List[int]] = defaultdict(list)
+        for row, key in zip(valid.tolist(), block):
+            buckets[key.tobytes()].append(row)
+
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if len(members) > max_bucket:
+                members = sorted(members, key=lambda row: signatures[row].tobytes())
+                pairs.update((min(first, second), max(first, second))
+                             for first, second in zip(members, members[1:]))
+                continue
+            for i, first in enumerate(members):
+                for second in members[i + 1:]:
+                    pairs.add((first, second))
+
+    return pairs
+
+
+def estimated_similarity(signatures: np.ndarray, pairs: List[Tuple[int, int]]) -> np.ndarray:
+    """Estimated Jaccard similarity of each pair from its MinHash signatures"""
+    if not pairs:
+        return np.empty(0)
+    index = np.asarray(pairs)
+    return (signatures[index[:, 0]] == signatures[index[:, 1]]).mean(axis=1)
+
+
+def connected_groups(count: int, edges: Iterable[Tuple[int, int]]) -> List[List[int]]:
+    """Union-find over row indices; only groups with more than one member are returned"""
+    parent = list(range(count))
+
+    def find(node: int) -> int:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for first, second in edges:
+        root_first, root_second = find(first), find(second)
+        if root_first != root_second:
+            parent[max(root_first, root_second)] = min(root_first, root_second)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for node in range(count):
+        groups[find(node)].append(node)
+    return [members for members in groups.values() if len(members) > 1]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Read throughput under mixed load: sync vs async project listing.
+
+Slow synchronous requests (standing in for AI runs and uploads) occupy the
+FastAPI threadpool while cheap project listings are fired at the same time.
+The same listing is served once through a synchronous handler (how every
+read endpoint used to work) and once through the async endpoint.
+
+    python benchmarks/read_throughput.py --reads 400 --concurrency 10 --slow 60
+
+Runs entirely in-process against a temporary SQLite database.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import Depends  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from app.core.auth import get_current_user  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.db.async_session import AsyncSessionLocal, get_async_db  # noqa: E402
+from app.db.session import Base, get_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.project import Project  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.project_service import ProjectService  # noqa: E402
+
+
+def setup_database(path: str, projects: int):
+    # Pools as large as the threadpool, so only worker starvation is measured
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False},
+                           pool_size=40, max_overflow=0)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        user = User(email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all([Project(title=f"Project {i}", owner_id=user.id) for i in range(projects)])
+        db.commit()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=40, max_overflow=0)
+    return SessionLocal, async_engine
+
+
+def install_routes(SessionLocal, async_engine, slow_seconds: float):
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal(bind=async_engine) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    @app.get("/bench/slow")
+    def slow_request():
+        # Blocks a threadpool worker like an AI call or an upload would
+        time.sleep(slow_seconds)
+        return {}
+
+    @app.get("/bench/sync-projects")
+    def sync_list_projects(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+        return ProjectService.get_project_summary_list(db, current_user.id, 0, 100)
+
+
+async def run_mix(read_path: str, reads: int, concurrency: int, slow: int, headers: dict):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 timeout=None) as client:
+        latencies = []
+        clients = asyncio.Semaphore(concurrency)
+
+        async def read():
+            async with clients:
+                started = time.perf_counter()
+                response = await client.get(read_path, headers=headers)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        slow_tasks = [asyncio.create_task(client.get("/bench/slow")) for _ in range(slow)]
+        await asyncio.sleep(0.05)  # let the slow requests take the workers first
+        started = time.perf_counter()
+        await asyncio.gather(*(read() for _ in range(reads)))
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(*slow_tasks)
+
+    latencies.sort()
+    return {
+        "reads_per_second": reads / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reads", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent readers")
+    parser.add_argument("--slow", type=int, default=60, help="concurrent slow sync requests")
+    parser.add_argument("--slow-seconds", type=float, default=1.0)
+    parser.add_argument("--projects", type=int, default=50)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    SessionLocal, async_engine = setup_database(path, args.projects)
+    install_routes(SessionLocal, async_engine, args.slow_seconds)
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'bench@example.com'})}"}
+
+    for label, read_path in (("sync handler ", "/bench/sync-projects"),
+                             ("async handler", "/api/v1/projects/")):
+        result = asyncio.run(run_mix(read_path, args.reads, args.concurrency, args.slow, headers))
+        print(f"{label}: {result['reads_per_second']:8.1f} reads/s  "
+              f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,17 @@ Configuration and fixtures for pytest
 """
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+import os
+import tempfile
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from typing import Dict, Generator, Any
 
 from app.main import app
+from app.db.async_session import AsyncSessionLocal, get_async_db
 from app.db.session import get_db
 from app.core.security import create_access_token
 from app.db.session import Base
@@ -18,8 +23,12 @@ from app.schemas.user import UserCreate
 import random
 import string
 
-# Setup in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Setup a temporary SQLite file for testing; sync and async endpoints share it.
+# The path only depends on the process, as some test modules import this file
+# a second time as tests.conftest
+TEST_DATABASE_PATH = os.path.join(
+    tempfile.gettempdir(), f"thematic_analysis_test_{os.getpid()}.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DATABASE_PATH}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
@@ -28,6 +37,9 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(
     autocommit=False, autoflush=False, bind=engine)
+# Each TestClient runs its own event loop, so async connections are not pooled
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}", poolclass=NullPool)
 
 
 def random_email():
@@ -58,7 +70,12 @@ def client(db):
         finally:
             pass
 
+    async def override_get_async_db():
+        async with AsyncSessionLocal(bind=async_engine) as async_db:
+            yield async_db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -86,3 +103,38 @@ def test_user(db) -> Dict[str, Any]:
 def auth_headers(test_user) -> Dict[str, str]:
     """Get headers with authorization token"""
     return {"Authorization": f"Bearer {test_user['token']}"}
+
+
+@pytest.fixture(scope="function")
+def read_engine():
+    """Engine behind the async read endpoints, e.g. for counting statements"""
+    return async_engine.sync_engine
+
+
+@pytest.fixture(scope="function")
+def count_statements():
+    """Collect the SQL statements an engine executes inside a with block
+
+        with count_statements(db.get_bind()) as statements:
+            ...
+    """
+    @contextmanager
+    def counting(engine):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return counting
+
+
+def pytest_sessionfinish(session, exitstatus):
+    engine.dispose()
+    if os.path.exists(TEST_DATABASE_PATH):
+        os.remove(TEST_DATABASE_PATH)
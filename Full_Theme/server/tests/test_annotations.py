@@ -231,3 +231,70 @@ def test_delete_annotation(client, auth_headers, test_document, test_code):
     # Make sure the specific annotation is gone
     annotation_ids = [a["id"] for a in after_response.json()]
     assert annotation_id not in annotation_ids
+
+
+def test_project_annotations_keyset_pagination(client, auth_headers, test_project, test_code):
+    """Test paging through project annotations with after_id"""
+    project_id = test_project["id"]
+    for index in range(5):
+        response = client.post("/api/v1/annotations/", json={
+            "content": f"Memo {index}",
+            "annotation_type": "MEMO",
+            "code_id": test_code["id"]
+        }, headers=auth_headers)
+        assert response.status_code == 201
+
+    url = f"/api/v1/annotations/project/{project_id}"
+    first_page = client.get(url, params={"limit": 2}, headers=auth_headers).json()
+    assert [a["content"] for a in first_page] == ["Memo 0", "Memo 1"]
+    assert first_page[0]["code_name"] == "Test Code"
+    assert first_page[0]["created_by_email"] is not None
+
+    next_page = client.get(url, params={"limit": 2, "after_id": first_page[-1]["id"]},
+                           headers=auth_headers).json()
+    assert [a["content"] for a in next_page] == ["Memo 2", "Memo 3"]
+
+
+def test_project_annotations_query_count_is_constant(client, auth_headers, test_project, test_code, db,
+                                                     count_statements):
+    """Test that loading annotations does not issue per-row queries"""
+    for index in range(10):
+        client.post("/api/v1/annotations/", json={
+            "content": f"Comment {index}",
+            "annotation_type": "COMMENT",
+            "code_id": test_code["id"]
+        }, headers=auth_headers)
+
+    with count_statements(db.get_bind()) as statements:
+        response = client.get(
+            f"/api/v1/annotations/?project_id={test_project['id']}", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+    annotation_selects = [s for s in statements if "FROM annotations" in s]
+    assert len(annotation_selects) == 1
+
+
+def test_get_annotation_thread(client, auth_headers, test_code):
+    """Test loading an annotation with nested replies"""
+    def post(content, parent_id=None):
+        response = client.post("/api/v1/annotations/", json={
+            "content": content,
+            "annotation_type": "COMMENT",
+            "code_id": test_code["id"],
+            "parent_id": parent_id
+        }, headers=auth_headers)
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    root_id = post("Is this code too broad?")
+    reply_id = post("Maybe split it", root_id)
+    nested_id = post("Agreed", reply_id)
+    post("Unrelated comment")
+
+    response = client.get(
+        f"/api/v1/annotations/{root_id}/thread", headers=auth_headers)
+    assert response.status_code == 200
+    thread = response.json()
+    assert [a["id"] for a in thread] == [root_id, reply_id, nested_id]
+    assert thread[2]["parent_id"] == reply_id
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for the async database layer using pytest
+"""
+import asyncio
+from typing import List
+
+import pytest
+
+from app.api.projects import list_projects
+from app.db.async_session import AsyncSessionLocal, async_database_url, run_read
+from app.models.project import Project
+from app.schemas.project import ProjectOut
+
+
+def test_async_database_url():
+    """Sync URLs map onto their async drivers"""
+    assert async_database_url("postgresql://u:p@db:5432/app") == \
+        "postgresql+asyncpg://u:p@db:5432/app"
+    assert async_database_url("postgresql+psycopg2://u:p@db/app") == \
+        "postgresql+asyncpg://u:p@db/app"
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    with pytest.raises(ValueError):
+        async_database_url("mysql://u:p@db/app")
+
+
+def test_read_endpoints_are_async():
+    """Hot read endpoints run on the event loop instead of the threadpool"""
+    assert asyncio.iscoroutinefunction(list_projects)
+
+
+def test_run_read_serializes_inside_session(client, auth_headers, read_engine):
+    """Services run unchanged on the async session and return plain schemas"""
+    client.post("/api/v1/projects/", json={"title": "Async", "description": "Read"},
+                headers=auth_headers)
+
+    async def read():
+        from sqlalchemy.ext.asyncio import AsyncEngine
+        async with AsyncSessionLocal(bind=AsyncEngine(read_engine)) as db:
+            return await run_read(db, lambda session: session.query(Project).all(),
+                                  response_model=List[ProjectOut])
+
+    projects = asyncio.run(read())
+    assert [p.title for p in projects] == ["Async"]
+    assert isinstance(projects[0], ProjectOut)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Tests for batch-mode AI coding through the local batch provider using pytest
+"""
+import datetime
+import time
+
+import pytest
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.models.ai_batch_job import AIBatchJob
+from app.models.document import Document, DocumentType
+from app.models.project import Project
+from app.schemas.ai_services import CodeOutput, MultipleCodesOutput
+from app.services.ai.ai_batch_jobs import AIBatchJobs
+from app.services.ai.ai_coding_service import AICodingService
+from app.services.ai.batch_coding import (
+    BATCH_PENDING, BatchChunkRunner, BatchProvider, LocalFileBatchProvider, get_batch_provider)
+from app.services.ai.chunk_dedup import ChunkOccurrence, UniqueChunk
+from app.services.ai.model_routing import PhaseMetrics
+from app.services.codebook_service import CodebookService
+
+TEXT = (
+    "Patients waited weeks for an appointment with their doctor. "
+    "Family members often drove them to the clinic and waited with them. "
+)
+
+
+def codes_for(text):
+    return MultipleCodesOutput(codes=[CodeOutput(
+        reasoning="mentioned", code=text.split()[0], quote=text, code_description="",
+        is_new_code=True, confidence=90)])
+
+
+class FakeCodingChain:
+    """Codes a chunk with its first word; fails for chunks starting with 'broken'"""
+
+    def invoke(self, input_data, config=None):
+        if input_data["text"].startswith("broken"):
+            raise ValueError("Invalid structured output")
+        return codes_for(input_data["text"])
+
+
+def make_chunks(*texts):
+    return [UniqueChunk(text=text, occurrences=[ChunkOccurrence(
+        document_id=i, project_id=1, chunk=text, chunk_start=0)]) for i, text in enumerate(texts)]
+
+
+def make_runner(tmp_path, provider=None, metrics=None):
+    provider = provider or LocalFileBatchProvider(SimpleNamespace(
+        initial_coding_llm=FakeCodingChain(), provider="fake", model_name="fake-model",
+        metrics=PhaseMetrics()), str(tmp_path / "jobs"))
+    return BatchChunkRunner(provider, "initial_coding", MultipleCodesOutput,
+                            work_dir=str(tmp_path / "batches"), metrics=metrics)
+
+
+def wait_for(provider, job_id):
+    deadline = time.monotonic() + 10
+    while provider.status(job_id) == BATCH_PENDING:
+        assert time.monotonic() < deadline, "batch did not finish"
+        time.sleep(0.01)
+
+
+def submit_and_collect(runner, chunks, handle, fallback):
+    job_id = runner.submit(chunks, lambda text: {"text": text})
+    wait_for(runner.provider, job_id)
+    return runner.collect(job_id, chunks, handle, fallback)
+
+
+def test_batch_results_reach_the_same_handler(tmp_path):
+    """Every chunk is coded through one batch and parsed into the output schema"""
+    handled = {}
+    interactive = []
+
+    coded, unrecoverable = submit_and_collect(
+        make_runner(tmp_path), make_chunks("waiting times", "family support"),
+        handle=lambda chunk, response: handled.update({chunk.text: response.codes[0].code}),
+        fallback=lambda text: interactive.append(text))
+
+    assert handled == {"waiting times": "waiting", "family support": "family"}
+    assert len(coded) == 2
+    assert unrecoverable == []
+    assert interactive == []
+    # The provider owns the only copy of the chunk text
+    assert list((tmp_path / "batches").iterdir()) == []
+
+
+def test_batch_calls_are_metered_into_the_ingesting_run(tmp_path):
+    """Usage of the batch job is added to the metrics of the run that collects it"""
+    metrics = PhaseMetrics()
+
+    submit_and_collect(make_runner(tmp_path, metrics=metrics), make_chunks("waiting times", "broken chunk"),
+                       handle=lambda chunk, response: None, fallback=codes_for)
+
+    phase = metrics.summary()["initial_coding"]
+    assert phase["calls"] == 2
+    assert phase["failures"] == 1
+    assert phase["models"] == {"fake-model": 2}
+
+
+def test_results_match_chunks_planned_again(tmp_path):
+    """Results are matched by chunk text, not by position in the submitted batch"""
+    runner = make_runner(tmp_path)
+    job_id = runner.submit(make_chunks("waiting times", "family support"), lambda text: {"text": text})
+    wait_for(runner.provider, job_id)
+    handled = []
+
+    coded, _ = runner.collect(job_id, make_chunks("family support"),
+                              lambda chunk, response: handled.append(response.codes[0].code), codes_for)
+
+    assert handled == ["family"]
+    assert len(coded) == 1
+
+
+def test_failed_batch_requests_fall_back_to_interactive_calls(tmp_path):
+    """Requests the batch could not answer are coded one by one"""
+    handled = []
+
+    coded, unrecoverable = submit_and_collect(
+        make_runner(tmp_path), make_chunks("waiting times", "broken chunk"),
+        handle=lambda chunk, response: handled.append(response.codes[0].code),
+        fallback=lambda text: codes_for("recovered " + text))
+
+    assert handled == ["waiting", "recovered"]
+    assert len(coded) == 2
+    assert unrecoverable == []
+
+
+def test_unfinished_batches_are_not_collected(tmp_path):
+    """Submitting returns at once; collecting a running batch is refused"""
+    class StuckProvider(BatchProvider):
+        def submit(self, batch_path):
+            return "job"
+
+        def status(self, job_id):
+            return BATCH_PENDING
+
+    runner = make_runner(tmp_path, provider=StuckProvider())
+    assert runner.submit(make_chunks("waiting times"), lambda text: {"text": text}) == "job"
+    with pytest.raises(RuntimeError, match="pending"):
+        runner.collect("job", make_chunks("waiting times"), lambda chunk, response: None, codes_for)
+
+
+def test_unknown_batch_provider_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        get_batch_provider("carrier-pigeon", None, str(tmp_path))
+
+
+def test_batch_job_is_submitted_and_ingested_later(db, test_user, tmp_path, monkeypatch):
+    """The coding request only submits; ingesting the finished job writes the codes"""
+    monkeypatch.setattr(settings, "AI_BATCH_DIR", str(tmp_path))
+    project = Project(title="Batch Project", description="", owner_id=test_user["id"])
+    db.add(project)
+    db.commit()
+    document = Document(name="interview.txt", content=TEXT * 5, document_type=DocumentType.TEXT,
+                        project_id=project.id, uploaded_by_id=test_user["id"])
+    db.add(document)
+    db.commit()
+
+    submitted = AICodingService.generate_code(
+        document_ids=[document.id], db=db, user_id=test_user["id"], provider="fake", batch=True)
+    job = submitted["batch_job"]
+    assert job["status"] == "pending"
+    assert "results" not in submitted
+
+    provider_job_id = db.get(AIBatchJob, job["id"]).provider_job_id
+    wait_for(LocalFileBatchProvider(None, str(tmp_path)), provider_job_id)
+    ingested = AICodingService.ingest_batch(job["id"], db, test_user["id"])
+
+    assert ingested["batch_job"]["status"] == "completed"
+    assert ingested["summary"]["total_codes"] > 0
+    assert ingested["summary"]["phase_metrics"]["initial_coding"]["calls"] > 0
+    assert AICodingService.ingest_batch(job["id"], db, test_user["id"]) == {"batch_job": ingested["batch_job"]}
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_ingest_keeps_the_batch_for_a_retry(db, test_user, tmp_path, monkeypatch):
+    """A failing ingest puts the job back to pending and leaves the results in place"""
+    monkeypatch.setattr(settings, "AI_BATCH_DIR", str(tmp_path))
+    project = Project(title="Batch Project", description="", owner_id=test_user["id"])
+    db.add(project)
+    db.commit()
+    document = Document(name="interview.txt", content=TEXT * 5, document_type=DocumentType.TEXT,
+                        project_id=project.id, uploaded_by_id=test_user["id"])
+    db.add(document)
+    db.commit()
+    job = AICodingService.generate_code(
+        document_ids=[document.id], db=db, user_id=test_user["id"], provider="fake", batch=True)["batch_job"]
+    wait_for(LocalFileBatchProvider(None, str(tmp_path)), db.get(AIBatchJob, job["id"]).provider_job_id)
+
+    create_codebook = CodebookService.get_or_create_ai_session_codebook
+
+    def failing_codebook(*args, **kwargs):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(CodebookService, "get_or_create_ai_session_codebook", failing_codebook)
+    with pytest.raises(RuntimeError, match="database went away"):
+        AICodingService.ingest_batch(job["id"], db, test_user["id"])
+
+    assert db.get(AIBatchJob, job["id"]).status == "pending"
+    assert list(tmp_path.iterdir()) != []
+
+    monkeypatch.setattr(CodebookService, "get_or_create_ai_session_codebook", create_codebook)
+    ingested = AICodingService.ingest_batch(job["id"], db, test_user["id"])
+    assert ingested["batch_job"]["status"] == "completed"
+    assert ingested["summary"]["total_codes"] > 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_batches_not_ingested_in_time_expire(db, test_user, tmp_path, monkeypatch):
+    """Jobs past the retention period are expired and their files deleted"""
+    monkeypatch.setattr(settings, "AI_BATCH_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "AI_BATCH_RETENTION_SECONDS", 3600)
+    project = Project(title="Batch Project", description="", owner_id=test_user["id"])
+    db.add(project)
+    db.commit()
+    (tmp_path / "old-job").mkdir()
+    (tmp_path / "old-job" / "input.jsonl").write_text('{"custom_id": "1"}\n')
+    job = AIBatchJobs.create(db, user_id=test_user["id"], project_id=project.id,
+                             service_type="initial_coding", document_ids=[], provider="fake",
+                             batch_provider="local", provider_job_id="old-job")
+    job.created_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=2)
+    db.commit()
+
+    response = AICodingService.ingest_batch(job.id, db, test_user["id"])
+
+    assert response["batch_job"]["status"] == "expired"
+    assert not (tmp_path / "old-job").exists()
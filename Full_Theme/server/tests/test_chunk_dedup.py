@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for cross-document chunk deduplication using pytest
+"""
+from types import SimpleNamespace
+
+from app.services.ai.chunk_dedup import chunk_content_key, locate_chunks, plan_unique_chunks, quote_span
+
+CONSENT = ("I confirm that I have read the information sheet and consent to take part "
+           "in this interview, which will be recorded and transcribed.")
+
+
+def make_document(document_id, content):
+    return SimpleNamespace(id=document_id, project_id=1, content=content)
+
+
+def test_content_free_chunks_are_skipped():
+    """Page markers and punctuation alone are not worth an LLM call"""
+    assert chunk_content_key("--- Page 3 ---\n") == ""
+    assert chunk_content_key(",,,;;\n\n") == ""
+    assert chunk_content_key("--- Page 1 ---\nPatients felt unheard by doctors")
+
+
+def test_repeated_chunks_are_dispatched_once(monkeypatch):
+    """Exact and near-duplicate chunks collapse into one chunk with all occurrences"""
+    monkeypatch.setattr("app.services.ai.chunk_dedup.create_chunks",
+                        lambda text, chunk_size: text.split("\n\n"))
+    documents = [
+        make_document(1, f"{CONSENT}\n\nPatients felt unheard by their doctors.\n\n--- Page 2 ---"),
+        make_document(2, f"Family support helped a great deal during treatment.\n\n{CONSENT}"),
+        make_document(3, CONSENT.replace("recorded", "recorded,")),
+    ]
+
+    unique, total, skipped = plan_unique_chunks(documents)
+
+    assert total == 6
+    assert skipped == 1
+    assert len(unique) == 3
+    consent = next(chunk for chunk in unique if chunk.text == CONSENT)
+    assert [o.document_id for o in consent.occurrences] == [1, 2, 3]
+    assert consent.occurrences[1].chunk_start == documents[1].content.index(CONSENT)
+
+
+def test_quote_span_uses_document_offsets():
+    """Quotes map to offsets within each occurrence's document"""
+    occurrence = SimpleNamespace(chunk="They felt anxious and stressed.", chunk_start=100)
+    assert quote_span(occurrence, "anxious", exact=True) == (110, 117)
+    assert quote_span(occurrence, None, exact=False) == (100, 131)
+    assert quote_span(occurrence, "missing", exact=True) == (100, 131)
+    assert quote_span(occurrence, "missing", exact=False) is None
+
+
+def test_chunks_are_located_despite_whitespace_changes():
+    """Chunks the splitter re-spaced are found; chunks not in the document get no span"""
+    content = "Intro line.\n\nPatients  felt\n unheard by doctors."
+    spans = locate_chunks(content, ["Intro line.", "Patients felt unheard by doctors.", "Not in here"])
+
+    assert spans[0] == (0, 11)
+    assert content[spans[1][0]:spans[1][1]] == "Patients  felt\n unheard by doctors."
+    assert spans[2] is None
+
+
+def test_chunks_not_found_are_skipped(monkeypatch):
+    """A chunk without an offset is skipped instead of being pinned to the document start"""
+    monkeypatch.setattr("app.services.ai.chunk_dedup.create_chunks",
+                        lambda text, chunk_size: [CONSENT, "A chunk the splitter invented out of nowhere."])
+
+    unique, total, skipped = plan_unique_chunks([make_document(1, f"Preamble.\n\n{CONSENT}")])
+
+    assert total == 2
+    assert skipped == 1
+    assert [chunk.text for chunk in unique] == [CONSENT]
+    assert unique[0].occurrences[0].chunk_start == len("Preamble.\n\n")
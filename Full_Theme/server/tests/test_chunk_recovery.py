@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for splitting and retrying failed AI coding chunks using pytest
+"""
+from app.services.ai.chunk_dedup import ChunkOccurrence, UniqueChunk
+from app.services.ai.chunk_recovery import ChunkDispatcher, split_point, split_unique_chunk
+
+SENTENCE = "Patients described long waits before seeing a doctor. "
+
+
+def make_chunk(text, document_ids=(1,), chunk_start=100):
+    return UniqueChunk(text=text, occurrences=[
+        ChunkOccurrence(document_id=document_id, project_id=1, chunk=text, chunk_start=chunk_start)
+        for document_id in document_ids
+    ])
+
+
+def test_split_point_prefers_sentence_boundaries():
+    """Chunks are halved on a sentence break near the middle"""
+    text = SENTENCE * 10
+    cut = split_point(text)
+    assert text[:cut].endswith(". ")
+    assert abs(cut - len(text) // 2) <= len(SENTENCE)
+
+
+def test_split_keeps_document_offsets():
+    """Halves of every occurrence point at the right document text"""
+    text = SENTENCE * 10
+    near_duplicate = text.replace("doctor", "nurse")
+    chunk = make_chunk(text, document_ids=(1, 2))
+    chunk.occurrences.append(ChunkOccurrence(
+        document_id=3, project_id=1, chunk=near_duplicate, chunk_start=0))
+
+    pieces = split_unique_chunk(chunk)
+
+    assert len(pieces) == 4
+    assert [len(piece.occurrences) for piece in pieces] == [2, 2, 1, 1]
+    for piece in pieces:
+        for occurrence in piece.occurrences:
+            source = near_duplicate if occurrence.document_id == 3 else text
+            start = occurrence.chunk_start - (0 if occurrence.document_id == 3 else 100)
+            assert source[start:start + len(occurrence.chunk)] == occurrence.chunk
+
+
+def test_failed_chunk_is_split_until_it_succeeds():
+    """Chunks the model cannot code whole are coded in halves"""
+    handled = []
+
+    def call(text):
+        if len(text) > 300:
+            raise ValueError("Invalid structured output")
+        return text
+
+    coded, unrecoverable = ChunkDispatcher(
+        call, lambda chunk, response: handled.append(response), min_split_chars=100
+    ).run([make_chunk(SENTENCE * 20)])
+
+    assert "".join(handled) == SENTENCE * 20
+    assert len(coded) == 1
+    assert unrecoverable == []
+
+
+def test_transient_failures_are_retried_later():
+    """Timeouts are retried after the other chunks instead of being split"""
+    calls = []
+
+    def call(text):
+        calls.append(text)
+        if text == "first" and calls.count("first") == 1:
+            raise TimeoutError("request timed out")
+        return text
+
+    coded, unrecoverable = ChunkDispatcher(
+        call, lambda chunk, response: None).run([make_chunk("first"), make_chunk("second")])
+
+    assert calls == ["first", "second", "first"]
+    assert [chunk.text for chunk in coded] == ["first", "second"]
+    assert unrecoverable == []
+
+
+def test_unrecoverable_spans_are_reported():
+    """Pieces that fail at the minimum size are reported per document span"""
+    text = SENTENCE * 20
+    poisoned = "doctor. " + SENTENCE
+
+    def call(piece):
+        if "doctor" in piece and len(piece) > len(SENTENCE) * 2:
+            raise ValueError("Invalid structured output")
+        return piece
+
+    coded, unrecoverable = ChunkDispatcher(
+        call, lambda chunk, response: None, min_split_chars=len(SENTENCE) * 2
+    ).run([make_chunk(text, document_ids=(1, 2)), make_chunk(poisoned * 2, document_ids=(3,))])
+
+    assert coded == []
+    assert {span["document_id"] for span in unrecoverable} == {1, 2, 3}
+    for span in unrecoverable:
+        assert span["start_char"] < span["end_char"]
+        assert span["error"] == "Invalid structured output"
@@ -194,3 +194,78 @@ def test_delete_code_assignment(client, auth_headers, test_document, test_code):
         f"/api/v1/code-assignments/document/{document_id}", headers=auth_headers)
     assignment_ids = [a["id"] for a in get_response.json()]
     assert assignment_id not in assignment_ids
+
+
+@pytest.fixture
+def stored_document(db, test_project, test_user):
+    """Insert a document row directly, without going through file upload"""
+    from app.models.document import Document, DocumentType
+
+    document = Document(
+        name="bulk_doc.txt",
+        content="x" * 20000,
+        document_type=DocumentType.TEXT,
+        project_id=test_project["id"],
+        uploaded_by_id=test_user["id"]
+    )
+    db.add(document)
+    db.commit()
+    return document.id
+
+
+def test_bulk_code_assignment_returns_ids_in_request_order(client, auth_headers, db, stored_document):
+    """Test that bulk assignment maps every request to its own stored row"""
+    from app.models.code_assignments import CodeAssignment
+
+    def item(start, code_name):
+        return {"document_id": stored_document, "text": "x" * 5,
+                "start_char": start, "end_char": start + 5, "code_name": code_name}
+
+    first = client.post("/api/v1/code-assignments/bulk",
+                        json=[item(0, "Alpha")], headers=auth_headers).json()
+    existing_id = first["results"][0]["code_assignment"]["id"]
+
+    payload = [item(10, "Beta"), item(0, "Alpha"), item(20, "Alpha"), item(10, "Beta")]
+    response = client.post("/api/v1/code-assignments/bulk",
+                           json=payload, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["summary"]["codes_created"] == 1
+    assert data["summary"]["total_errors"] == 0
+
+    ids = [r["code_assignment"]["id"] for r in data["results"]]
+    assert ids[1] == existing_id
+    assert ids[0] == ids[3]
+    assert len({ids[0], ids[1], ids[2]}) == 3
+
+    stored = {a.id: a for a in db.query(CodeAssignment).all()}
+    assert len(stored) == 3
+    for assignment_id, request_item in zip(ids, payload):
+        assert stored[assignment_id].start_char == request_item["start_char"]
+        assert stored[assignment_id].code.name == request_item["code_name"]
+
+
+def test_bulk_code_assignment_large_batch(client, auth_headers, db, stored_document):
+    """Test that a 10k item batch is inserted set-based with accurate ids"""
+    import time
+    from app.models.code_assignments import CodeAssignment
+
+    payload = [
+        {"document_id": stored_document, "text": "x", "start_char": i,
+         "end_char": i + 1, "code_name": f"Code {i % 50}"}
+        for i in range(10000)
+    ]
+
+    started = time.perf_counter()
+    response = client.post("/api/v1/code-assignments/bulk",
+                           json=payload, headers=auth_headers)
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["summary"]["successful_assignments"] == 10000
+    assert data["summary"]["codes_created"] == 50
+    starts = dict(db.query(CodeAssignment.id, CodeAssignment.start_char).all())
+    assert [starts[r["code_assignment"]["id"]] for r in data["results"]] == list(range(10000))
+    # Generous bound for slow CI machines; typically well under a second
+    assert elapsed < 5
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for local code clustering using pytest
+"""
+import time
+
+from app.services.ai.code_clustering import cluster_codes, co_occurrence_counts
+
+TOPICS = ["doctor communication", "family support", "waiting times", "medication costs",
+          "sleep problems", "work stress", "housing insecurity", "peer pressure"]
+
+
+def make_codes(per_topic):
+    return {
+        f"{topic} {t}x{i}": f"{topic} {t}x{i}\nParticipants describe {topic}"
+        for t, topic in enumerate(TOPICS) for i in range(per_topic)
+    }
+
+
+def test_small_codebooks_form_one_cluster():
+    """Codebooks within the cap are sent in a single call"""
+    codes = make_codes(2)
+    assert cluster_codes(codes, max_cluster_size=16) == [list(codes)]
+
+
+def test_clusters_follow_topics_and_respect_cap():
+    """Related codes end up together and no cluster exceeds the cap"""
+    codes = make_codes(5)
+    clusters = cluster_codes(codes, max_cluster_size=5)
+
+    assert sorted(key for cluster in clusters for key in cluster) == sorted(codes)
+    assert all(len(cluster) <= 5 for cluster in clusters)
+    for topic in TOPICS:
+        assert any(all(key.startswith(topic) for key in cluster) and len(cluster) == 5
+                   for cluster in clusters)
+
+
+def test_co_occurrence_links_overlapping_assignments():
+    """Codes assigned to overlapping text are counted as co-occurring"""
+    pairs, spans = co_occurrence_counts([
+        ("a", 1, 0, 50), ("b", 1, 10, 20), ("c", 1, 60, 70), ("c", 2, 0, 5), ("a", 2, 3, 9),
+    ])
+    assert pairs[("a", "b")] == 1
+    assert pairs[("a", "c")] == 1
+    assert ("b", "c") not in pairs
+    assert spans["a"] == 2
+
+
+def test_thousands_of_codes_cluster_in_bounded_time():
+    """Clustering stays fast enough to run before every theme generation"""
+    codes = {f"code {i}": f"code {i}\nword{i % 300} topic{i % 37} shared text" for i in range(3000)}
+    spans = [(f"code {i}", i % 50, i, i + 5) for i in range(3000)]
+
+    started = time.perf_counter()
+    clusters = cluster_codes(codes, spans, max_cluster_size=40)
+    elapsed = time.perf_counter() - started
+
+    assert all(len(cluster) <= 40 for cluster in clusters)
+    assert len(clusters) <= 2 * 3000 // 40 + 1
+    assert elapsed < 20
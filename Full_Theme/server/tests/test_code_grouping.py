@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for partitioned AI code grouping using pytest
+"""
+import re
+from types import SimpleNamespace
+
+from app.schemas.ai_services import CodeGroup, CodeGroupingOutput
+from app.services.ai import ai_code_grouping
+from app.services.ai.ai_code_grouping import AICodeGroupingService
+
+TOPICS = ["family support", "waiting times", "medication costs"]
+
+
+class FakeGroupingLLM:
+    """Groups every code of a call under its topic; fails for one topic"""
+
+    def __init__(self, failing_topic=None):
+        self.failing_topic = failing_topic
+        self.calls = []
+
+    def invoke(self, input_data):
+        names = re.findall(r"^Code: (.+)$", input_data["codes_summary"], re.MULTILINE)
+        self.calls.append(names)
+        topic = names[0].rsplit(" ", 1)[0]
+        if topic == self.failing_topic:
+            raise RuntimeError("boom")
+        # Partitions spell the same group differently
+        group_name = topic.title() if len(self.calls) % 2 else f"{topic.upper()}"
+        return CodeGroupingOutput(reasoning="by topic", groups=[CodeGroup(
+            group_name=group_name, group_description=topic, code_names=names, rationale=topic)])
+
+
+def make_session(per_topic):
+    codes_dict = {
+        f"{topic} {t}x{i}": {"name": f"{topic} {t}x{i}", "description": f"Participants describe {topic}"}
+        for t, topic in enumerate(TOPICS) for i in range(per_topic)
+    }
+    assignments = [{"code_name": name, "document_id": 1, "start_char": i * 10,
+                    "end_char": i * 10 + 5, "text": "quote"} for i, name in enumerate(codes_dict)]
+    return codes_dict, assignments
+
+
+def test_codes_are_grouped_in_bounded_partitions(monkeypatch):
+    """Large sessions are split into related partitions of limited size"""
+    monkeypatch.setattr(ai_code_grouping, "GROUPING_PARTITION_SIZE", 4)
+    codes_dict, assignments = make_session(4)
+    llm = FakeGroupingLLM()
+
+    AICodeGroupingService.perform_code_grouping_in_memory(
+        codes_dict, assignments, SimpleNamespace(code_grouping_llm=llm), provider="test")
+
+    assert len(llm.calls) == 3
+    assert all(len(call) <= 4 for call in llm.calls)
+    for topic in TOPICS:
+        names = {code["group_name"] for code in codes_dict.values() if code["name"].startswith(topic)}
+        assert len(names) == 1
+
+
+def test_failed_partition_does_not_drop_other_groups(monkeypatch):
+    """One failing call leaves only its own codes ungrouped"""
+    monkeypatch.setattr(ai_code_grouping, "GROUPING_PARTITION_SIZE", 4)
+    codes_dict, assignments = make_session(4)
+
+    AICodeGroupingService.perform_code_grouping_in_memory(
+        codes_dict, assignments,
+        SimpleNamespace(code_grouping_llm=FakeGroupingLLM(failing_topic="waiting times")),
+        provider="test")
+
+    grouped = {name for name, code in codes_dict.items() if code.get("group_name")}
+    assert grouped == {name for name in codes_dict if not name.startswith("waiting times")}
+
+
+def test_group_names_are_reconciled_across_partitions():
+    """Groups spelled differently in different partitions get one name"""
+    group_names = {}
+    assert AICodeGroupingService._reconcile_group_name(group_names, "Family Support") == "Family Support"
+    assert AICodeGroupingService._reconcile_group_name(group_names, "support, family") == "Family Support"
+    assert AICodeGroupingService._reconcile_group_name(group_names, "Waiting Times") == "Waiting Times"
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for relevance-filtered codebook context using pytest
+"""
+from types import SimpleNamespace
+
+from app.models.code import Code
+from app.models.codebook import Codebook
+from app.models.document import Document, DocumentType
+from app.models.project import Project
+from app.schemas.ai_services import DeductiveCodingOutput
+from app.services.ai.ai_code_generation import AICodeGenerationService
+from app.services.ai.ai_coding_utils import AICodingUtils
+from app.services.ai.code_relevance import CodeRelevanceIndex
+from app.services.ai.llm_service import LLMService
+
+
+def make_codes(count):
+    codes = [SimpleNamespace(name=f"Filler {i}", description=f"Unrelated topic number {i}")
+             for i in range(count)]
+    codes.append(SimpleNamespace(name="Access Barriers",
+                                 description="Difficulties accessing healthcare services"))
+    return codes
+
+
+def test_small_codebook_is_sent_in_full():
+    """Codebooks within top_k are sent unchanged, with descriptions"""
+    index = CodeRelevanceIndex(make_codes(2), top_k=5)
+    text = index.format_relevant("anything")
+    assert "- Filler 0: Unrelated topic number 0" in text
+    assert "- Access Barriers: Difficulties accessing healthcare services" in text
+    assert index.format_codebook() == "Filler 0; Filler 1; Access Barriers"
+
+
+def test_large_codebook_sends_top_k_and_names_of_rest():
+    """Only matching codes carry descriptions; the codebook lists names only"""
+    index = CodeRelevanceIndex(make_codes(100), top_k=3, names_limit=10)
+    text = index.format_relevant("Patients struggled to access healthcare")
+
+    relevant, others = index.select("Patients struggled to access healthcare")
+    assert relevant[0] == "Access Barriers"
+    assert len(others) == 101 - len(relevant)
+    assert "- Access Barriers: Difficulties accessing healthcare services" in text
+    assert "Unrelated topic" not in text
+    assert index.format_codebook().endswith("; ... and 91 more")
+
+
+def test_codebook_listing_only_grows_at_the_end():
+    """New codes are appended to the codebook listing in the order they were added"""
+    index = CodeRelevanceIndex(make_codes(5))
+    before = index.format_codebook()
+    index.update("Family Support", "Help from relatives")
+    index.update("Filler 0", "A new description")
+    assert index.format_codebook() == before + "; Family Support"
+
+
+def test_index_updates_incrementally():
+    """Codes created during a session become selectable for later chunks"""
+    index = CodeRelevanceIndex(make_codes(20), top_k=2)
+    assert "Family Support" not in index.format_relevant("support from family")
+
+    index.update("Family Support", "Help from relatives")
+    relevant, _ = index.select("support from family")
+    assert relevant[0] == "Family Support"
+
+    index.remove("Family Support")
+    assert "Family Support" not in index
+    assert len(index) == 21
+
+
+def test_deductive_prompts_list_every_code_of_a_large_codebook(db, test_user, monkeypatch):
+    """Codes past the initial coding names limit stay assignable in deductive coding"""
+    project = Project(title="Deductive Project", description="", owner_id=test_user["id"])
+    db.add(project)
+    db.commit()
+    codebook = Codebook(name="Large", user_id=test_user["id"], project_id=project.id)
+    db.add(codebook)
+    db.commit()
+    for code in make_codes(250):
+        db.add(Code(name=code.name, description=code.description, codebook_id=codebook.id,
+                    project_id=project.id, created_by_id=test_user["id"]))
+    document = Document(name="interview.txt", content="Patients waited weeks for an appointment. " * 5,
+                        document_type=DocumentType.TEXT, project_id=project.id,
+                        uploaded_by_id=test_user["id"])
+    db.add(document)
+    db.commit()
+
+    prompts = []
+
+    def capture(llm_service, service_type, input_data, provider, confidence):
+        prompts.append(input_data)
+        return DeductiveCodingOutput(reasoning="", assigned_codes=["Filler 240"], quote="",
+                                     confidence_scores=[0.9], rationale="")
+
+    monkeypatch.setattr(AICodingUtils, "make_escalating_llm_call", capture)
+    response = AICodeGenerationService.generate_deductive_codes_in_memory(
+        document_ids=[document.id], codebook_id=codebook.id, db=db, user_id=test_user["id"],
+        llm_service=LLMService(provider="fake"))
+
+    assert prompts
+    assert "Filler 240" in prompts[0]["codebook"].split("; ")
+    assert "more" not in prompts[0]["codebook"]
+    assert {assignment["code_name"] for assignment in response["assignments"]} == {"Filler 240"}
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Tests for code review API endpoints using pytest
+"""
+import time
+
+import pytest
+
+from app.models.code import Code
+from app.models.code_assignments import CodeAssignment
+from app.models.codebook import Codebook
+from app.models.document import Document, DocumentType
+from app.services.codebook_service import CodebookService
+
+
+@pytest.fixture
+def test_project(client, auth_headers):
+    """Create a test project for code review operations"""
+    response = client.post("/api/v1/projects/", json={
+        "title": "Code Review Test Project",
+        "description": "A project for testing the review workflow"
+    }, headers=auth_headers)
+    return response.json()
+
+
+def create_ai_sessions(db, project_id, user_id, sessions, assignments_per_session):
+    """Insert AI codebooks, each with one code and a mix of reviewed assignments"""
+    document = Document(name="interview.txt", content="x" * 10000,
+                        document_type=DocumentType.TEXT, project_id=project_id,
+                        uploaded_by_id=user_id)
+    db.add(document)
+    db.flush()
+
+    codebooks = []
+    statuses = ["pending", "accepted", "rejected"]
+    for session in range(sessions):
+        codebook = Codebook(name=f"AI Session {session + 1}", user_id=user_id,
+                            project_id=project_id, is_ai_generated=True,
+                            finalized=session % 2 == 1)
+        db.add(codebook)
+        db.flush()
+        code = Code(name=f"Code {session}", project_id=project_id,
+                    created_by_id=user_id, codebook_id=codebook.id)
+        db.add(code)
+        db.flush()
+        for index in range(assignments_per_session):
+            db.add(CodeAssignment(document_id=document.id, code_id=code.id,
+                                  start_char=index, end_char=index + 1, text_snapshot="x",
+                                  status=statuses[index % 3], created_by_id=user_id))
+        codebooks.append(codebook.id)
+    db.commit()
+    return codebooks
+
+
+def test_ai_codebook_summaries(client, auth_headers, db, test_user, test_project):
+    """Test that each AI codebook reports its own review progress"""
+    codebook_ids = create_ai_sessions(
+        db, test_project["id"], test_user["id"], sessions=2, assignments_per_session=4)
+    db.add(Codebook(name="Empty AI Session", user_id=test_user["id"],
+                    project_id=test_project["id"], is_ai_generated=True))
+    db.commit()
+
+    response = client.get(
+        f"/api/v1/code-review/projects/{test_project['id']}/ai-codebooks", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_count"] == 3
+
+    summaries = {c["id"]: c["assignment_summary"] for c in data["ai_codebooks"]}
+    assert summaries[codebook_ids[0]] == {
+        "total": 4, "pending": 2, "accepted": 1, "rejected": 1, "review_complete": False}
+    empty = next(c for c in data["ai_codebooks"] if c["name"] == "Empty AI Session")
+    assert empty["assignment_summary"]["total"] == 0
+    assert empty["assignment_summary"]["review_complete"] is True
+
+    response = client.get(
+        f"/api/v1/code-review/projects/{test_project['id']}/ai-codebooks",
+        params={"unfinalized_only": True}, headers=auth_headers)
+    assert {c["id"] for c in response.json()["ai_codebooks"]} == {
+        codebook_ids[0], empty["id"]}
+
+
+def test_ai_codebook_summaries_with_50_sessions(client, auth_headers, db, test_user, test_project, read_engine,
+                                                count_statements):
+    """Benchmark: 50 AI sessions are summarised with a constant number of queries"""
+    create_ai_sessions(db, test_project["id"], test_user["id"],
+                       sessions=50, assignments_per_session=60)
+
+    with count_statements(read_engine) as statements:
+        started = time.perf_counter()
+        response = client.get(
+            f"/api/v1/code-review/projects/{test_project['id']}/ai-codebooks", headers=auth_headers)
+        elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_count"] == 50
+    assert sum(c["assignment_summary"]["total"] for c in data["ai_codebooks"]) == 3000
+
+    assignment_queries = [s for s in statements if "code_assignments" in s]
+    assert len(assignment_queries) == 1
+    print(f"50 AI sessions summarised in {elapsed * 1000:.1f} ms with {len(statements)} queries")
+
+
+def test_review_queue_keyset_pagination(client, auth_headers, db, test_user, test_project):
+    """Test paging through a filtered review queue sorted by confidence"""
+    codebook_id = create_ai_sessions(
+        db, test_project["id"], test_user["id"], sessions=1, assignments_per_session=30)[0]
+    for assignment in db.query(CodeAssignment).all():
+        assignment.confidence = (assignment.start_char * 7) % 10 * 10  # ties on purpose
+    db.commit()
+
+    url = f"/api/v1/code-review/codebooks/{codebook_id}/assignments"
+    params = {"status": "pending", "sort": "confidence_desc", "limit": 4}
+    seen = []
+    cursor = None
+    while True:
+        page_params = dict(params, cursor=cursor) if cursor else params
+        data = client.get(url, params=page_params, headers=auth_headers).json()
+        assert len(data["assignments"]) <= 4
+        assert data["pagination"]["filtered_total"] == 10
+        assert data["summary"]["total"] == 30
+        seen.extend(data["assignments"])
+        cursor = data["pagination"]["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 10
+    assert len({a["id"] for a in seen}) == 10
+    assert all(a["status"] == "pending" for a in seen)
+    keys = [(-a["confidence"], a["id"]) for a in seen]
+    assert keys == sorted(keys)
+
+
+def test_review_queue_confidence_range(client, auth_headers, db, test_user, test_project):
+    """Test filtering the review queue by confidence range"""
+    codebook_id = create_ai_sessions(
+        db, test_project["id"], test_user["id"], sessions=1, assignments_per_session=10)[0]
+    for assignment in db.query(CodeAssignment).all():
+        assignment.confidence = assignment.start_char * 10
+    db.commit()
+
+    data = client.get(f"/api/v1/code-review/codebooks/{codebook_id}/assignments",
+                      params={"min_confidence": 30, "max_confidence": 60},
+                      headers=auth_headers).json()
+    assert sorted(a["confidence"] for a in data["assignments"]) == [30, 40, 50, 60]
+    assert data["pagination"]["next_cursor"] is None
+
+
+def test_accept_assignments_reports_per_id_outcomes(client, auth_headers, db, test_user, test_project):
+    """Accepting moves free codes, merges taken names and reports unknown ids"""
+    codebook_ids = create_ai_sessions(
+        db, test_project["id"], test_user["id"], sessions=3, assignments_per_session=2)
+    default_codebook = CodebookService.get_or_create_default_codebook(
+        db=db, user_id=test_user["id"], project_id=test_project["id"])
+    # Project-wide name validation would reject this through the API
+    existing_code = Code(name="Code 2", project_id=test_project["id"],
+                         created_by_id=test_user["id"], codebook_id=default_codebook.id)
+    db.add(existing_code)
+    db.commit()
+    existing = {"id": existing_code.id}
+
+    def assignments_of(codebook_id):
+        return db.query(CodeAssignment).join(Code).filter(
+            Code.codebook_id == codebook_id).order_by(CodeAssignment.id).all()
+
+    moved = assignments_of(codebook_ids[0])[0]
+    duplicate, repointed = assignments_of(codebook_ids[2])
+    # The default codebook's "Code 2" already covers the first span
+    db.add(CodeAssignment(document_id=duplicate.document_id, code_id=existing["id"],
+                          start_char=duplicate.start_char, end_char=duplicate.end_char,
+                          text_snapshot="x", created_by_id=test_user["id"]))
+    db.commit()
+    moved_code_id, ai_code_id = moved.code_id, duplicate.code_id
+
+    response = client.post("/api/v1/code-review/assignments/update-status", json={
+        "assignment_ids": [moved.id, duplicate.id, repointed.id, 999999],
+        "status": "accepted"
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["updated_count"] == 3
+    assert data["not_found_ids"] == [999999]
+    outcomes = {o["assignment_id"]: o for o in data["outcomes"]}
+    assert outcomes[999999]["outcome"] == "not_found"
+    assert outcomes[moved.id]["code_action"] == "moved"
+    assert outcomes[moved.id]["code_id"] == moved_code_id
+    assert outcomes[repointed.id]["code_action"] == "merged"
+    assert outcomes[repointed.id]["code_id"] == existing["id"]
+    assert outcomes[duplicate.id]["code_action"] == "duplicate"
+    assert outcomes[duplicate.id]["code_id"] == ai_code_id
+    assert [c["code_id"] for c in data["codes_moved_to_default"]] == [moved_code_id]
+
+    db.expire_all()
+    default_codebook_id = data["default_codebook"]["id"]
+    assert db.get(Code, moved_code_id).codebook_id == default_codebook_id
+    assert db.get(CodeAssignment, repointed.id).code_id == existing["id"]
+    assert {db.get(CodeAssignment, i).status for i in (moved.id, duplicate.id, repointed.id)} == {
+        "accepted"}
+
+
+def test_review_assignments_statement_count(client, auth_headers, db, test_user, test_project, count_statements):
+    """Reviewing many assignments does not issue a query per assignment"""
+    create_ai_sessions(db, test_project["id"], test_user["id"],
+                       sessions=2, assignments_per_session=200)
+    ids = [a.id for a in db.query(CodeAssignment.id).all()]
+
+    with count_statements(db.get_bind()) as statements:
+        response = client.post("/api/v1/code-review/assignments/update-status", json={
+            "assignment_ids": ids, "status": "accepted"
+        }, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["updated_count"] == 400
+    assert len(statements) < 25
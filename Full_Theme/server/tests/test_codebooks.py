@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for codebook service operations using pytest
+"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import Base
+from app.models.codebook import Codebook
+from app.models.project import Project
+from app.models.user import User
+from app.services.codebook_service import CodebookService
+
+
+@pytest.fixture
+def test_project(client, auth_headers):
+    """Create a test project for codebook operations"""
+    response = client.post("/api/v1/projects/", json={
+        "title": "Codebook Test Project",
+        "description": "A project for testing codebooks"
+    }, headers=auth_headers)
+    return response.json()
+
+
+def test_ai_session_codebooks_are_numbered_per_type(db, test_user, test_project):
+    """Each session type counts on its own and numbers are not reused"""
+    def create(session_type):
+        return CodebookService.get_or_create_ai_session_codebook(
+            db, user_id=test_user["id"], project_id=test_project["id"],
+            session_type=session_type).name
+
+    assert create("AI_initial_coding") == "AI_initial_coding_1"
+    assert create("AI_initial_coding") == "AI_initial_coding_2"
+    assert create("AI_deductive_coding") == "AI_deductive_coding_1"
+
+    db.query(Codebook).filter(Codebook.name == "AI_initial_coding_2").delete()
+    db.commit()
+    assert create("AI_initial_coding") == "AI_initial_coding_3"
+
+
+def test_ai_session_codebook_skips_taken_names(db, test_user, test_project):
+    """Names taken outside the counter are skipped instead of duplicated"""
+    db.add(Codebook(name="AI_initial_coding_1", user_id=test_user["id"],
+                    project_id=test_project["id"], is_ai_generated=True))
+    db.commit()
+
+    codebook = CodebookService.get_or_create_ai_session_codebook(
+        db, user_id=test_user["id"], project_id=test_project["id"],
+        session_type="AI_initial_coding")
+
+    assert codebook.name == "AI_initial_coding_2"
+    assert db.query(Codebook).filter(Codebook.is_ai_generated == True).count() == 2
+
+
+def test_default_codebook_rolls_back_with_the_caller(db, test_user, test_project):
+    """The default codebook is only flushed, so a failed caller leaves nothing behind"""
+    def default_codebooks():
+        return db.query(Codebook).filter(
+            Codebook.project_id == test_project["id"], Codebook.is_ai_generated == False).count()
+
+    assert default_codebooks() == 0
+    codebook = CodebookService.get_or_create_default_codebook(
+        db, user_id=test_user["id"], project_id=test_project["id"])
+    assert codebook.id is not None
+    assert CodebookService.get_or_create_default_codebook(
+        db, user_id=test_user["id"], project_id=test_project["id"]) is codebook
+    db.rollback()
+
+    assert default_codebooks() == 0
+
+
+def test_concurrent_ai_sessions_get_distinct_names(tmp_path):
+    """Parallel AI runs on separate connections never share a name"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}",
+                           connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with SessionLocal() as setup:
+        user = User(email="owner@example.com", hashed_password="x")
+        setup.add(user)
+        setup.flush()
+        project = Project(title="Concurrent", owner_id=user.id)
+        setup.add(project)
+        setup.commit()
+        user_id, project_id = user.id, project.id
+
+    names, errors = [], []
+
+    def run():
+        try:
+            with SessionLocal() as session:
+                names.append(CodebookService.get_or_create_ai_session_codebook(
+                    session, user_id=user_id, project_id=project_id,
+                    session_type="AI_initial_coding").name)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    assert errors == []
+    assert sorted(names) == sorted(f"AI_initial_coding_{i}" for i in range(1, 9))
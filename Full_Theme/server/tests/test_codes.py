@@ -4,6 +4,10 @@ Tests for codes API endpoints using pytest
 """
 import pytest
 
+from app.models.code import Code
+from app.models.codebook import Codebook
+from app.services.code_service import CodeService
+
 
 @pytest.fixture
 def test_project(client, auth_headers):
@@ -183,3 +187,57 @@ def test_empty_project_codes(client, auth_headers, test_project):
     assert isinstance(data, list)
     # Should be empty initially
     assert len(data) == 0
+
+
+def test_codes_without_codebook_share_default_codebook(db, test_user, test_project, count_statements):
+    """Codes flushed together resolve the default codebook once"""
+    with count_statements(db.get_bind()) as statements:
+        db.add_all([Code(name=f"Orphan {i}", project_id=test_project["id"],
+                         created_by_id=test_user["id"]) for i in range(200)])
+        db.commit()
+
+    codebooks = db.query(Codebook).filter(
+        Codebook.project_id == test_project["id"]).all()
+    assert len(codebooks) == 1
+    assert codebooks[0].is_ai_generated is False
+    assert db.query(Code).filter(Code.codebook_id == codebooks[0].id).count() == 200
+    # One lookup and one insert of the default codebook for all codes
+    assert len([s for s in statements if s.startswith("SELECT codebooks")]) == 1
+    assert len([s for s in statements if s.startswith("INSERT INTO codebooks")]) == 1
+
+    # A rolled back default codebook is not reused by the next flush
+    db.query(Codebook).delete()
+    db.query(Code).delete()
+    db.commit()
+    db.add(Code(name="Rolled back", project_id=test_project["id"],
+                created_by_id=test_user["id"]))
+    db.flush()
+    db.rollback()
+    db.add(Code(name="Kept", project_id=test_project["id"],
+                created_by_id=test_user["id"]))
+    db.commit()
+    assert db.query(Code).one().codebook.name == "Default Codebook"
+
+
+def test_create_codes_bulk(db, test_user, test_project):
+    """Bulk creation reuses existing names and inserts the rest in one flush"""
+    existing = CodeService.create_code(
+        db, name="Existing", project_id=test_project["id"], created_by_id=test_user["id"])
+    codebook = Codebook(name="AI Session 1", user_id=test_user["id"],
+                        project_id=test_project["id"], is_ai_generated=True)
+    db.add(codebook)
+    db.commit()
+
+    codes = CodeService.create_codes_bulk(
+        db, project_id=test_project["id"], created_by_id=test_user["id"],
+        codes=[{"name": "Existing"}, {"name": "New A", "description": "First"},
+               {"name": "New B", "is_auto_generated": True}, {"name": "New A"}],
+        codebook_id=codebook.id)
+    db.commit()
+
+    assert sorted(codes) == ["Existing", "New A", "New B"]
+    assert codes["Existing"].id == existing.id
+    assert codes["New A"].description == "First"
+    assert codes["New A"].codebook_id == codebook.id
+    assert codes["New B"].is_auto_generated is True
+    assert db.query(Code).filter(Code.project_id == test_project["id"]).count() == 3
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for document search API endpoint using pytest
+"""
+import pytest
+
+from app.models.document import Document, DocumentType
+from app.services.document import DocumentSearchService
+from app.utils.search_index import marked_positions
+
+
+@pytest.fixture(autouse=True)
+def fresh_search_index():
+    """Each test gets a fresh database, so cached project indexes must go too"""
+    DocumentSearchService.invalidate()
+    yield
+    DocumentSearchService.invalidate()
+
+
+@pytest.fixture
+def project_with_documents(client, auth_headers, db, test_user):
+    """Create a project with a few text documents inserted directly"""
+    response = client.post("/api/v1/projects/", json={
+        "title": "Search Project",
+        "description": "Project for search tests"
+    }, headers=auth_headers)
+    project_id = response.json()["id"]
+
+    contents = {
+        "interview_1.txt": "Participants described remote working as isolating. Working alone was hard.",
+        "interview_2.txt": "Remote work gave flexibility, but meetings ran long.",
+        "notes.txt": "Nothing relevant here about the office_party (50% attendance).",
+    }
+    for index, (name, content) in enumerate(contents.items()):
+        db.add(Document(
+            name=name,
+            content=content,
+            file_hash=f"hash-{index}",
+            document_type=DocumentType.TEXT,
+            project_id=project_id,
+            uploaded_by_id=test_user["id"]
+        ))
+    db.commit()
+    return project_id
+
+
+def test_search_ranks_documents_and_returns_offsets(client, auth_headers, project_with_documents):
+    """Word search returns ranked documents with hit offsets into the content"""
+    response = client.get(
+        f"/api/v1/documents/project/{project_with_documents}/search",
+        params={"q": "remote working"}, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["total"] == 2
+    names = [result["name"] for result in data["results"]]
+    assert names[0] == "interview_1.txt"
+
+    top = data["results"][0]
+    assert top["hit_count"] == 3
+    content = "Participants described remote working as isolating. Working alone was hard."
+    for hit in top["hits"]:
+        assert content[hit["start_char"]:hit["end_char"]].lower() in {"remote", "working"}
+        assert content[hit["start_char"]:hit["end_char"]] in hit["snippet"]
+
+
+def test_search_pagination(client, auth_headers, project_with_documents):
+    """Skip and limit page through ranked results while total stays constant"""
+    url = f"/api/v1/documents/project/{project_with_documents}/search"
+    first = client.get(url, params={"q": "remote", "limit": 1},
+                       headers=auth_headers).json()
+    second = client.get(url, params={"q": "remote", "limit": 1, "skip": 1},
+                        headers=auth_headers).json()
+
+    assert first["total"] == second["total"] == 2
+    assert len(first["results"]) == len(second["results"]) == 1
+    assert first["results"][0]["document_id"] != second["results"][0]["document_id"]
+
+
+def test_substring_search_escapes_wildcards(client, auth_headers, project_with_documents):
+    """Substring mode treats % and _ literally"""
+    url = f"/api/v1/documents/project/{project_with_documents}/search"
+    data = client.get(url, params={"q": "50%", "mode": "substring"},
+                      headers=auth_headers).json()
+    assert data["total"] == 1
+    assert data["results"][0]["name"] == "notes.txt"
+
+    data = client.get(url, params={"q": "e_p", "mode": "substring"},
+                      headers=auth_headers).json()
+    assert data["total"] == 1
+
+    data = client.get(url, params={"q": "%", "mode": "substring"},
+                      headers=auth_headers).json()
+    assert data["total"] == 1
+
+
+def test_search_picks_up_new_documents(client, auth_headers, db, test_user, project_with_documents):
+    """Documents added after the index was built are searchable"""
+    url = f"/api/v1/documents/project/{project_with_documents}/search"
+    assert client.get(url, params={"q": "burnout"},
+                      headers=auth_headers).json()["total"] == 0
+
+    db.add(Document(
+        name="interview_3.txt",
+        content="Burnout came up repeatedly.",
+        file_hash="hash-new",
+        document_type=DocumentType.TEXT,
+        project_id=project_with_documents,
+        uploaded_by_id=test_user["id"]
+    ))
+    db.commit()
+
+    data = client.get(url, params={"q": "burnout"}, headers=auth_headers).json()
+    assert data["total"] == 1
+    assert data["results"][0]["hits"][0]["start_char"] == 0
+
+
+def test_search_without_access_returns_empty(client, auth_headers, project_with_documents):
+    """Searching a project the user cannot access returns no results"""
+    response = client.get(
+        "/api/v1/documents/project/99999/search",
+        params={"q": "remote"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["total"] == 0
+
+
+def test_word_hits_fall_back_to_term_substrings(client, auth_headers, project_with_documents, monkeypatch):
+    """A matched document never comes back without hits, whatever the stemmer disagreement"""
+    monkeypatch.setattr("app.services.document.search.find_term_positions", lambda content, terms: [])
+    response = client.get(
+        f"/api/v1/documents/project/{project_with_documents}/search",
+        params={"q": "remote"}, headers=auth_headers)
+
+    for result in response.json()["results"]:
+        assert result["hits"]
+        assert all(hit["snippet"] for hit in result["hits"])
+
+
+def test_headline_markers_map_to_content_offsets():
+    """Offsets of ts_headline highlights point into the original content"""
+    content = "Remote work, remotely."
+    marked = "\ue000Remote\ue001 work, \ue000remotely\ue001."
+
+    positions = marked_positions(marked, content)
+
+    assert [content[start:end] for start, end in positions] == ["Remote", "remotely"]
+    assert marked_positions("\ue000Remote\ue001 work", content) is None
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental AI coding bookkeeping using pytest
+"""
+import pytest
+
+from app.models.ai_coded_chunk import AICodedChunk
+from app.models.codebook import Codebook
+from app.models.document import Document, DocumentType
+from app.services.ai.ai_coding_ledger import AICodingLedger
+from app.services.ai.ai_coding_service import AICodingService
+from app.services.ai.chunk_dedup import ChunkOccurrence, UniqueChunk
+from app.services.codebook_service import CodebookService
+
+MODEL = "google_genai/gemini-2.0-flash"
+
+
+@pytest.fixture
+def test_project(client, auth_headers):
+    response = client.post("/api/v1/projects/", json={
+        "title": "Incremental Coding Project",
+        "description": "A project for testing incremental coding"
+    }, headers=auth_headers)
+    return response.json()
+
+
+def make_chunks(document_ids, project_id, chunk_hash="c1"):
+    return [UniqueChunk(text="Patients felt unheard.", occurrences=[
+        ChunkOccurrence(document_id=document_id, project_id=project_id,
+                        chunk="Patients felt unheard.", chunk_start=0,
+                        document_hash=f"file-{document_id}", chunk_hash=chunk_hash)
+        for document_id in document_ids
+    ])]
+
+
+def test_only_new_occurrences_are_dispatched(db, test_user, test_project):
+    """Chunks coded before with the same model and prompt are skipped"""
+    project_id, user_id = test_project["id"], test_user["id"]
+    documents = [Document(name=f"doc{i}.txt", content="Patients felt unheard.",
+                          document_type=DocumentType.TEXT, project_id=project_id,
+                          uploaded_by_id=user_id) for i in range(2)]
+    db.add_all(documents)
+    db.flush()
+    first, second = documents[0].id, documents[1].id
+    codebook = CodebookService.get_or_create_ai_session_codebook(
+        db=db, user_id=user_id, project_id=project_id, session_type="AI_initial_coding")
+
+    AICodingLedger.record(db, make_chunks([first], project_id)[0].occurrences,
+                          user_id=user_id, codebook_id=codebook.id, model=MODEL, prompt_version="1")
+    db.commit()
+
+    remaining = AICodingLedger.filter_uncoded(
+        db, make_chunks([first, second], project_id), user_id, MODEL, "1")
+    assert [o.document_id for o in remaining[0].occurrences] == [second]
+
+    # A new prompt version, model or chunk content is new work
+    assert len(AICodingLedger.filter_uncoded(
+        db, make_chunks([first], project_id), user_id, MODEL, "2")) == 1
+    assert len(AICodingLedger.filter_uncoded(
+        db, make_chunks([first], project_id), user_id, "openai/gpt-4o", "1")) == 1
+    assert len(AICodingLedger.filter_uncoded(
+        db, make_chunks([first], project_id, chunk_hash="c2"), user_id, MODEL, "1")) == 1
+
+    # Deleting the session codebook makes its chunks due again
+    db.delete(codebook)
+    db.commit()
+    assert len(AICodingLedger.filter_uncoded(
+        db, make_chunks([first], project_id), user_id, MODEL, "1")) == 1
+
+
+def test_incremental_session_reuses_latest_codebook(db, test_user, test_project):
+    """New codes are merged into the latest unfinalized session codebook"""
+    project_id, user_id = test_project["id"], test_user["id"]
+    first = CodebookService.get_or_create_ai_session_codebook(
+        db=db, user_id=user_id, project_id=project_id, session_type="AI_initial_coding")
+
+    reused = CodebookService.get_or_create_ai_session_codebook(
+        db=db, user_id=user_id, project_id=project_id, session_type="AI_initial_coding",
+        reuse_latest=True)
+    assert reused.id == first.id
+
+    first.finalized = True
+    db.commit()
+    fresh = CodebookService.get_or_create_ai_session_codebook(
+        db=db, user_id=user_id, project_id=project_id, session_type="AI_initial_coding",
+        reuse_latest=True)
+    assert fresh.id != first.id
+    assert db.query(Codebook).filter(Codebook.project_id == project_id,
+                                     Codebook.is_ai_generated == True).count() == 2
+
+
+def test_normal_run_records_coded_chunks(db, test_user, test_project):
+    """A first incremental run after a normal one has nothing left to code"""
+    project_id, user_id = test_project["id"], test_user["id"]
+    document = Document(name="interview.txt", content="Patients felt unheard by their doctors. " * 20,
+                        document_type=DocumentType.TEXT, project_id=project_id, uploaded_by_id=user_id)
+    db.add(document)
+    db.commit()
+
+    first = AICodingService.generate_code(
+        document_ids=[document.id], db=db, user_id=user_id, provider="fake")
+    assert first["summary"]["chunks_coded"] > 0
+    assert db.query(AICodedChunk).filter(AICodedChunk.document_id == document.id).count() > 0
+
+    second = AICodingService.generate_code(
+        document_ids=[document.id], db=db, user_id=user_id, provider="fake", incremental=True)
+    assert second["results"] == []
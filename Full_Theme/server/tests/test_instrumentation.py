@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for connection pool instrumentation using pytest
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.db.pool_metrics import InstrumentedQueuePool
+
+
+def test_db_pool_endpoint_requires_token(client):
+    """Test that pool metrics are not exposed anonymously"""
+    response = client.get("/api/v1/instrumentation/db-pool")
+    assert response.status_code == 401
+
+
+def test_db_pool_endpoint(client, auth_headers):
+    """Test that pool metrics are reported"""
+    response = client.get("/api/v1/instrumentation/db-pool",
+                          headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    for key in ("pool_size", "max_overflow", "checked_out", "overflow",
+                "checkouts", "checkout_timeouts", "avg_wait_ms", "max_hold_ms"):
+        assert key in data
+
+
+def test_instrumented_pool_records_waits_and_timeouts(tmp_path):
+    """Test checkout counting, overflow and timeout tracking"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05
+    )
+    pool = engine.pool
+
+    first = engine.connect()
+    second = engine.connect()
+    first.execute(text("SELECT 1"))
+    stats = pool.stats()  # type: ignore
+    assert stats["checked_out"] == 2
+    assert stats["overflow"] == 1
+
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+
+    second.close()
+    first.close()
+    stats = pool.stats()  # type: ignore
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["checkout_timeouts"] == 1
+    assert stats["max_wait_ms"] >= 50
+    engine.dispose()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Tests for master codebook operations using pytest
+"""
+import time
+
+import numpy as np
+import pytest
+
+from app.models.code import Code
+from app.models.code_assignments import CodeAssignment
+from app.models.codebook import Codebook
+from app.models.document import Document, DocumentType
+from app.models.user import User
+from app.services.master_codebook_service import MasterCodebookService
+from app.utils.similarity import MinHasher
+
+
+@pytest.fixture
+def test_project(client, auth_headers):
+    """Create a test project for master codebook operations"""
+    response = client.post("/api/v1/projects/", json={
+        "title": "Master Codebook Test Project",
+        "description": "A project for merging collaborator codebooks"
+    }, headers=auth_headers)
+    return response.json()
+
+
+@pytest.fixture
+def collaborator(db):
+    """A second user owning one of the finalized codebooks"""
+    user = User(email="collaborator@example.com", hashed_password="x",
+                name="Collaborator")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def add_finalized_codebook(db, project_id, user_id, codes, name="Finalized"):
+    """Insert a finalized codebook holding (name, description) codes"""
+    codebook = Codebook(name=name, user_id=user_id, project_id=project_id,
+                        finalized=True)
+    db.add(codebook)
+    db.flush()
+    db.add_all([Code(name=code_name, description=description, project_id=project_id,
+                     created_by_id=user_id, codebook_id=codebook.id)
+                for code_name, description in codes])
+    db.commit()
+    return codebook
+
+
+def test_detect_near_duplicate_codes(db, test_user, test_project, collaborator):
+    """Spelling variants across collaborators are grouped, unrelated codes are not"""
+    add_finalized_codebook(db, test_project["id"], test_user["id"], [
+        ("Work-life balance", "Tension between job and family"),
+        ("Remote onboarding", None),
+        ("Team trust", "Confidence in colleagues"),
+    ])
+    add_finalized_codebook(db, test_project["id"], collaborator.id, [
+        ("Work life balance", "Balancing work and home"),
+        ("Worklife balance", None),
+        ("Salary concerns", None),
+    ])
+    # Draft codebooks are not part of the merge
+    db.add(Codebook(name="Draft", user_id=collaborator.id,
+                    project_id=test_project["id"]))
+    db.commit()
+
+    conflicts = MasterCodebookService.detect_code_conflicts(db, test_project["id"])
+
+    assert len(conflicts) == 1
+    conflict = conflicts[0]
+    assert sorted(code["name"] for code in conflict["codes"]) == [
+        "Work life balance", "Work-life balance", "Worklife balance"]
+    assert conflict["conflicting_name"] == "work life balance"
+    assert conflict["user_count"] == 2
+    assert conflict["exact_match"] is False
+    assert 0.5 <= conflict["similarity"] <= 1.0
+
+
+def test_exact_name_matches_rank_first(db, test_user, test_project, collaborator):
+    """Identical names always conflict and outrank weaker matches"""
+    add_finalized_codebook(db, test_project["id"], test_user["id"], [
+        ("Isolation", "Feeling alone"),
+        ("Burnout symptoms", None),
+    ])
+    add_finalized_codebook(db, test_project["id"], collaborator.id, [
+        ("isolation", "Working without contact to others"),
+        ("Burnout symptom", None),
+    ])
+
+    conflicts = MasterCodebookService.detect_code_conflicts(db, test_project["id"])
+
+    assert [c["conflicting_name"] for c in conflicts][0] == "isolation"
+    assert conflicts[0]["exact_match"] is True
+    assert conflicts[0]["similarity"] == 1.0
+    assert len(conflicts) == 2
+    assert len(MasterCodebookService.detect_code_conflicts(
+        db, test_project["id"], limit=1)) == 1
+
+
+def test_detect_conflicts_scales_to_many_codes(db, test_user, test_project, collaborator):
+    """Ten thousand codes are clustered without pairwise comparison"""
+    half = 5000
+    add_finalized_codebook(db, test_project["id"], test_user["id"], [
+        (f"Theme {i} of participant answers", None) for i in range(half)])
+    add_finalized_codebook(db, test_project["id"], collaborator.id, [
+        (f"theme {i} of participant answers", None) for i in range(half)])
+
+    started = time.perf_counter()
+    conflicts = MasterCodebookService.detect_code_conflicts(
+        db, test_project["id"], threshold=0.95)
+    elapsed = time.perf_counter() - started
+
+    assert sum(c["conflict_count"] for c in conflicts) >= 2 * half
+    assert elapsed < 10
+
+
+def test_minhash_batches_are_bounded_by_shingle_count():
+    """Small batches and texts split across batches give the same signatures"""
+    consent = "I confirm that I have read the information sheet and consent to take part."
+    texts = [consent, "", "Patients felt unheard by their doctors.", consent * 3]
+    hasher = MinHasher()
+
+    expected, expected_content = hasher.signatures(texts)
+    bounded, bounded_content = hasher.signatures(texts, max_shingles=7)
+
+    assert np.array_equal(bounded, expected)
+    assert np.array_equal(bounded_content, expected_content)
+    assert bounded_content.tolist() == [True, False, True, True]
+
+
+def add_assignments(db, document, codes, user_id, spans):
+    """Assign every code to the same (start, end) spans"""
+    db.add_all([CodeAssignment(document_id=document.id, code_id=code.id, start_char=start,
+                               end_char=end, text_snapshot="x", status="accepted",
+                               created_by_id=user_id)
+                for code in codes for start, end in spans])
+    db.commit()
+
+
+@pytest.fixture
+def interview(db, test_user, test_project):
+    document = Document(name="interview.txt", content="x" * 1000,
+                        document_type=DocumentType.TEXT, project_id=test_project["id"],
+                        uploaded_by_id=test_user["id"])
+    db.add(document)
+    db.commit()
+    return document
+
+
+def test_create_master_codebook_merges_names(db, test_user, test_project, collaborator, interview):
+    """Same-named codes become one master code carrying all distinct spans"""
+    mine = add_finalized_codebook(db, test_project["id"], test_user["id"], [
+        ("Isolation", "Feeling alone"), ("Trust", None)])
+    theirs = add_finalized_codebook(db, test_project["id"], collaborator.id, [
+        ("isolation ", "Working alone"), ("Salary", None)])
+    my_codes = sorted(mine.codes, key=lambda code: code.id)
+    their_codes = sorted(theirs.codes, key=lambda code: code.id)
+    add_assignments(db, interview, my_codes, test_user["id"], [(0, 5), (10, 20)])
+    add_assignments(db, interview, their_codes, test_user["id"], [(0, 5), (30, 40)])
+
+    selection = {mine.id: [code.id for code in my_codes],
+                 theirs.id: [code.id for code in their_codes]}
+    result = MasterCodebookService.create_master_codebook(
+        db, test_project["id"], test_user["id"], selection, include_assignments=True)
+
+    master = result["master_codebook"]
+    assert result["codes_copied"] == 3
+    master_codes = {code.name: code for code in master.codes}
+    assert sorted(master_codes) == ["Isolation", "Salary", "Trust"]
+    assert master_codes["Isolation"].description == "Feeling alone"
+
+    spans = {(a.code.name, a.start_char) for a in db.query(CodeAssignment).join(Code).filter(
+        Code.codebook_id == master.id)}
+    assert spans == {("Isolation", 0), ("Isolation", 10), ("Isolation", 30),
+                     ("Trust", 0), ("Trust", 10), ("Salary", 0), ("Salary", 30)}
+    assert result["assignments_copied"] == 7
+
+    first_only = MasterCodebookService.create_master_codebook(
+        db, test_project["id"], test_user["id"], selection, master_name="First",
+        include_assignments=True, on_name_conflict="first")
+    assert first_only["assignments_copied"] == 6
+
+
+def test_create_master_codebook_statement_count(db, test_user, test_project, collaborator, interview,
+                                                count_statements):
+    """Thousands of codes are copied with one statement per table"""
+    mine = add_finalized_codebook(db, test_project["id"], test_user["id"], [
+        (f"Code {i}", None) for i in range(2000)])
+    theirs = add_finalized_codebook(db, test_project["id"], collaborator.id, [
+        (f"Other {i}", None) for i in range(2000)])
+    add_assignments(db, interview, mine.codes, test_user["id"], [(0, 5)])
+    selection = {mine.id: [code.id for code in mine.codes],
+                 theirs.id: [code.id for code in theirs.codes]}
+
+    with count_statements(db.get_bind()) as statements:
+        started = time.perf_counter()
+        result = MasterCodebookService.create_master_codebook(
+            db, test_project["id"], test_user["id"], selection, include_assignments=True)
+        elapsed = time.perf_counter() - started
+
+    assert result["codes_copied"] == 4000
+    assert result["assignments_copied"] == 2000
+    assert len([s for s in statements if s.startswith("INSERT")]) == 3
+    assert elapsed < 1
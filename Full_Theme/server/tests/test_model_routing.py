@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for per-phase model routing, escalation and phase metrics using pytest
+"""
+from types import SimpleNamespace
+
+from app.services.ai.ai_coding_utils import AICodingUtils
+from app.services.ai.model_routing import ModelRouter, PhaseMetrics
+
+PRICES = {"cheap": {"input": 1.0, "output": 2.0}, "strong": {"input": 10.0, "output": 20.0}}
+
+
+class FakeChain:
+    """Answers with a fixed confidence and records the calls it gets"""
+
+    def __init__(self, confidence):
+        self.confidence = confidence
+        self.calls = 0
+
+    def invoke(self, input_data, config=None):
+        self.calls += 1
+        return SimpleNamespace(confidence=self.confidence)
+
+
+def make_service(cheap_confidence, escalation_model="strong"):
+    router = ModelRouter(default_model="cheap", escalation_model=escalation_model,
+                         escalation_confidence=0.6)
+    strong = FakeChain(0.9)
+    return SimpleNamespace(
+        router=router,
+        metrics=PhaseMetrics(PRICES),
+        initial_coding_llm=FakeChain(cheap_confidence),
+        escalation_llm=lambda service_type: strong,
+        strong=strong
+    )
+
+
+def call(service):
+    return AICodingUtils.make_escalating_llm_call(
+        service, "initial_coding", {"text": "..."}, provider="test",
+        confidence=lambda response: response.confidence)
+
+
+def test_service_types_use_configured_models():
+    """Unlisted service types fall back to the default model"""
+    router = ModelRouter("strong", {"code_grouping": "cheap"})
+    assert router.model_for("code_grouping") == "cheap"
+    assert router.model_for("initial_coding") == "strong"
+
+
+def test_pinned_model_overrides_routing():
+    """A requested model runs every phase"""
+    router = ModelRouter("strong", {"code_grouping": "cheap"}, model_name="pinned")
+    assert router.model_for("code_grouping") == "pinned"
+    assert router.model_for("initial_coding") == "pinned"
+
+
+def test_low_confidence_responses_are_escalated():
+    """Responses below the threshold are re-run on the escalation model"""
+    service = make_service(cheap_confidence=0.3)
+
+    response = call(service)
+
+    assert response.confidence == 0.9
+    phase = service.metrics.summary()["initial_coding"]
+    assert phase["calls"] == 2
+    assert phase["escalations"] == 1
+    assert phase["models"] == {"cheap": 1, "strong": 1}
+
+
+def test_confident_responses_are_not_escalated():
+    """Confident responses and unconfigured escalation keep the routed model"""
+    service = make_service(cheap_confidence=0.8)
+    assert call(service).confidence == 0.8
+    assert service.strong.calls == 0
+
+    service = make_service(cheap_confidence=0.3, escalation_model=None)
+    assert call(service).confidence == 0.3
+    assert service.strong.calls == 0
+
+
+def test_phase_metrics_estimate_cost():
+    """Token counts are priced per model and summed per phase"""
+    metrics = PhaseMetrics(PRICES)
+    metrics.record("code_grouping", "cheap", 0.5, input_tokens=1_000_000, output_tokens=500_000)
+    metrics.record("code_grouping", "strong", 1.5, input_tokens=100_000, failed=True)
+
+    phase = metrics.summary()["code_grouping"]
+    assert phase["calls"] == 2
+    assert phase["failures"] == 1
+    assert phase["avg_seconds"] == 1.0
+    assert phase["cost_usd"] == 3.0
+
+
+def test_rate_limit_waits_are_timed_apart_from_calls(monkeypatch):
+    """Backoff sleeps before a retry are reported separately from call time"""
+    class RateLimitedOnce(FakeChain):
+        def invoke(self, input_data, config=None):
+            self.calls += 1
+            if self.calls == 1:
+                raise ValueError("429 Too Many Requests")
+            return SimpleNamespace(confidence=self.confidence)
+
+    monkeypatch.setattr("app.utils.rate_limiter.time.sleep", lambda seconds: None)
+    service = make_service(cheap_confidence=0.9)
+    service.initial_coding_llm = RateLimitedOnce(0.9)
+
+    AICodingUtils.make_rate_limited_llm_call(
+        service, "initial_coding", {"text": "..."}, provider="backoff-test")
+
+    phase = service.metrics.summary()["initial_coding"]
+    assert phase["calls"] == 2
+    assert phase["failures"] == 1
+    assert phase["backoff_seconds"] == 5.0
+    assert phase["seconds"] < 1.0
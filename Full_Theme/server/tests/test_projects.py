@@ -166,3 +166,43 @@ def test_unauthorized_project_access(client, test_user):
         f"/api/v1/projects/{project_id}", headers=second_headers)
     # Should return 404 rather than revealing project exists
     assert response.status_code == 404
+
+
+def test_project_list_counts_in_single_query(client, auth_headers, db, test_user, read_engine,
+                                             count_statements):
+    """Test that the project list returns counts without per-project queries"""
+    from app.models.document import Document, DocumentType
+    from app.models.user import User
+
+    collaborator = User(email="collaborator@example.com", hashed_password="x")
+    db.add(collaborator)
+    db.commit()
+
+    project_ids = []
+    for index in range(5):
+        response = client.post("/api/v1/projects/", json={
+            "title": f"Counted Project {index}",
+            "description": "Project with counts"
+        }, headers=auth_headers)
+        project_ids.append(response.json()["id"])
+
+    for _ in range(3):
+        db.add(Document(name="doc.txt", content="text", document_type=DocumentType.TEXT,
+                        project_id=project_ids[0], uploaded_by_id=test_user["id"]))
+    db.commit()
+    client.post(f"/api/v1/projects/{project_ids[1]}/collaborators",
+                params={"collaborator_email": "collaborator@example.com"},
+                headers=auth_headers)
+
+    with count_statements(read_engine) as statements:
+        response = client.get("/api/v1/projects/", headers=auth_headers)
+
+    assert response.status_code == 200
+    summaries = {p["id"]: p for p in response.json()}
+    assert summaries[project_ids[0]]["document_count"] == 3
+    assert summaries[project_ids[1]]["collaborator_count"] == 1
+    assert summaries[project_ids[2]]["document_count"] == 0
+
+    project_queries = [s for s in statements if "FROM projects" in s]
+    assert len(project_queries) == 1
+    assert not any("FROM documents" in s and "FROM projects" not in s for s in statements)
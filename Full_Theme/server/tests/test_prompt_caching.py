@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the cacheable prompt prefix layout and cached token accounting using pytest
+"""
+from langchain_core.prompts import HumanMessagePromptTemplate
+
+from app.models.document import Document, DocumentType
+from app.models.project import Project
+from app.services.ai.ai_code_generation import AICodeGenerationService
+from app.services.ai.ai_coding_utils import AICodingUtils
+from app.services.ai.code_relevance import CodeRelevanceIndex
+from app.services.ai.llm_service import LLMService
+from app.services.ai.model_routing import PhaseMetrics
+
+
+def render(service, service_type, inputs):
+    prompt, _ = service._prompts[service_type]
+    return prompt.invoke(inputs).to_messages()
+
+
+def test_coding_prompt_prefix_is_identical_across_chunks():
+    """Only the last message changes from one chunk to the next"""
+    service = LLMService(provider="fake")
+    index = CodeRelevanceIndex()
+    index.update("Waiting Times", "Delays before care")
+    index.update("Family Support", "Help from relatives")
+
+    renders = [render(service, "initial_coding", {
+        "text": text, "research_context": "aims: access to care",
+        "codebook": index.format_codebook(), "existing_codes": index.format_relevant(text)
+    }) for text in ("Patients waited weeks.", "Relatives helped at home.")]
+
+    assert renders[0][:-1] == renders[1][:-1]
+    assert renders[0][-1] != renders[1][-1]
+    assert "Patients waited weeks." in renders[0][-1].content
+
+
+def test_codes_created_during_a_run_keep_the_prefix_unchanged(db, test_user, monkeypatch):
+    """Every chunk of a run gets the codebook listing taken before the first chunk"""
+    project = Project(title="Caching Project", description="", owner_id=test_user["id"])
+    db.add(project)
+    db.commit()
+    content = "".join(f"Interview {i}: patients waited {i} weeks for an appointment. " * 40
+                      for i in range(4))
+    document = Document(name="interview.txt", content=content, document_type=DocumentType.TEXT,
+                        project_id=project.id, uploaded_by_id=test_user["id"])
+    db.add(document)
+    db.commit()
+
+    listings = []
+    make_call = AICodingUtils.make_escalating_llm_call
+
+    def recording_call(**kwargs):
+        listings.append(kwargs["input_data"]["codebook"])
+        return make_call(**kwargs)
+
+    monkeypatch.setattr(AICodingUtils, "make_escalating_llm_call", recording_call)
+    response = AICodeGenerationService.generate_initial_codes_in_memory(
+        document_ids=[document.id], db=db, user_id=test_user["id"], provider="fake")
+
+    assert len(listings) > 1
+    assert response["codes_dict"]
+    assert set(listings) == {"No codes available."}
+
+
+def test_prefix_is_marked_for_providers_with_explicit_caching():
+    """Anthropic gets a cache_control breakpoint; other providers get plain text"""
+    marked = LLMService.prefix_template(HumanMessagePromptTemplate, "Context: {context}", "anthropic")
+    plain = LLMService.prefix_template(HumanMessagePromptTemplate, "Context: {context}", "google_genai")
+
+    assert marked.format(context="x").content == [
+        {"type": "text", "text": "Context: x", "cache_control": {"type": "ephemeral"}}]
+    assert plain.format(context="x").content == "Context: x"
+
+
+def test_cached_input_tokens_are_priced_separately():
+    """Cached prompt tokens use the cached input price and are reported apart"""
+    metrics = PhaseMetrics({"model": {"input": 1.0, "cached_input": 0.25, "output": 2.0}})
+    metrics.record("initial_coding", "model", 1.0, input_tokens=1_000_000,
+                   output_tokens=0, cached_input_tokens=800_000)
+
+    phase = metrics.summary()["initial_coding"]
+    assert phase["uncached_input_tokens"] == 200_000
+    assert phase["cache_hit_rate"] == 0.8
+    assert phase["cost_usd"] == 0.4
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for read-replica routing using pytest
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.routing import LAST_WRITE_KEY, RoutingSession, read_only, track_user
+from app.db.session import Base
+from app.models.project import Project
+from app.models.user import User
+
+
+@read_only
+def list_titles(db):
+    return sorted(p.title for p in db.query(Project).all())
+
+
+@pytest.fixture
+def routed_session(tmp_path):
+    """Sessions over a primary and a stand-in replica holding different rows"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, title in ((primary, "on primary"), (replica, "on replica")):
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            user = User(email="replica@example.com", hashed_password="x")
+            db.add(user)
+            db.flush()
+            db.add(Project(title=title, owner_id=user.id))
+            db.commit()
+
+    Session = sessionmaker(autoflush=False, bind=primary,
+                           class_=RoutingSession, replica_bind=replica)
+    yield Session
+    primary.dispose()
+    replica.dispose()
+
+
+def test_read_only_calls_use_replica(routed_session):
+    """Only reads inside read_only service calls go to the replica"""
+    with routed_session() as db:
+        assert list_titles(db) == ["on replica"]
+        assert sorted(p.title for p in db.query(Project).all()) == ["on primary"]
+
+
+def test_uncommitted_writes_stay_on_primary(routed_session):
+    """A session with flushed writes reads them back from the primary"""
+    with routed_session() as db:
+        db.add(Project(title="new", owner_id=1))
+        db.flush()
+        assert list_titles(db) == ["new", "on primary"]
+
+
+def authenticate(db, user_id=1):
+    """What get_current_user does: load the user from the primary and track them"""
+    track_user(db, db.get(User, user_id))
+
+
+def test_read_your_writes_window(routed_session, monkeypatch):
+    """A user who just committed keeps reading from the primary until the window ends"""
+    monkeypatch.setattr(settings, "DB_READ_YOUR_WRITES_SECONDS", 60.0)
+    with routed_session() as db:
+        authenticate(db)
+        db.add(Project(title="new", owner_id=1))
+        db.commit()
+        assert list_titles(db) == ["new", "on primary"]
+
+    # A later request, possibly in another worker, sees the write time on the users row
+    with routed_session() as db:
+        authenticate(db)
+        assert db.info[LAST_WRITE_KEY] is not None
+        assert list_titles(db) == ["new", "on primary"]
+
+    with routed_session() as db:
+        assert list_titles(db) == ["on replica"]
+
+    monkeypatch.setattr(settings, "DB_READ_YOUR_WRITES_SECONDS", 0.0)
+    with routed_session() as db:
+        authenticate(db)
+        assert list_titles(db) == ["on replica"]
+
+
+def test_rollback_does_not_pin_user(routed_session):
+    """Rolled back writes do not keep the user on the primary"""
+    with routed_session() as db:
+        authenticate(db)
+        db.add(Project(title="discarded", owner_id=1))
+        db.flush()
+        db.rollback()
+        db.commit()
+        assert db.get(User, 1).last_write_at is None
+        assert list_titles(db) == ["on replica"]
+
+
+def test_no_write_tracking_without_replica(tmp_path):
+    """Without a replica, commits do not touch the users row"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    Base.metadata.create_all(bind=primary)
+    Session = sessionmaker(autoflush=False, bind=primary, class_=RoutingSession)
+    with Session() as db:
+        db.add(User(email="single@example.com", hashed_password="x"))
+        db.commit()
+        authenticate(db)
+        db.add(Project(title="new", owner_id=1))
+        db.commit()
+        assert db.get(User, 1).last_write_at is None
+    primary.dispose()
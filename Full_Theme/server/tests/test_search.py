@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for project search API endpoint using pytest
+"""
+import pytest
+
+from app.models.code_assignments import CodeAssignment
+from app.models.document import Document, DocumentType
+from app.services.search_service import ProjectSearchService
+
+
+@pytest.fixture(autouse=True)
+def fresh_search_index():
+    """Each test gets a fresh database, so cached project indexes must go too"""
+    ProjectSearchService.invalidate()
+    yield
+    ProjectSearchService.invalidate()
+
+
+@pytest.fixture
+def coded_project(client, auth_headers, db, test_user):
+    """Create a project with a code, a coded segment and an annotation"""
+    project_id = client.post("/api/v1/projects/", json={
+        "title": "Search Project",
+        "description": "Project for search tests"
+    }, headers=auth_headers).json()["id"]
+
+    code = client.post("/api/v1/codes/", json={
+        "name": "Isolation",
+        "description": "Feeling cut off from colleagues",
+        "project_id": project_id
+    }, headers=auth_headers).json()
+
+    document = Document(
+        name="interview.txt",
+        content="I felt isolated working from home.",
+        document_type=DocumentType.TEXT,
+        project_id=project_id,
+        uploaded_by_id=test_user["id"]
+    )
+    db.add(document)
+    db.commit()
+
+    assignment = CodeAssignment(
+        document_id=document.id,
+        code_id=code["id"],
+        start_char=0,
+        end_char=34,
+        text_snapshot="I felt isolated working from home.",
+        created_by_id=test_user["id"]
+    )
+    db.add(assignment)
+    db.commit()
+
+    annotation = client.post("/api/v1/annotations/", json={
+        "content": "Check whether colleagues were mentioned elsewhere",
+        "annotation_type": "MEMO",
+        "code_id": code["id"],
+        "project_id": project_id
+    }, headers=auth_headers).json()
+
+    return {
+        "project_id": project_id,
+        "code_id": code["id"],
+        "assignment_id": assignment.id,
+        "annotation_id": annotation["id"]
+    }
+
+
+def test_search_across_entity_types(client, auth_headers, coded_project):
+    """A term found in a code description and an annotation returns both"""
+    response = client.get(
+        f"/api/v1/search/project/{coded_project['project_id']}",
+        params={"q": "colleagues"}, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["total"] == 2
+    assert data["counts"] == {"code": 1, "annotation": 1, "code_assignment": 0}
+    found = {(r["entity_type"], r["entity_id"]) for r in data["results"]}
+    assert found == {("code", coded_project["code_id"]),
+                     ("annotation", coded_project["annotation_id"])}
+
+    code_result = next(r for r in data["results"] if r["entity_type"] == "code")
+    hit = code_result["hits"][0]
+    assert hit["field"] == "description"
+    assert "Feeling cut off from colleagues"[hit["start_char"]:hit["end_char"]] == "colleagues"
+
+
+def test_search_assignment_snapshots(client, auth_headers, coded_project):
+    """Coded segments are found by their text snapshot and carry document offsets"""
+    data = client.get(
+        f"/api/v1/search/project/{coded_project['project_id']}",
+        params={"q": "working home", "types": ["code_assignment"]},
+        headers=auth_headers).json()
+
+    assert data["total"] == 1
+    result = data["results"][0]
+    assert result["entity_id"] == coded_project["assignment_id"]
+    assert result["title"] == "Isolation"
+    assert result["document_id"] is not None
+    assert (result["start_char"], result["end_char"]) == (0, 34)
+    assert result["hit_count"] == 2
+
+
+def test_hits_fall_back_to_term_substrings(client, auth_headers, coded_project, monkeypatch):
+    """A matched result never comes back without hits, whatever the stemmer disagreement"""
+    monkeypatch.setattr("app.services.search_service.find_term_positions", lambda text, terms: [])
+    data = client.get(
+        f"/api/v1/search/project/{coded_project['project_id']}",
+        params={"q": "colleagues"}, headers=auth_headers).json()
+
+    assert data["total"] == 2
+    for result in data["results"]:
+        assert result["hit_count"] > 0
+        assert all(hit["snippet"] for hit in result["hits"])
+
+
+def test_search_index_follows_updates(client, auth_headers, db, coded_project):
+    """Edits and deletions are reflected without rebuilding the index"""
+    url = f"/api/v1/search/project/{coded_project['project_id']}"
+    assert client.get(url, params={"q": "loneliness"},
+                      headers=auth_headers).json()["total"] == 0
+
+    response = client.put(f"/api/v1/codes/{coded_project['code_id']}", json={
+        "name": "Loneliness"
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+    data = client.get(url, params={"q": "loneliness"},
+                      headers=auth_headers).json()
+    assert data["total"] == 1
+    assert data["results"][0]["hits"][0]["field"] == "name"
+
+    db.delete(db.get(CodeAssignment, coded_project["assignment_id"]))
+    db.commit()
+    assert client.get(url, params={"q": "isolated"},
+                      headers=auth_headers).json()["total"] == 0
+
+
+def test_search_requires_project_access(client, auth_headers):
+    """Searching an inaccessible project is rejected"""
+    response = client.get("/api/v1/search/project/99999",
+                          params={"q": "anything"}, headers=auth_headers)
+    assert response.status_code == 404